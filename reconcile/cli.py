@@ -12,7 +12,6 @@ from types import ModuleType
 
 import click
 import sentry_sdk
-from sentry_sdk.integrations.logging import LoggingIntegration
 
 from reconcile.status import (
     ExitCodes,
@@ -42,7 +41,6 @@ from reconcile.utils.runtime.runner import (
     IntegrationRunConfiguration,
     run_integration_cfg,
 )
-from reconcile.utils.unleash import get_feature_toggle_state
 
 TERRAFORM_VERSION = ["1.6.6"]
 TERRAFORM_VERSION_REGEX = r"^Terraform\sv([\d]+\.[\d]+\.[\d]+)$"
@@ -70,6 +68,8 @@ def before_breadcrumb(crumb, hint):
 
 # Enable Sentry
 if os.getenv("SENTRY_DSN"):
+    from sentry_sdk.integrations.logging import LoggingIntegration
+
     match os.environ.get("SENTRY_EVENT_LEVEL", "CRITICAL").upper():
         case "CRITICAL":
             sentry_event_level = logging.CRITICAL
@@ -597,6 +597,8 @@ def run_class_integration(
         running_state = RunningState()
         running_state.integration = integration.name  # type: ignore[attr-defined]
 
+        from reconcile.utils.unleash import get_feature_toggle_state
+
         unleash_feature_state = get_feature_toggle_state(integration.name)
         if not unleash_feature_state:
             logging.info("Integration toggle is disabled, skipping integration.")
@@ -606,6 +608,9 @@ def run_class_integration(
             ctx.get("check_only_affected_shards", False)
             or os.environ.get("CHECK_ONLY_AFFECTED_SHARDS", "false") == "true"
         )
+        use_bundle_diff = (
+            os.environ.get("EARLY_EXIT_USE_BUNDLE_DIFF", "false") == "true"
+        )
         run_integration_cfg(
             IntegrationRunConfiguration(
                 integration=integration,
@@ -615,6 +620,7 @@ def run_class_integration(
                 check_only_affected_shards=check_only_affected_shards,
                 gql_sha_url=ctx["gql_sha_url"],
                 print_url=ctx["gql_url_print"],
+                use_bundle_diff=use_bundle_diff,
             )
         )
     except gql.GqlApiIntegrationNotFound as e:
@@ -630,6 +636,8 @@ def run_class_integration(
         traceback.print_exc(file=sys.stderr)
         sys.exit(ExitCodes.ERROR)
     finally:
+        if report := gql.query_report():
+            logging.debug(f"gql queries:\n{report}")
         if dump_schemas_file:
             gqlapi = gql.get_api()
             with open(dump_schemas_file, "w", encoding="locale") as f:
@@ -776,6 +784,16 @@ def aws_saml_idp(
     )
 
 
+@integration.command(
+    short_help="Stores a snapshot of commonly used GraphQL datasets per bundle SHA."
+)
+@click.pass_context
+def gql_snapshot(ctx):
+    import reconcile.gql_snapshot
+
+    run_integration(reconcile.gql_snapshot, ctx.obj)
+
+
 @integration.command(short_help="Configures the teams and members in a GitHub org.")
 @click.pass_context
 def github(ctx):
@@ -1367,6 +1385,24 @@ def aws_support_cases_sos(ctx, gitlab_project_id, thread_pool_size):
 @cluster_name
 @exclude_cluster
 @namespace_name
+@click.option(
+    "--incremental/--no-incremental",
+    default=False,
+    help="only render desired resources whose inputs changed since the last run.",
+)
+@click.option(
+    "--list-by-kind/--no-list-by-kind",
+    default=False,
+    help="fetch the current state of kinds managed in many namespaces with one "
+    "cluster-wide list per kind. Reads the objects of all namespaces, "
+    "Secrets are always fetched per namespace.",
+)
+@click.option(
+    "--server-side/--no-server-side",
+    default=False,
+    help="use server-side apply. In dry-run mode, resources to apply are "
+    "validated by the API server.",
+)
 @click.pass_context
 def openshift_resources(
     ctx,
@@ -1376,6 +1412,9 @@ def openshift_resources(
     cluster_name,
     exclude_cluster,
     namespace_name,
+    incremental,
+    list_by_kind,
+    server_side,
 ):
     import reconcile.openshift_resources
 
@@ -1388,6 +1427,9 @@ def openshift_resources(
         cluster_name=cluster_name,
         exclude_cluster=exclude_cluster,
         namespace_name=namespace_name,
+        incremental=incremental,
+        list_by_kind=list_by_kind,
+        server_side=server_side,
     )
 
 
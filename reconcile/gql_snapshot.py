@@ -0,0 +1,20 @@
+import logging
+
+from reconcile.utils import gql
+from reconcile.utils.gql_snapshot import (
+    QONTRACT_INTEGRATION,
+    store_snapshot,
+)
+from reconcile.utils.state import init_state
+
+
+def run(dry_run: bool) -> None:
+    gql_api = gql.get_api()
+    if not gql_api.sha:
+        raise RuntimeError(f"{QONTRACT_INTEGRATION} must query a bundle SHA")
+    if dry_run:
+        logging.info(f"would store the gql snapshot of {gql_api.sha}")
+        return
+    with init_state(integration=QONTRACT_INTEGRATION) as state:
+        if store_snapshot(state, gql_api):
+            logging.info(f"stored the gql snapshot of {gql_api.sha}")
@@ -100,7 +100,9 @@ def run(dry_run, thread_pool_size=10):
 def early_exit_desired_state(*args, **kwargs) -> dict[str, Any]:
     clusters = [
         c["name"]
-        for c in queries.get_clusters()
+        for c in queries.get_clusters(
+            fields=["name", "ocm.name", "disable.integrations"]
+        )
         if integration_is_enabled(QONTRACT_INTEGRATION, c) and _cluster_is_compatible(c)
     ]
     desired_state = openshift_groups.fetch_desired_state(clusters=clusters)
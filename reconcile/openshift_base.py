@@ -299,7 +299,7 @@ def populate_current_state(
         logging.warning(msg)
         return
     try:
-        for item in spec.oc.get_items(
+        for item in spec.oc.iter_items(
             spec.kind, namespace=spec.namespace, resource_names=spec.resource_names
         ):
             openshift_resource = OR(item, integration, integration_version)
@@ -319,6 +319,82 @@ def populate_current_state(
         logging.error(f"[{spec.cluster}/{spec.namespace}] {e!s}")
 
 
+# a cluster-wide LIST returns the objects of every namespace of a cluster, not
+# only of the managed ones. It only pays off for kinds managed in many
+# namespaces, and is never used for kinds holding credentials.
+LIST_BY_KIND_MIN_NAMESPACES = 10
+LIST_BY_KIND_EXCLUDED_KINDS = {"Secret"}
+
+
+def group_specs_by_cluster_and_kind(
+    specs: Iterable[StateSpec],
+) -> list[list[CurrentStateSpec]]:
+    groups: dict[tuple[str, str], list[CurrentStateSpec]] = {}
+    for spec in specs:
+        if isinstance(spec, CurrentStateSpec):
+            groups.setdefault((spec.cluster, spec.kind), []).append(spec)
+    return list(groups.values())
+
+
+def populate_current_state_by_kind(
+    specs: Sequence[CurrentStateSpec],
+    ri: ResourceInventory,
+    integration: str,
+    integration_version: str,
+    caller: str | None = None,
+):
+    """
+    Populates the current state of all specs sharing the same cluster and kind
+    with a single cluster-wide (paginated) LIST, instead of one LIST per
+    namespace. The LIST is not filtered, it reads the objects of all
+    namespaces of the cluster. Falls back to per-namespace fetching if the
+    kind is cluster-scoped, can't be listed cluster-wide, is managed in less
+    than LIST_BY_KIND_MIN_NAMESPACES namespaces or is one of
+    LIST_BY_KIND_EXCLUDED_KINDS.
+    """
+    spec = specs[0]
+    if not spec.oc.is_kind_supported(spec.kind):
+        msg = f"[{spec.cluster}] cluster has no API resource {spec.kind}."
+        logging.warning(msg)
+        return
+    specs_by_namespace = {s.namespace: s for s in specs}
+    if (
+        len(specs_by_namespace) >= LIST_BY_KIND_MIN_NAMESPACES
+        and spec.kind.split(".", 1)[0] not in LIST_BY_KIND_EXCLUDED_KINDS
+        and "cluster" not in specs_by_namespace
+        and spec.oc.is_kind_namespaced(spec.kind)
+    ):
+        try:
+            # items are added while they are being read, a failure halfway
+            # is fine as the fallback overwrites them
+            for item in spec.oc.iter_cluster_items(spec.kind):
+                namespace_spec = specs_by_namespace.get(
+                    item["metadata"].get("namespace")
+                )
+                if not namespace_spec:
+                    continue
+                openshift_resource = OR(item, integration, integration_version)
+                if (
+                    namespace_spec.resource_names
+                    and openshift_resource.name not in namespace_spec.resource_names
+                ):
+                    continue
+                if caller and openshift_resource.caller != caller:
+                    continue
+                ri.add_current(
+                    spec.cluster,
+                    namespace_spec.namespace,
+                    spec.kind,
+                    openshift_resource.name,
+                    openshift_resource,
+                )
+            return
+        except StatusCodeError as e:
+            logging.debug(f"[{spec.cluster}] unable to list {spec.kind}: {e}")
+    for s in specs:
+        populate_current_state(s, ri, integration, integration_version, caller)
+
+
 def fetch_current_state(
     namespaces: Iterable[Mapping] | None = None,
     clusters: Iterable[Mapping] | None = None,
@@ -382,7 +458,17 @@ def apply(
     wait_for_namespace: bool,
     recycle_pods: bool = True,
     privileged: bool = False,
+    server_side: bool = False,
 ) -> None:
+    """
+    Applies the resource, client-side with `oc apply` or, with server_side,
+    server-side owned by the qontract-reconcile field manager.
+
+    A dry run with server_side validates the resource with
+    server_side_dry_run. It sends a request to the API server for every
+    resource and bypasses the watch cache: like any write, it turns off the
+    watch cache of the client, later reads of the cluster are live calls.
+    """
     logging.info([
         "apply",
         f"privileged={privileged}",
@@ -397,7 +483,9 @@ def apply(
     except OCLogMsg as ex:
         logging.log(level=ex.log_level, msg=ex.message)
         return None
-    if not dry_run:
+    if dry_run and server_side:
+        server_side_dry_run(oc, cluster, namespace, resource_type, resource)
+    elif not dry_run:
         annotated = resource.annotate()
         # skip if namespace does not exist (as it will soon)
         # do not skip if this is a cluster scoped integration
@@ -410,13 +498,22 @@ def apply(
                 logging.warning(msg)
                 return
 
+        def _apply() -> None:
+            if server_side:
+                oc.server_side_apply(namespace, annotated)
+            else:
+                oc.apply(namespace, annotated)
+
         try:
-            oc.apply(namespace, annotated)
+            _apply()
         except InvalidValueApplyError:
+            # server-side apply does not use the last-applied annotation
+            if server_side:
+                raise
             oc.remove_last_applied_configuration(
                 namespace, resource_type, resource.name
             )
-            oc.apply(namespace, annotated)
+            _apply()
         except (
             MetaDataAnnotationsTooLongApplyError,
             UnsupportedMediaTypeError,
@@ -433,7 +530,7 @@ def apply(
             if resource_type not in {"Route", "Service", "Secret", "Job"}:
                 raise
             oc.delete(namespace=namespace, kind=resource_type, name=resource.name)
-            oc.apply(namespace=namespace, resource=annotated)
+            _apply()
         except DeploymentFieldIsImmutableError:
             logging.info(["replace", cluster, namespace, resource_type, resource.name])
             # spec.selector changes
@@ -461,7 +558,7 @@ def apply(
                 cascade=False,
             )
             # create new one
-            oc.apply(namespace=namespace, resource=annotated)
+            _apply()
             if obsolete_rs:
                 # refresh resources
                 deployment = oc.get(namespace, resource_type, resource.name)
@@ -482,13 +579,18 @@ def apply(
                 # not allowed to set 'blockOwnerDeletion'
                 del owner_references[0]["blockOwnerDeletion"]
                 obsolete_rs["metadata"]["ownerReferences"] = owner_references
-                oc.apply(namespace=namespace, resource=OR(obsolete_rs, "", ""))
+                if server_side:
+                    # server-side apply rejects objects carrying managedFields
+                    obsolete_rs["metadata"].pop("managedFields", None)
+                    oc.server_side_apply(namespace, OR(obsolete_rs, "", ""))
+                else:
+                    oc.apply(namespace=namespace, resource=OR(obsolete_rs, "", ""))
         except (MayNotChangeOnceSetError, PrimaryClusterIPCanNotBeUnsetError):
             if resource_type not in {"Service"}:
                 raise
 
             oc.delete(namespace=namespace, kind=resource_type, name=resource.name)
-            oc.apply(namespace=namespace, resource=annotated)
+            _apply()
         except StatefulSetUpdateForbidden:
             if resource_type != "StatefulSet":
                 raise
@@ -513,7 +615,7 @@ def apply(
                 name=resource.name,
                 cascade=False,
             )
-            oc.apply(namespace=namespace, resource=annotated)
+            _apply()
             # the resource was applied without cascading.
             # if the change was in the storage, we need to
             # take care of the resize ourselves.
@@ -526,6 +628,44 @@ def apply(
         oc.recycle_pods(dry_run, namespace, resource_type, resource)
 
 
+def server_side_dry_run(
+    oc: OCClient,
+    cluster: str,
+    namespace: str,
+    resource_type: str,
+    resource: OR,
+) -> None:
+    """
+    Validates the resource against the API server (admission, schema,
+    immutable fields) with a server-side apply dry-run. Errors apply() would
+    recover from in a real run are only logged.
+    """
+    if namespace != "cluster" and not oc.project_exists(namespace):
+        logging.info(f"[{cluster}/{namespace}] namespace does not exist (yet).")
+        return
+    try:
+        oc.server_side_apply(namespace, resource.annotate(), dry_run=True)
+    except (
+        InvalidValueApplyError,
+        MetaDataAnnotationsTooLongApplyError,
+        UnsupportedMediaTypeError,
+        RequestEntityTooLargeError,
+        FieldIsImmutableError,
+        DeploymentFieldIsImmutableError,
+        MayNotChangeOnceSetError,
+        PrimaryClusterIPCanNotBeUnsetError,
+        StatefulSetUpdateForbidden,
+    ) as e:
+        logging.info([
+            "server_side_dry_run_requires_recreate",
+            cluster,
+            namespace,
+            resource_type,
+            resource.name,
+            e.__class__.__name__,
+        ])
+
+
 def create(dry_run, oc_map, cluster, namespace, resource_type, resource):
     logging.info(["create", cluster, namespace, resource_type, resource.name])
 
@@ -593,6 +733,7 @@ class ApplyOptions:
     all_callers: Sequence[str] | None
     privileged: bool | None
     enable_deletion: bool | None
+    server_side: bool = False
 
 
 def should_apply(
@@ -869,6 +1010,7 @@ def apply_action(
             wait_for_namespace=options.wait_for_namespace,
             recycle_pods=options.recycle_pods,
             privileged=bool(options.privileged),
+            server_side=options.server_side,
         )
 
     except StatusCodeError as e:
@@ -923,6 +1065,7 @@ def _realize_resource_data(
     no_dry_run_skip_compare: bool,
     override_enable_deletion: bool,
     recycle_pods: bool,
+    server_side: bool = False,
 ) -> list[dict[str, Any]]:
     options = ApplyOptions(
         dry_run=dry_run,
@@ -935,6 +1078,7 @@ def _realize_resource_data(
         recycle_pods=recycle_pods,
         privileged=False,
         enable_deletion=False,
+        server_side=server_side,
     )
     return _realize_resource_data_3way_diff(
         ri_item=ri_item, oc_map=oc_map, ri=ri, options=options
@@ -1035,6 +1179,7 @@ def realize_data(
     no_dry_run_skip_compare=False,
     override_enable_deletion=None,
     recycle_pods=True,
+    server_side=False,
 ):
     """
     Realize the current state to the desired state.
@@ -1053,6 +1198,8 @@ def realize_data(
     :param no_dry_run_skip_compare: when running without dry-run, skip compare
     :param override_enable_deletion: override calculated enable_deletion value
     :param recycle_pods: should pods be recycled if a dependency changed
+    :param server_side: use server-side apply. in dry-run mode, resources
+                        to apply are validated by the API server (dryRun=All)
     """
     args = locals()
     del args["thread_pool_size"]
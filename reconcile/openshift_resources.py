@@ -19,6 +19,9 @@ def run(
     cluster_name: Iterable[str] | None = None,
     exclude_cluster: Iterable[str] | None = None,
     namespace_name: str | None = None,
+    incremental: bool = False,
+    list_by_kind: bool = False,
+    server_side: bool = False,
 ) -> None:
     orb.QONTRACT_INTEGRATION = QONTRACT_INTEGRATION
     orb.QONTRACT_INTEGRATION_VERSION = QONTRACT_INTEGRATION_VERSION
@@ -33,6 +36,9 @@ def run(
         exclude_cluster=exclude_cluster,
         namespace_name=namespace_name,
         init_api_resources=True,
+        incremental=incremental,
+        list_by_kind=list_by_kind,
+        server_side=server_side,
     )
 
     # check for unused resources types
@@ -53,6 +53,7 @@ from reconcile.utils.oc import (
     StatusCodeError,
 )
 from reconcile.utils.openshift_resource import (
+    QONTRACT_ANNOTATION_SHA256SUM,
     ConstructResourceError,
     ResourceInventory,
     ResourceKeyExistsError,
@@ -64,6 +65,7 @@ from reconcile.utils.runtime.integration import DesiredStateShardConfig
 from reconcile.utils.secret_reader import SecretReader
 from reconcile.utils.semver_helper import make_semver
 from reconcile.utils.sharding import is_in_shard
+from reconcile.utils.state import State, init_state
 from reconcile.utils.vault import (
     SecretVersionIsNone,
     SecretVersionNotFound,
@@ -636,6 +638,125 @@ def fetch_openshift_resource(
     return openshift_resource
 
 
+TEMPLATE_PROVIDERS = {"resource-template", "prometheus-rule"}
+
+
+def desired_state_fingerprint(
+    resource: Mapping[str, Any],
+    parent: Mapping[str, Any],
+    settings: Mapping[str, Any] | None = None,
+) -> str | None:
+    """
+    Fingerprint of everything a desired resource is rendered from: the
+    resource definition (path, content, template variables, vault path and
+    version, ...) and, for templates, the namespace it is rendered for.
+    Returns None if the resource can not be fingerprinted. Templates reading
+    external data are fingerprinted too, their renderings are not reused, see
+    DesiredStateDigests.
+    """
+    inputs: dict[str, Any] = {
+        "integration_version": QONTRACT_INTEGRATION_VERSION,
+        # the namespace is added to the resource when rendering templates
+        "resource": {k: v for k, v in resource.items() if k != "namespace"},
+    }
+    if resource["provider"] in TEMPLATE_PROVIDERS:
+        inputs["parent"] = {
+            k: v for k, v in parent.items() if k != "openshiftResources"
+        }
+        inputs["repo_url"] = (settings or {}).get("repoUrl")
+    try:
+        serialized = json.dumps(inputs, sort_keys=True)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class DesiredStateDigests:
+    """
+    Digests of the desired resources rendered by previous runs, by the
+    fingerprint of their inputs. Persisted in the integration state, one key
+    per cluster.
+
+    A desired resource whose fingerprint did not change does not need to be
+    rendered again if the current resource carries the digest of that
+    rendering and was not changed on the cluster since: the current resource
+    is used as the desired one. Renderings which called template functions
+    reading data that is not part of the inputs (vault, github, query, ...)
+    are never reused.
+    """
+
+    def __init__(self, state: State, clusters: Iterable[str]):
+        self.state = state
+        self._previous: dict[str, dict[str, dict[str, Any]]] = {
+            cluster: state.get(self._key(cluster), {}) for cluster in clusters
+        }
+        self._current: dict[str, dict[str, dict[str, Any]]] = defaultdict(dict)
+        self._namespaces: dict[str, set[str]] = defaultdict(set)
+        self._lock = Lock()
+
+    @staticmethod
+    def _key(cluster: str) -> str:
+        return f"desired-state-digests/{cluster}"
+
+    def reuse(
+        self,
+        ri: ResourceInventory,
+        cluster: str,
+        namespace: str,
+        fingerprint: str,
+    ) -> OR | None:
+        entry = self._previous.get(cluster, {}).get(f"{namespace}/{fingerprint}")
+        # entries without the flag predate it and may be impure
+        if not entry or entry.get("impure", True):
+            return None
+        current = ri.get_current(
+            cluster, namespace, entry["kind_and_group"], entry["name"]
+        ) or ri.get_current(cluster, namespace, entry["kind"], entry["name"])
+        if (
+            current is None
+            or not current.has_qontract_annotations()
+            or current.annotations[QONTRACT_ANNOTATION_SHA256SUM] != entry["sha256sum"]
+            or not current.has_valid_sha256sum()
+        ):
+            return None
+        return OR(
+            current.body,
+            QONTRACT_INTEGRATION,
+            QONTRACT_INTEGRATION_VERSION,
+            error_details=current.error_details,
+        )
+
+    def record(
+        self,
+        cluster: str,
+        namespace: str,
+        fingerprint: str,
+        resource: OR,
+        impure: bool = False,
+    ) -> None:
+        with self._lock:
+            self._namespaces[cluster].add(namespace)
+            self._current[cluster][f"{namespace}/{fingerprint}"] = {
+                "kind": resource.kind,
+                "kind_and_group": resource.kind_and_group,
+                "name": resource.name,
+                "sha256sum": resource.sha256sum(),
+                "impure": impure,
+            }
+
+    def save(self) -> None:
+        for cluster, entries in self._current.items():
+            previous = self._previous.get(cluster, {})
+            # keep the entries of namespaces not processed by this run
+            merged = {
+                k: v
+                for k, v in previous.items()
+                if k.split("/", 1)[0] not in self._namespaces[cluster]
+            } | entries
+            if merged != previous:
+                self.state[self._key(cluster)] = merged
+
+
 def fetch_current_state(
     oc: OCClient,
     ri: ResourceInventory,
@@ -648,7 +769,7 @@ def fetch_current_state(
     if not oc.is_kind_supported(kind):
         logging.warning(f"[{cluster}] cluster has no API resource {kind}.")
         return
-    for item in oc.get_items(kind, namespace=namespace, resource_names=resource_names):
+    for item in oc.iter_items(kind, namespace=namespace, resource_names=resource_names):
         openshift_resource = OR(
             item, QONTRACT_INTEGRATION, QONTRACT_INTEGRATION_VERSION
         )
@@ -670,19 +791,30 @@ def fetch_desired_state(
     parent: Mapping[str, Any],
     privileged: bool,
     settings: Mapping[str, Any] | None = None,
+    digests: DesiredStateDigests | None = None,
 ) -> None:
-    try:
-        openshift_resource = fetch_openshift_resource(resource, parent, settings)
-    except (
-        FetchResourceError,
-        FetchSecretError,
-        FetchRouteError,
-        UnknownProviderError,
-    ) as e:
-        ri.register_error()
-        msg = f"[{cluster}/{namespace}] {e!s}"
-        _locked_error_log(msg)
-        return
+    fingerprint = None
+    openshift_resource = None
+    impure = False
+    if digests is not None:
+        fingerprint = desired_state_fingerprint(resource, parent, settings)
+        if fingerprint:
+            openshift_resource = digests.reuse(ri, cluster, namespace, fingerprint)
+    if openshift_resource is None:
+        impure_calls = jinja2_utils.impure_calls()
+        try:
+            openshift_resource = fetch_openshift_resource(resource, parent, settings)
+        except (
+            FetchResourceError,
+            FetchSecretError,
+            FetchRouteError,
+            UnknownProviderError,
+        ) as e:
+            ri.register_error()
+            msg = f"[{cluster}/{namespace}] {e!s}"
+            _locked_error_log(msg)
+            return
+        impure = jinja2_utils.impure_calls() != impure_calls
 
     # add to inventory
     try:
@@ -717,11 +849,15 @@ def fetch_desired_state(
         _locked_error_log(msg)
         return
 
+    if digests is not None and fingerprint:
+        digests.record(cluster, namespace, fingerprint, openshift_resource, impure)
+
 
 def fetch_states(
     spec: ob.StateSpec,
     ri: ResourceInventory,
     settings: Mapping[str, Any] | None = None,
+    digests: DesiredStateDigests | None = None,
 ) -> None:
     try:
         if isinstance(spec, ob.CurrentStateSpec):
@@ -743,6 +879,7 @@ def fetch_states(
                 spec.parent,
                 spec.privileged,
                 settings,
+                digests,
             )
 
     except StatusCodeError as e:
@@ -757,6 +894,8 @@ def fetch_data(
     use_jump_host: bool,
     init_api_resources: bool = False,
     overrides: Iterable[str] | None = None,
+    digests: DesiredStateDigests | None = None,
+    list_by_kind: bool = False,
 ) -> tuple[OC_Map, ResourceInventory]:
     ri = ResourceInventory()
     settings = queries.get_app_interface_settings()
@@ -773,7 +912,35 @@ def fetch_data(
     state_specs = ob.init_specs_to_fetch(
         ri, oc_map, namespaces=namespaces, override_managed_types=overrides
     )
-    threaded.run(fetch_states, state_specs, thread_pool_size, ri=ri, settings=settings)
+    if digests is None and not list_by_kind:
+        threaded.run(
+            fetch_states, state_specs, thread_pool_size, ri=ri, settings=settings
+        )
+    else:
+        # reusing desired resources requires the current state
+        current_specs = [s for s in state_specs if isinstance(s, ob.CurrentStateSpec)]
+        desired_specs = [s for s in state_specs if isinstance(s, ob.DesiredStateSpec)]
+        if list_by_kind:
+            threaded.run(
+                ob.populate_current_state_by_kind,
+                ob.group_specs_by_cluster_and_kind(current_specs),
+                thread_pool_size,
+                ri=ri,
+                integration=QONTRACT_INTEGRATION,
+                integration_version=QONTRACT_INTEGRATION_VERSION,
+            )
+        else:
+            threaded.run(
+                fetch_states, current_specs, thread_pool_size, ri=ri, settings=settings
+            )
+        threaded.run(
+            fetch_states,
+            desired_specs,
+            thread_pool_size,
+            ri=ri,
+            settings=settings,
+            digests=digests,
+        )
 
     return oc_map, ri
 
@@ -873,6 +1040,9 @@ def run(
     exclude_cluster: Sequence[str] | None = None,
     namespace_name: str | None = None,
     init_api_resources: bool = False,
+    incremental: bool = False,
+    list_by_kind: bool = False,
+    server_side: bool = False,
     defer: Callable | None = None,
 ) -> ResourceInventory | None:
     # https://click.palletsprojects.com/en/8.1.x/options/#multiple-options
@@ -904,6 +1074,12 @@ def run(
             "Exiting."
         )
         return None
+    digests = None
+    if incremental:
+        state = init_state(integration=QONTRACT_INTEGRATION)
+        if defer:
+            defer(state.cleanup)
+        digests = DesiredStateDigests(state, {n["cluster"]["name"] for n in namespaces})
     oc_map, ri = fetch_data(
         namespaces,
         thread_pool_size,
@@ -911,6 +1087,8 @@ def run(
         use_jump_host,
         init_api_resources=init_api_resources,
         overrides=overrides,
+        digests=digests,
+        list_by_kind=list_by_kind,
     )
     if defer:
         defer(oc_map.cleanup)
@@ -920,7 +1098,9 @@ def run(
             sys.exit(1)
 
     ob.publish_metrics(ri, QONTRACT_INTEGRATION)
-    ob.realize_data(dry_run, oc_map, ri, thread_pool_size)
+    ob.realize_data(dry_run, oc_map, ri, thread_pool_size, server_side=server_side)
+    if digests and not dry_run:
+        digests.save()
 
     if ri.has_error_registered():
         sys.exit(1)
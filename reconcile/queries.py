@@ -2,7 +2,10 @@ import itertools
 import logging
 import os
 import shlex
-from collections.abc import Mapping
+from collections.abc import (
+    Iterable,
+    Mapping,
+)
 from dataclasses import dataclass
 from textwrap import indent
 from typing import Any
@@ -12,6 +15,7 @@ from jinja2 import Template
 from reconcile.gql_definitions.jumphosts.jumphosts import JumphostsQueryData
 from reconcile.gql_definitions.jumphosts.jumphosts import query as jumphosts_query
 from reconcile.utils import gql
+from reconcile.utils.gql_projection import project_query
 
 SECRET_READER_SETTINGS = """
 {
@@ -1024,14 +1028,24 @@ CLUSTERS_MINIMAL_QUERY = """
 )
 
 
-def get_clusters(minimal: bool = False, aws_infrastructure_access: bool = False):
-    """Returns all Clusters"""
+def get_clusters(
+    minimal: bool = False,
+    aws_infrastructure_access: bool = False,
+    fields: Iterable[str] | None = None,
+):
+    """Returns all Clusters
+
+    :param fields: (optional) dotted paths of the cluster fields to query,
+        e.g. ["name", "ocm.name"], instead of all fields
+    """
     gqlapi = gql.get_api()
     tmpl = CLUSTERS_MINIMAL_QUERY if minimal else CLUSTERS_QUERY
     query = Template(tmpl).render(
         filter=None,
         aws_infrastructure_access=aws_infrastructure_access,
     )
+    if fields:
+        query = project_query(query, fields)
     return gqlapi.query(query)["clusters"]
 
 
@@ -1546,12 +1560,17 @@ NAMESPACES_MINIMAL_QUERY = """
 """ % (indent(JUMPHOST_FIELDS, 8 * " "),)
 
 
-def get_namespaces(minimal=False):
-    """Returns all Namespaces"""
+def get_namespaces(minimal=False, fields: Iterable[str] | None = None):
+    """Returns all Namespaces
+
+    :param fields: (optional) dotted paths of the namespace fields to query,
+        e.g. ["name", "cluster.name"], instead of all fields
+    """
     gqlapi = gql.get_api()
-    if minimal:
-        return gqlapi.query(NAMESPACES_MINIMAL_QUERY)["namespaces"]
-    return gqlapi.query(NAMESPACES_QUERY)["namespaces"]
+    query = NAMESPACES_MINIMAL_QUERY if minimal else NAMESPACES_QUERY
+    if fields:
+        query = project_query(query, fields)
+    return gqlapi.query(query)["namespaces"]
 
 
 PRODUCTS_QUERY = """
@@ -0,0 +1,84 @@
+from typing import Any
+
+import pytest
+from pytest_mock import MockerFixture
+
+from reconcile.utils.disk_cache import DiskCache
+from reconcile.utils.runtime import bundle_diff
+from reconcile.utils.runtime.bundle_diff import (
+    BundleDiff,
+    get_bundle_diff,
+)
+
+
+def datafile(path: str, old_schema: str | None, new_schema: str | None) -> Any:
+    return {
+        "datafilepath": path,
+        "datafileschema": new_schema or old_schema,
+        "old": {"path": path, "$schema": old_schema} if old_schema else None,
+        "new": {"path": path, "$schema": new_schema} if new_schema else None,
+    }
+
+
+@pytest.fixture
+def get_diff(mocker: MockerFixture, tmp_path: Any) -> Any:
+    mocker.patch.object(bundle_diff, "BUNDLE_DIFF_CACHE", DiskCache(str(tmp_path)))
+    return mocker.patch.object(bundle_diff.gql, "get_diff")
+
+
+def test_get_bundle_diff(get_diff: Any) -> None:
+    get_diff.return_value = {
+        "datafiles": {
+            "/a.yml": datafile("/a.yml", "/access/role-1.yml", "/access/role-1.yml"),
+            "/b.yml": datafile("/b.yml", None, "/access/user-1.yml"),
+        },
+        "resources": {},
+    }
+
+    diff = get_bundle_diff("old", "new")
+
+    assert diff == BundleDiff(
+        changed_schemas=frozenset({"/access/role-1.yml", "/access/user-1.yml"}),
+        attributable=True,
+    )
+    get_diff.assert_called_once_with("old", new_sha="new")
+    # the diff is fetched once per PR check
+    assert get_bundle_diff("old", "new") == diff
+    assert get_diff.call_count == 1
+
+
+@pytest.mark.parametrize(
+    "raw_diff",
+    [
+        {
+            "datafiles": {"/a.yml": datafile("/a.yml", "/a-1.yml", None)},
+            "resources": {},
+        },
+        {
+            "datafiles": {},
+            "resources": {
+                "/r.yml": {"resourcepath": "/r.yml", "old": None, "new": None}
+            },
+        },
+    ],
+)
+def test_get_bundle_diff_not_attributable(get_diff: Any, raw_diff: Any) -> None:
+    get_diff.return_value = raw_diff
+
+    assert get_bundle_diff("old", "new").may_affect(["/unrelated-1.yml"])
+
+
+@pytest.mark.parametrize(
+    "queried_schemas,may_affect",
+    [
+        (["/app-sre/cluster-1.yml"], False),
+        (["/app-sre/cluster-1.yml", "/access/user-1.yml"], True),
+        ([], True),
+    ],
+)
+def test_bundle_diff_may_affect(queried_schemas: list[str], may_affect: bool) -> None:
+    diff = BundleDiff(
+        changed_schemas=frozenset({"/access/user-1.yml"}), attributable=True
+    )
+
+    assert diff.may_affect(queried_schemas) == may_affect
@@ -13,6 +13,7 @@ from reconcile.test.runtime.fixtures import (
 )
 from reconcile.utils import gql
 from reconcile.utils.runtime import runner
+from reconcile.utils.runtime.bundle_diff import BundleDiff
 from reconcile.utils.runtime.desired_state_diff import DesiredStateDiff
 from reconcile.utils.runtime.runner import (
     IntegrationRunConfiguration,
@@ -185,6 +186,51 @@ def test_get_desired_state_diff(
         assert desired_state_diff.affected_shards == affected_shards
 
 
+@pytest.mark.parametrize("may_affect,early_exitable", [(False, True), (True, False)])
+def test_get_desired_state_diff_bundle_diff(
+    mocker: MockerFixture,
+    may_affect: bool,
+    early_exitable: bool,
+    simple_test_integration: SimpleTestIntegration,
+):
+    may_affect_mock = mocker.patch.object(
+        runner, "bundle_diff_may_affect_desired_state", return_value=may_affect
+    )
+    cfg = MockIntegrationRunConfiguration(
+        integration=simple_test_integration,
+        valdiate_schemas=False,
+        dry_run=True,
+        early_exit_compare_sha="abc",
+        check_only_affected_shards=False,
+        gql_sha_url=False,
+        print_url=True,
+        main_data={"data": "a"},
+        comparison_data={"data": "b"},
+        use_bundle_diff=True,
+    )
+
+    desired_state_diff = get_desired_state_diff(cfg)
+
+    may_affect_mock.assert_called_once_with("abc")
+    assert desired_state_diff
+    assert desired_state_diff.can_exit_early() == early_exitable
+
+
+def test_bundle_diff_may_affect_desired_state(mocker: MockerFixture):
+    gql_api = mocker.patch.object(gql, "get_api").return_value
+    gql_api.sha = "def"
+    gql_api.get_queried_schemas.return_value = ["/app-sre/cluster-1.yml"]
+    get_bundle_diff = mocker.patch.object(runner, "get_bundle_diff")
+    get_bundle_diff.return_value = BundleDiff(
+        changed_schemas=frozenset({"/access/user-1.yml"}), attributable=True
+    )
+
+    assert not runner.bundle_diff_may_affect_desired_state("abc")
+    get_bundle_diff.assert_called_once_with("abc", "def")
+    get_bundle_diff.side_effect = Exception("diff failed")
+    assert runner.bundle_diff_may_affect_desired_state("abc")
+
+
 def test_run_configuration_dispatch_dry_run(
     mocker: MockerFixture,
     simple_test_integration: SimpleTestIntegration,
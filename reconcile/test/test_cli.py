@@ -1,3 +1,7 @@
+import json
+import subprocess
+import sys
+
 import pytest
 from click.testing import CliRunner
 
@@ -39,3 +43,34 @@ def test_parse_image_tag_from_ref_invalid_4():
     t = ("env=main=test",)
     with pytest.raises(SystemExit):
         reconcile_cli.parse_image_tag_from_ref(None, None, t)
+
+
+# modules only some integrations need, they must not be imported on startup
+DEFERRED_MODULES = [
+    "boto3",
+    "botocore",
+    "deepdiff",
+    "kubernetes",
+    "terrascript",
+    "UnleashClient",
+    "reconcile.utils.state",
+    "reconcile.utils.aws_api",
+    "reconcile.utils.runtime.desired_state_diff",
+]
+
+
+def test_cli_startup_defers_heavy_imports():
+    # a fresh interpreter, the test session has imported everything already
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import json, sys, reconcile.cli; print(json.dumps(list(sys.modules)))",
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    imported = set(json.loads(result.stdout.splitlines()[-1]))
+
+    assert [m for m in DEFERRED_MODULES if m in imported] == []
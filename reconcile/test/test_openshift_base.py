@@ -556,9 +556,9 @@ def test_populate_current_state(
     # prepare client and resource inventory
     oc_cs1.init_api_resources = True
     oc_cs1.api_resources = api_resources
-    oc_cs1.get_items = lambda kind, **kwargs: [
+    oc_cs1.iter_items = lambda kind, **kwargs: iter([  # type: ignore[method-assign]
         build_resource("Kind", "fully.qualified/v1", "name")
-    ]
+    ])
     resource_inventory.initialize_resource_type("cs1", "ns1", "Kind.fully.qualified")
 
     # process
@@ -588,7 +588,7 @@ def test_populate_current_state_unknown_kind(
     oc_cs1.init_api_resources = True
     k1 = Resource(prefix="", group="some.other.group", api_version="v1", kind="Kind")
     oc_cs1.api_resources = {"Kind": [k1]}
-    get_item_mock = mocker.patch.object(oc.OCNative, "get_items", autospec=True)
+    get_item_mock = mocker.patch.object(oc.OCNative, "iter_items", autospec=True)
 
     spec = sut.CurrentStateSpec(
         oc=oc_cs1,
@@ -609,6 +609,7 @@ def test_populate_current_state_resource_name_filtering(
     """
     test if the resource names are passed properly to the oc client when fetching items
     """
+    iter_items = mocker.patch.object(oc_cs1, "iter_items")
     spec = sut.CurrentStateSpec(
         oc=oc_cs1,
         cluster="cs1",
@@ -618,13 +619,228 @@ def test_populate_current_state_resource_name_filtering(
     )
     sut.populate_current_state(spec, resource_inventory, TEST_INT, TEST_INT_VER)
 
-    oc_cs1.get_items.assert_called_with(
+    iter_items.assert_called_with(
         "Kind.fully.qualified",
         namespace="ns1",
         resource_names=["name1", "name2"],
     )
 
 
+def build_namespaced_resource(name: str, namespace: str) -> dict[str, Any]:
+    r = build_resource("Kind", "fully.qualified/v1", name)
+    r["metadata"]["namespace"] = namespace
+    return r
+
+
+def test_group_specs_by_cluster_and_kind(oc_cs1: oc.OCNative):
+    specs: list[sut.StateSpec] = [
+        sut.CurrentStateSpec(
+            oc=oc_cs1, cluster="cs1", namespace=ns, kind=kind, resource_names=None
+        )
+        for ns in ("ns1", "ns2")
+        for kind in ("Kind", "Other")
+    ]
+    specs.append(
+        sut.DesiredStateSpec(
+            oc=oc_cs1, cluster="cs1", namespace="ns1", resource={}, parent={}
+        )
+    )
+    groups = sut.group_specs_by_cluster_and_kind(specs)
+    assert [[(s.namespace, s.kind) for s in g] for g in groups] == [
+        [("ns1", "Kind"), ("ns2", "Kind")],
+        [("ns1", "Other"), ("ns2", "Other")],
+    ]
+
+
+def test_populate_current_state_by_kind(
+    mocker: MockerFixture,
+    api_resources,
+    resource_inventory: resource.ResourceInventory,
+    oc_cs1: oc.OCNative,
+):
+    mocker.patch.object(sut, "LIST_BY_KIND_MIN_NAMESPACES", 2)
+    oc_cs1.api_resources = api_resources
+    iter_cluster_items = mocker.patch.object(
+        oc_cs1,
+        "iter_cluster_items",
+        return_value=[
+            build_namespaced_resource("a", "ns1"),
+            build_namespaced_resource("b", "ns2"),
+            build_namespaced_resource("c", "ns2"),
+            build_namespaced_resource("d", "unmanaged"),
+        ],
+    )
+    iter_items = mocker.patch.object(oc_cs1, "iter_items")
+    specs = []
+    for ns, names in (("ns1", None), ("ns2", ["b"])):
+        resource_inventory.initialize_resource_type("cs1", ns, "Kind.fully.qualified")
+        specs.append(
+            sut.CurrentStateSpec(
+                oc=oc_cs1,
+                cluster="cs1",
+                namespace=ns,
+                kind="Kind.fully.qualified",
+                resource_names=names,
+            )
+        )
+
+    sut.populate_current_state_by_kind(
+        specs, resource_inventory, TEST_INT, TEST_INT_VER
+    )
+
+    iter_cluster_items.assert_called_once_with("Kind.fully.qualified")
+    iter_items.assert_not_called()
+    current = {ns: sorted(data["current"]) for _, ns, _, data in resource_inventory}
+    assert current == {"ns1": ["a"], "ns2": ["b"]}
+
+
+def test_populate_current_state_by_kind_fallback(
+    mocker: MockerFixture,
+    api_resources,
+    resource_inventory: resource.ResourceInventory,
+    oc_cs1: oc.OCNative,
+):
+    mocker.patch.object(sut, "LIST_BY_KIND_MIN_NAMESPACES", 2)
+    oc_cs1.api_resources = api_resources
+    mocker.patch.object(
+        oc_cs1, "iter_cluster_items", side_effect=oc.StatusCodeError("forbidden")
+    )
+    iter_items = mocker.patch.object(oc_cs1, "iter_items", return_value=[])
+    specs = [
+        sut.CurrentStateSpec(
+            oc=oc_cs1,
+            cluster="cs1",
+            namespace=ns,
+            kind="Kind.fully.qualified",
+            resource_names=None,
+        )
+        for ns in ("ns1", "ns2")
+    ]
+
+    sut.populate_current_state_by_kind(
+        specs, resource_inventory, TEST_INT, TEST_INT_VER
+    )
+
+    assert iter_items.call_count == 2
+
+
+@pytest.mark.parametrize(
+    "kind, namespaces",
+    [
+        # not worth reading the objects of all namespaces
+        ("Kind.fully.qualified", ["ns1", "ns2"]),
+        # never read the secrets of unmanaged namespaces
+        ("Secret", [f"ns{i}" for i in range(20)]),
+    ],
+)
+def test_populate_current_state_by_kind_per_namespace(
+    mocker: MockerFixture,
+    kind: str,
+    namespaces: list[str],
+    resource_inventory: resource.ResourceInventory,
+    oc_cs1: oc.OCNative,
+):
+    iter_cluster_items = mocker.patch.object(oc_cs1, "iter_cluster_items")
+    iter_items = mocker.patch.object(oc_cs1, "iter_items", return_value=[])
+    specs = [
+        sut.CurrentStateSpec(
+            oc=oc_cs1, cluster="cs1", namespace=ns, kind=kind, resource_names=None
+        )
+        for ns in namespaces
+    ]
+
+    sut.populate_current_state_by_kind(
+        specs, resource_inventory, TEST_INT, TEST_INT_VER
+    )
+
+    iter_cluster_items.assert_not_called()
+    assert iter_items.call_count == len(namespaces)
+
+
+#
+# apply tests
+#
+
+
+@pytest.fixture
+def apply_oc_map(mocker) -> Any:
+    oc_map = mocker.Mock()
+    oc_map.get_cluster.return_value.project_exists.return_value = True
+    return oc_map
+
+
+def _apply(oc_map: Any, dry_run: bool, server_side: bool, kind: str = "Kind") -> None:
+    sut.apply(
+        dry_run=dry_run,
+        oc_map=oc_map,
+        cluster="cs1",
+        namespace="ns1",
+        resource_type=kind,
+        resource=resource.OpenshiftResource(
+            build_resource(kind, "v1", "name"), TEST_INT, TEST_INT_VER
+        ),
+        wait_for_namespace=False,
+        recycle_pods=False,
+        server_side=server_side,
+    )
+
+
+def test_apply_dry_run_client_side(apply_oc_map: Any) -> None:
+    _apply(apply_oc_map, dry_run=True, server_side=False)
+    client = apply_oc_map.get_cluster.return_value
+    client.apply.assert_not_called()
+    client.server_side_apply.assert_not_called()
+
+
+def test_apply_dry_run_server_side(apply_oc_map: Any) -> None:
+    _apply(apply_oc_map, dry_run=True, server_side=True)
+    client = apply_oc_map.get_cluster.return_value
+    client.apply.assert_not_called()
+    _, annotated = client.server_side_apply.call_args.args
+    assert client.server_side_apply.call_args.kwargs == {"dry_run": True}
+    assert annotated.has_qontract_annotations()
+
+
+def test_apply_dry_run_server_side_recoverable_error(apply_oc_map: Any) -> None:
+    client = apply_oc_map.get_cluster.return_value
+    client.server_side_apply.side_effect = oc.FieldIsImmutableError("immutable")
+    _apply(apply_oc_map, dry_run=True, server_side=True)
+    client.delete.assert_not_called()
+
+
+def test_apply_dry_run_server_side_error(apply_oc_map: Any) -> None:
+    client = apply_oc_map.get_cluster.return_value
+    client.server_side_apply.side_effect = oc.StatusCodeError("invalid")
+    with pytest.raises(oc.StatusCodeError):
+        _apply(apply_oc_map, dry_run=True, server_side=True)
+
+
+def test_apply_server_side(apply_oc_map: Any) -> None:
+    _apply(apply_oc_map, dry_run=False, server_side=True)
+    client = apply_oc_map.get_cluster.return_value
+    client.apply.assert_not_called()
+    client.server_side_apply.assert_called_once()
+    assert client.server_side_apply.call_args.kwargs == {}
+
+
+def test_apply_server_side_invalid_value(apply_oc_map: Any) -> None:
+    client = apply_oc_map.get_cluster.return_value
+    client.server_side_apply.side_effect = oc.InvalidValueApplyError("0x0")
+    with pytest.raises(oc.InvalidValueApplyError):
+        _apply(apply_oc_map, dry_run=False, server_side=True)
+    client.remove_last_applied_configuration.assert_not_called()
+    client.server_side_apply.assert_called_once()
+
+
+def test_apply_server_side_recreates_immutable(apply_oc_map: Any) -> None:
+    client = apply_oc_map.get_cluster.return_value
+    client.server_side_apply.side_effect = [oc.FieldIsImmutableError("immutable"), None]
+    _apply(apply_oc_map, dry_run=False, server_side=True, kind="Secret")
+    client.delete.assert_called_once()
+    assert client.server_side_apply.call_count == 2
+    client.apply.assert_not_called()
+
+
 #
 # determine_user_keys_for_access tests
 #
@@ -844,6 +1060,7 @@ def test_handle_new_resources(
         "wait_for_namespace": True,
         "recycle_pods": True,
         "privileged": False,
+        "server_side": False,
     }
     apply_mock.assert_called_with(**apply_expected_args)
 
@@ -960,6 +1177,7 @@ def test_handle_modified_resources(
             "wait_for_namespace": True,
             "recycle_pods": True,
             "privileged": False,
+            "server_side": False,
         }
         apply_mock.assert_called_with(**apply_expected_args)
     else:
@@ -1079,6 +1297,7 @@ def test_handle_identical_resources(
             "wait_for_namespace": True,
             "recycle_pods": True,
             "privileged": False,
+            "server_side": False,
         }
         apply_mock.assert_called_with(**apply_expected_args)
     else:
@@ -0,0 +1,137 @@
+import copy
+import logging
+import time
+from typing import Any
+
+import pytest
+from pytest_mock import MockerFixture
+
+from reconcile.utils.openshift_resource import OpenshiftResource as OR
+from reconcile.utils.semver_helper import make_semver
+
+TEST_INT = "test_openshift_resources"
+TEST_INT_VER = make_semver(1, 9, 2)
+CORPUS_SIZE = 1000
+
+
+def deployment(i: int) -> dict[str, Any]:
+    return {
+        "apiVersion": "apps/v1",
+        "kind": "Deployment",
+        "metadata": {
+            "name": f"app-{i}",
+            "namespace": "app",
+            "uid": f"uid-{i}",
+            "resourceVersion": str(i),
+            "generation": 3,
+            "creationTimestamp": "2024-01-01T00:00:00Z",
+            "labels": {"app": f"app-{i}", "env": "production"},
+            "annotations": {
+                "deployment.kubernetes.io/revision": "3",
+                "qontract.integration": "openshift-saas-deploy",
+                "qontract.sha256sum": "0" * 64,
+            },
+            "managedFields": [{"manager": "kube-controller-manager"}] * 5,
+        },
+        "spec": {
+            "replicas": 3,
+            "selector": {"matchLabels": {"app": f"app-{i}"}},
+            "template": {
+                "metadata": {"labels": {"app": f"app-{i}"}},
+                "spec": {
+                    "containers": [
+                        {
+                            "name": f"container-{c}",
+                            "image": f"quay.io/app/app-{i}:{'a' * 40}",
+                            "env": [
+                                {"name": f"VAR_{v}", "value": str(v)} for v in range(20)
+                            ],
+                            "resources": {
+                                "limits": {"cpu": "1", "memory": "1Gi"},
+                                "requests": {"cpu": "100m", "memory": "512Mi"},
+                            },
+                        }
+                        for c in range(2)
+                    ],
+                },
+            },
+        },
+        "status": {"replicas": 3, "readyReplicas": 3},
+    }
+
+
+def secret(i: int) -> dict[str, Any]:
+    return {
+        "apiVersion": "v1",
+        "kind": "Secret",
+        "type": "Opaque",
+        "metadata": {"name": f"secret-{i}", "namespace": "app"},
+        "data": {f"key-{k}": "dmFsdWU=" * 10 for k in range(10)},
+        "stringData": {"password": f"password-{i}"},
+    }
+
+
+def route(i: int) -> dict[str, Any]:
+    return {
+        "apiVersion": "route.openshift.io/v1",
+        "kind": "Route",
+        "metadata": {
+            "name": f"route-{i}",
+            "annotations": {"kubernetes.io/tls-acme": "true"},
+        },
+        "spec": {
+            "host": f"app-{i}.example.com",
+            "to": {"kind": "Service", "name": f"app-{i}"},
+            "tls": {"termination": "edge", "key": "key", "certificate": "cert"},
+            "wildcardPolicy": "None",
+        },
+    }
+
+
+@pytest.fixture(scope="module")
+def corpus() -> list[dict[str, Any]]:
+    return [
+        build(i) for i in range(CORPUS_SIZE) for build in (deployment, secret, route)
+    ]
+
+
+def test_canonicalize_does_not_mutate_body(corpus: list[dict[str, Any]]) -> None:
+    for body in corpus:
+        original = copy.deepcopy(body)
+        canonical = OR.canonicalize(body)
+        assert body == original
+        assert canonical == OR.canonicalize(copy.deepcopy(body))
+        assert "status" not in canonical
+        assert "uid" not in canonical["metadata"]
+
+
+def test_sha256sum_is_memoised(
+    mocker: MockerFixture, corpus: list[dict[str, Any]]
+) -> None:
+    resources = [OR(body, TEST_INT, TEST_INT_VER) for body in corpus]
+    calculate = mocker.spy(OR, "calculate_sha256sum")
+
+    start = time.perf_counter()
+    digests = [r.sha256sum() for r in resources]
+    computed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    assert [r.sha256sum() for r in resources] == digests
+    cached = time.perf_counter() - start
+
+    logging.info(
+        f"sha256sum of {len(resources)} resources: {computed:.4f}s computed, "
+        f"{cached:.4f}s memoised"
+    )
+    assert [r.annotate().sha256sum() for r in resources] == digests
+    assert calculate.call_count == len(resources)
+
+
+def test_sha256sum_invalidated_on_body_assignment() -> None:
+    resource = OR(secret(0), TEST_INT, TEST_INT_VER)
+    digest = resource.sha256sum()
+
+    resource.body = secret(1)
+
+    assert resource.sha256sum() != digest
+    assert resource.sha256sum() == OR(secret(1), TEST_INT, TEST_INT_VER).sha256sum()
@@ -0,0 +1,340 @@
+import copy
+import json
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+import yaml
+
+from reconcile.utils.openshift_resource import (
+    IGNORABLE_DATA_FIELDS,
+    comparator_for_kind,
+)
+from reconcile.utils.openshift_resource import OpenshiftResource as OR
+from reconcile.utils.semver_helper import make_semver
+
+TEST_INT = "test_openshift_resources"
+TEST_INT_VER = make_semver(1, 9, 2)
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def legacy_obj_intersect_equal(kind: str, obj1: Any, obj2: Any, depth: int = 0) -> bool:
+    """The recursive comparison OpenshiftResource.__eq__ used before the
+    rule table, kept as the reference for the differential test."""
+    if obj1.__class__ != obj2.__class__:
+        return False
+
+    if isinstance(obj1, dict):
+        for obj1_k, obj1_v in obj1.items():
+            obj2_v = obj2.get(obj1_k, None)
+            if obj2_v is None:
+                if obj1_v:
+                    return False
+            if (
+                obj1_k
+                in {
+                    "kubectl.kubernetes.io/last-applied-configuration",
+                    "creationTimestamp",
+                    "resourceVersion",
+                    "generation",
+                    "selfLink",
+                    "uid",
+                    "fieldRef",
+                }
+                or (
+                    obj1_k in {"annotations", "divisor"}
+                    and {
+                        "annotations": None,
+                        "divisor": "0",
+                    }[obj1_k]
+                    == obj1_v
+                )
+                or (depth == 0 and obj1_k == "status")
+            ):
+                pass
+            elif obj1_k == "labels":
+                diff = [
+                    k
+                    for k in obj2_v
+                    if k not in obj1_v and not OR.is_controller_managed_label(kind, k)
+                ]
+                if diff or not legacy_obj_intersect_equal(
+                    kind, obj1_v, obj2_v, depth + 1
+                ):
+                    return False
+            elif obj1_k in {"data", "matchLabels"}:
+                diff = [
+                    k
+                    for k in obj2_v
+                    if k not in obj1_v and k not in IGNORABLE_DATA_FIELDS
+                ]
+                if diff or not legacy_obj_intersect_equal(
+                    kind, obj1_v, obj2_v, depth + 1
+                ):
+                    return False
+            elif obj1_k == "env":
+                for v in obj2_v or []:
+                    if "name" in v and len(v) == 1:
+                        v["value"] = ""
+                if not legacy_obj_intersect_equal(kind, obj1_v, obj2_v, depth + 1):
+                    return False
+            elif obj1_k == "cpu":
+                if not OR.cpu_equal(obj1_v, obj2_v):
+                    return False
+            elif obj1_k == "apiVersion":
+                if not OR.api_version_mutation(obj1_v, obj2_v):
+                    return False
+            elif obj1_k == "imagePullSecrets":
+                obj2_v_clean = [s for s in obj2_v if "-dockercfg-" not in s["name"]]
+                if not legacy_obj_intersect_equal(
+                    kind, obj1_v, obj2_v_clean, depth + 1
+                ):
+                    return False
+            elif not legacy_obj_intersect_equal(kind, obj1_v, obj2_v, depth + 1):
+                return False
+
+    elif isinstance(obj1, list):
+        if len(obj1) != len(obj2):
+            return False
+        for index, item in enumerate(obj1):
+            if not legacy_obj_intersect_equal(kind, item, obj2[index], depth + 1):
+                return False
+
+    elif obj1 != obj2:
+        return False
+
+    return True
+
+
+def find_resources(obj: Any) -> Iterator[dict[str, Any]]:
+    if isinstance(obj, dict):
+        if (
+            "apiVersion" in obj
+            and "kind" in obj
+            and isinstance(obj.get("metadata"), dict)
+            and "name" in obj["metadata"]
+        ):
+            yield obj
+        for v in obj.values():
+            yield from find_resources(v)
+    elif isinstance(obj, list):
+        for v in obj:
+            yield from find_resources(v)
+
+
+def recorded_resources() -> list[dict[str, Any]]:
+    resources: list[dict[str, Any]] = []
+    for path in sorted(FIXTURES_DIR.rglob("*")):
+        try:
+            if path.suffix in {".yml", ".yaml"}:
+                docs = list(yaml.safe_load_all(path.read_text()))
+            elif path.suffix == ".json":
+                docs = [json.loads(path.read_text())]
+            else:
+                continue
+        except (ValueError, yaml.YAMLError):
+            continue
+        for doc in docs:
+            resources.extend(find_resources(doc))
+    return resources
+
+
+def walk(obj: Any) -> Iterator[Any]:
+    yield obj
+    children = obj.values() if isinstance(obj, dict) else obj
+    if isinstance(obj, dict | list):
+        for child in children:
+            yield from walk(child)
+
+
+def as_cluster_state(body: dict[str, Any]) -> None:
+    body["metadata"].update({
+        "uid": "uid",
+        "resourceVersion": "1",
+        "creationTimestamp": "2024-01-01T00:00:00Z",
+        "generation": 2,
+    })
+    body["status"] = {"ready": True}
+
+
+def drop_empty_env_values(body: dict[str, Any]) -> None:
+    for obj in walk(body):
+        if isinstance(obj, dict) and isinstance(obj.get("env"), list):
+            obj["env"].append({"name": "EMPTY"})
+            for env in obj["env"]:
+                if not env.get("value"):
+                    env.pop("value", None)
+
+
+def add_empty_env_value(body: dict[str, Any]) -> None:
+    for obj in walk(body):
+        if isinstance(obj, dict) and isinstance(obj.get("env"), list):
+            obj["env"].append({"name": "EMPTY", "value": ""})
+
+
+def normalize_cpu(body: dict[str, Any]) -> None:
+    for obj in walk(body):
+        if isinstance(obj, dict) and isinstance(obj.get("cpu"), str):
+            cpu = obj["cpu"]
+            obj["cpu"] = int(cpu[:-1]) / 1000 if cpu.endswith("m") else f"{cpu}000m"
+
+
+def add_labels(body: dict[str, Any]) -> None:
+    body["metadata"].setdefault("labels", {})["extra"] = "label"
+
+
+def add_controller_managed_labels(body: dict[str, Any]) -> None:
+    body["metadata"].setdefault("labels", {}).update({
+        "clusterID": "id",
+        "feature.open-cluster-management.io/addon": "available",
+    })
+
+
+def add_data(body: dict[str, Any]) -> None:
+    data = body.setdefault("data", {})
+    if isinstance(data, dict):
+        data["service-ca.crt"] = "ca"
+
+
+def add_unknown_data(body: dict[str, Any]) -> None:
+    data = body.setdefault("data", {})
+    if isinstance(data, dict):
+        data["unknown"] = "value"
+
+
+def add_pull_secrets(body: dict[str, Any]) -> None:
+    for obj in walk(body):
+        if isinstance(obj, dict) and "containers" in obj:
+            obj.setdefault("imagePullSecrets", []).append({
+                "name": "default-dockercfg-abcde"
+            })
+
+
+def mutate_api_version(body: dict[str, Any]) -> None:
+    if body["apiVersion"] == "apps/v1":
+        body["apiVersion"] = "extensions/v1beta1"
+    else:
+        body["apiVersion"] = "v2"
+
+
+def change_first_leaf(body: dict[str, Any]) -> None:
+    for obj in walk(body.get("spec", body)):
+        if isinstance(obj, dict):
+            for k, v in obj.items():
+                if isinstance(v, str | int) and not isinstance(v, bool):
+                    obj[k] = f"{v}-changed"
+                    return
+
+
+def drop_first_key(body: dict[str, Any]) -> None:
+    spec = body.get("spec")
+    if isinstance(spec, dict) and spec:
+        spec.pop(next(iter(spec)))
+
+
+def null_annotations(body: dict[str, Any]) -> None:
+    body["metadata"]["annotations"] = None
+
+
+def zero_divisor(body: dict[str, Any]) -> None:
+    for obj in walk(body):
+        if isinstance(obj, dict) and "resourceFieldRef" in obj:
+            obj["resourceFieldRef"]["divisor"] = "0"
+            return
+    body["divisor"] = "0"
+
+
+MUTATIONS: list[Callable[[dict[str, Any]], None]] = [
+    as_cluster_state,
+    drop_empty_env_values,
+    add_empty_env_value,
+    normalize_cpu,
+    add_labels,
+    add_controller_managed_labels,
+    add_data,
+    add_unknown_data,
+    add_pull_secrets,
+    mutate_api_version,
+    change_first_leaf,
+    drop_first_key,
+    null_annotations,
+    zero_divisor,
+]
+
+
+@pytest.fixture(scope="module")
+def corpus() -> list[dict[str, Any]]:
+    return recorded_resources()
+
+
+def test_recorded_corpus(corpus: list[dict[str, Any]]) -> None:
+    assert len(corpus) > 100
+
+
+@pytest.mark.parametrize("mutation", [None, *MUTATIONS])
+def test_comparator_matches_legacy_implementation(
+    corpus: list[dict[str, Any]],
+    mutation: Callable[[dict[str, Any]], None] | None,
+) -> None:
+    for body in corpus:
+        desired = copy.deepcopy(body)
+        current = copy.deepcopy(body)
+        if mutation:
+            mutation(current)
+        for obj1, obj2 in ((desired, current), (current, desired)):
+            kind = obj1["kind"]
+            snapshot = (copy.deepcopy(obj1), copy.deepcopy(obj2))
+            try:
+                expected: Any = legacy_obj_intersect_equal(
+                    kind, copy.deepcopy(obj1), copy.deepcopy(obj2)
+                )
+            except (TypeError, KeyError, AttributeError) as e:
+                expected = type(e)
+            try:
+                actual: Any = comparator_for_kind(kind).equal(obj1, obj2)
+            except (TypeError, KeyError, AttributeError) as e:
+                actual = type(e)
+            assert actual == expected, (mutation, obj1, obj2)
+            assert (obj1, obj2) == snapshot
+
+
+def test_eq_does_not_mutate_current() -> None:
+    desired: dict[str, Any] = {
+        "apiVersion": "v1",
+        "kind": "Pod",
+        "metadata": {"name": "pod"},
+        "spec": {"containers": [{"name": "c", "env": [{"name": "A", "value": ""}]}]},
+    }
+    current = copy.deepcopy(desired)
+    current["spec"]["containers"][0]["env"] = [{"name": "A"}]
+    snapshot = copy.deepcopy(current)
+
+    assert OR(desired, TEST_INT, TEST_INT_VER) == OR(current, TEST_INT, TEST_INT_VER)
+    assert current == snapshot
+
+
+def test_eq_short_circuits_on_valid_digests(mocker: Any) -> None:
+    body = {
+        "apiVersion": "v1",
+        "kind": "Role",
+        "metadata": {"name": "role"},
+        "rules": [{"verbs": ["list", "get"]}],
+    }
+    annotated = OR(body, TEST_INT, TEST_INT_VER).annotate()
+    reordered = copy.deepcopy(annotated.body)
+    reordered["rules"][0]["verbs"].reverse()
+    other = OR(reordered, TEST_INT, TEST_INT_VER)
+    equal = mocker.patch.object(comparator_for_kind("Role"), "equal")
+
+    assert annotated == other
+    equal.assert_not_called()
+
+
+def test_eq_invalid_digest_uses_comparator() -> None:
+    body = {"apiVersion": "v1", "kind": "ConfigMap", "metadata": {"name": "cm"}}
+    annotated = OR(body, TEST_INT, TEST_INT_VER).annotate()
+    changed = copy.deepcopy(annotated.body)
+    changed["data"] = {"k": "v"}
+
+    assert OR(changed, TEST_INT, TEST_INT_VER) != annotated
@@ -36,7 +36,7 @@ def oc_cs1(self) -> oc.OCClient:
         "Template": ["template.openshift.io/v1"],
         "Subscription": ["apps.open-cluster-management.io/v1", "operators.coreos.com"],
     }
-    client.get_items = lambda kind, **kwargs: []
+    client.iter_items = lambda kind, **kwargs: iter([])  # type: ignore[method-assign]
     return client
 
 
@@ -124,7 +124,7 @@ def test_fetch_current_state_ri_not_initialized(
     oc_cs1: oc.OCClient, tmpl1: dict[str, Any]
 ):
     ri = ResourceInventory()
-    oc_cs1.get_items = lambda kind, **kwargs: [tmpl1]  # type: ignore[method-assign]
+    oc_cs1.iter_items = lambda kind, **kwargs: iter([tmpl1])  # type: ignore[method-assign]
     ri.initialize_resource_type("cs1", "wrong_namespace", "Template")
     ri.initialize_resource_type("wrong_cluster", "ns1", "Template")
     ri.initialize_resource_type("cs1", "ns1", "wrong_kind")
@@ -145,7 +145,7 @@ def test_fetch_current_state_ri_not_initialized(
 def test_fetch_current_state_ri_initialized(oc_cs1: oc.OCClient, tmpl1: dict[str, Any]):
     ri = ResourceInventory()
     ri.initialize_resource_type("cs1", "ns1", "Template")
-    oc_cs1.get_items = lambda kind, **kwargs: [tmpl1]  # type: ignore[method-assign]
+    oc_cs1.iter_items = lambda kind, **kwargs: iter([tmpl1])  # type: ignore[method-assign]
     orb.fetch_current_state(
         oc=oc_cs1,
         ri=ri,
@@ -168,7 +168,7 @@ def test_fetch_current_state_kind_not_supported(
 ):
     ri = ResourceInventory()
     ri.initialize_resource_type("cs1", "ns1", "AnUnsupportedKind")
-    oc_cs1.get_items = lambda kind, **kwargs: [tmpl1]
+    oc_cs1.iter_items = lambda kind, **kwargs: iter([tmpl1])  # type: ignore[method-assign]
     orb.fetch_current_state(
         oc=oc_cs1,
         ri=ri,
@@ -185,7 +185,7 @@ def test_fetch_current_state_kind_not_supported(
 def test_fetch_current_state_long_kind(oc_cs1: oc.OCClient, tmpl1: dict[str, Any]):
     ri = ResourceInventory()
     ri.initialize_resource_type("cs1", "ns1", "Template.template.openshift.io")
-    oc_cs1.get_items = lambda kind, **kwargs: [tmpl1]  # type: ignore
+    oc_cs1.iter_items = lambda kind, **kwargs: [tmpl1]  # type: ignore
     orb.fetch_current_state(
         oc=oc_cs1,
         ri=ri,
@@ -208,7 +208,7 @@ def test_fetch_current_state_long_kind_not_supported(
 ):
     ri = ResourceInventory()
     ri.initialize_resource_type("cs1", "ns1", "UnknownKind.mysterious.io")
-    oc_cs1.get_items = lambda kind, **kwargs: [tmpl1]
+    oc_cs1.iter_items = lambda kind, **kwargs: iter([tmpl1])  # type: ignore[method-assign]
     orb.fetch_current_state(
         oc=oc_cs1,
         ri=ri,
@@ -225,7 +225,7 @@ def test_fetch_current_state_long_kind_not_supported(
 def test_fetch_states(current_state_spec: CurrentStateSpec, tmpl1: dict[str, Any]):
     ri = ResourceInventory()
     ri.initialize_resource_type("cs1", "ns1", "Template")
-    current_state_spec.oc.get_items = lambda kind, **kwargs: [tmpl1]  # type: ignore[method-assign]
+    current_state_spec.oc.iter_items = lambda kind, **kwargs: iter([tmpl1])  # type: ignore[method-assign]
     orb.fetch_states(ri=ri, spec=current_state_spec)
     _, _, _, resource = next(iter(ri))
     assert len(resource["current"]) == 1
@@ -243,7 +243,7 @@ def test_fetch_states_unknown_kind(current_state_spec: CurrentStateSpec):
 
 
 def test_fetch_states_oc_error(current_state_spec: CurrentStateSpec):
-    current_state_spec.oc.get_items = Mock(  # type: ignore[method-assign]
+    current_state_spec.oc.iter_items = Mock(  # type: ignore[method-assign]
         side_effect=oc.StatusCodeError("something wrong with openshift")
     )
     ri = ResourceInventory()
@@ -476,3 +476,246 @@ def test_secret_keys(test_parameters, exception_expected):
             orb.assert_valid_secret_keys(test_parameters)
     else:
         orb.assert_valid_secret_keys(test_parameters)
+
+
+#
+# incremental desired state
+#
+
+
+@pytest.fixture
+def template_resource() -> dict[str, Any]:
+    return {
+        "provider": "resource-template",
+        "resource": {
+            "path": "/cm.yml",
+            "content": "kind: ConfigMap\napiVersion: v1\nmetadata:\n  name: cm\n",
+        },
+        "variables": None,
+        "type": "jinja2",
+    }
+
+
+@pytest.fixture
+def parent() -> dict[str, Any]:
+    return {"name": "ns1", "cluster": {"name": "cs1"}, "openshiftResources": []}
+
+
+def test_desired_state_fingerprint_stable(
+    template_resource: dict[str, Any], parent: dict[str, Any]
+) -> None:
+    fingerprint = orb.desired_state_fingerprint(template_resource, parent)
+    rendered = template_resource | {"namespace": parent}
+    other_resources = parent | {"openshiftResources": [template_resource]}
+
+    assert fingerprint
+    assert orb.desired_state_fingerprint(rendered, other_resources) == fingerprint
+
+
+def test_desired_state_fingerprint_changes(
+    template_resource: dict[str, Any], parent: dict[str, Any]
+) -> None:
+    fingerprint = orb.desired_state_fingerprint(template_resource, parent)
+    changed = copy.deepcopy(template_resource)
+    changed["variables"] = '{"a": "b"}'
+
+    assert orb.desired_state_fingerprint(changed, parent) != fingerprint
+    assert (
+        orb.desired_state_fingerprint(template_resource, parent | {"name": "ns2"})
+        != fingerprint
+    )
+
+
+def test_desired_state_fingerprint_vault_secret_ignores_parent(
+    parent: dict[str, Any],
+) -> None:
+    secret = {"provider": "vault-secret", "path": "a/b", "version": 1}
+
+    assert orb.desired_state_fingerprint(
+        secret, parent
+    ) == orb.desired_state_fingerprint(secret, parent | {"name": "ns2"})
+    assert orb.desired_state_fingerprint(
+        secret, parent
+    ) != orb.desired_state_fingerprint(secret | {"version": 2}, parent)
+
+
+@pytest.fixture
+def configmap() -> orb.OR:
+    body = {"apiVersion": "v1", "kind": "ConfigMap", "metadata": {"name": "cm"}}
+    return orb.OR(body, orb.QONTRACT_INTEGRATION, orb.QONTRACT_INTEGRATION_VERSION)
+
+
+@pytest.fixture
+def digests_ri(configmap: orb.OR) -> ResourceInventory:
+    ri = ResourceInventory()
+    ri.initialize_resource_type("cs1", "ns1", "ConfigMap")
+    ri.add_current("cs1", "ns1", "ConfigMap", "cm", configmap.annotate())
+    return ri
+
+
+def build_digests(mocker, configmap: orb.OR) -> orb.DesiredStateDigests:
+    state = mocker.Mock()
+    state.get.return_value = {
+        "ns1/fp": {
+            "kind": "ConfigMap",
+            "kind_and_group": "ConfigMap",
+            "name": "cm",
+            "sha256sum": configmap.sha256sum(),
+            "impure": False,
+        }
+    }
+    return orb.DesiredStateDigests(state, ["cs1"])
+
+
+def test_desired_state_digests_reuse(
+    mocker, configmap: orb.OR, digests_ri: ResourceInventory
+) -> None:
+    digests = build_digests(mocker, configmap)
+
+    reused = digests.reuse(digests_ri, "cs1", "ns1", "fp")
+
+    assert reused is not None
+    assert reused.name == "cm"
+    assert digests.reuse(digests_ri, "cs1", "ns1", "other") is None
+    assert digests.reuse(digests_ri, "cs1", "ns2", "fp") is None
+
+
+@pytest.mark.parametrize("entry", [{"impure": True}, {}])
+def test_desired_state_digests_reuse_impure(
+    mocker, configmap: orb.OR, digests_ri: ResourceInventory, entry: dict[str, Any]
+) -> None:
+    digests = build_digests(mocker, configmap)
+    digests._previous["cs1"]["ns1/fp"].pop("impure")
+    digests._previous["cs1"]["ns1/fp"] |= entry
+
+    assert digests.reuse(digests_ri, "cs1", "ns1", "fp") is None
+
+
+def test_desired_state_digests_reuse_changed_on_cluster(
+    mocker, configmap: orb.OR, digests_ri: ResourceInventory
+) -> None:
+    digests = build_digests(mocker, configmap)
+    current = digests_ri.get_current("cs1", "ns1", "ConfigMap", "cm")
+    current.body |= {"data": {"manual": "change"}}
+
+    assert digests.reuse(digests_ri, "cs1", "ns1", "fp") is None
+
+
+def test_desired_state_digests_save(mocker, configmap: orb.OR) -> None:
+    state = mocker.MagicMock()
+    state.get.return_value = {
+        "ns1/old": {"name": "old"},
+        "ns2/other": {"name": "other"},
+    }
+    digests = orb.DesiredStateDigests(state, ["cs1"])
+    digests.record("cs1", "ns1", "fp", configmap)
+
+    digests.save()
+
+    state.__setitem__.assert_called_once_with(
+        "desired-state-digests/cs1",
+        {
+            "ns2/other": {"name": "other"},
+            "ns1/fp": {
+                "kind": "ConfigMap",
+                "kind_and_group": "ConfigMap",
+                "name": "cm",
+                "sha256sum": configmap.sha256sum(),
+                "impure": False,
+            },
+        },
+    )
+
+
+def test_fetch_desired_state_reuses_unchanged_resource(
+    mocker,
+    configmap: orb.OR,
+    digests_ri: ResourceInventory,
+    template_resource: dict[str, Any],
+    parent: dict[str, Any],
+) -> None:
+    digests = build_digests(mocker, configmap)
+    mocker.patch.object(orb, "desired_state_fingerprint", return_value="fp")
+    fetch = mocker.patch.object(orb, "fetch_openshift_resource", autospec=True)
+
+    orb.fetch_desired_state(
+        oc=mocker.Mock(),
+        ri=digests_ri,
+        cluster="cs1",
+        namespace="ns1",
+        resource=template_resource,
+        parent=parent,
+        privileged=False,
+        digests=digests,
+    )
+
+    fetch.assert_not_called()
+    assert digests_ri.get_desired("cs1", "ns1", "ConfigMap", "cm") is not None
+
+
+def test_fetch_desired_state_renders_changed_resource(
+    mocker,
+    configmap: orb.OR,
+    template_resource: dict[str, Any],
+    parent: dict[str, Any],
+) -> None:
+    ri = ResourceInventory()
+    ri.initialize_resource_type("cs1", "ns1", "ConfigMap")
+    digests = build_digests(mocker, configmap)
+    mocker.patch.object(orb, "desired_state_fingerprint", return_value="fp")
+    fetch = mocker.patch.object(
+        orb, "fetch_openshift_resource", autospec=True, return_value=configmap
+    )
+
+    orb.fetch_desired_state(
+        oc=mocker.Mock(),
+        ri=ri,
+        cluster="cs1",
+        namespace="ns1",
+        resource=template_resource,
+        parent=parent,
+        privileged=False,
+        digests=digests,
+    )
+
+    fetch.assert_called_once()
+    assert ri.get_desired("cs1", "ns1", "ConfigMap", "cm") is configmap
+
+
+@pytest.mark.parametrize(
+    "content,impure",
+    [
+        ("  name: cm\n", False),
+        ("  name: cm\ndata:\n  a: {{ vault('a', 'b') }}\n", True),
+        ("  name: cm\ndata:\n  {% set v = vault %}a: {{ v('a', 'b') }}\n", True),
+    ],
+)
+def test_fetch_desired_state_records_impure_rendering(
+    mocker,
+    template_resource: dict[str, Any],
+    parent: dict[str, Any],
+    content: str,
+    impure: bool,
+) -> None:
+    mocker.patch.object(orb.jinja2_utils, "lookup_secret", return_value="secret")
+    template_resource["resource"]["content"] = (
+        "kind: ConfigMap\napiVersion: v1\nmetadata:\n" + content
+    )
+    ri = ResourceInventory()
+    ri.initialize_resource_type("cs1", "ns1", "ConfigMap")
+    digests = orb.DesiredStateDigests(mocker.Mock(get=lambda *_: {}), ["cs1"])
+
+    orb.fetch_desired_state(
+        oc=mocker.Mock(),
+        ri=ri,
+        cluster="cs1",
+        namespace="ns1",
+        resource=template_resource,
+        parent=parent,
+        privileged=False,
+        settings={},
+        digests=digests,
+    )
+
+    [entry] = digests._current["cs1"].values()
+    assert entry["impure"] is impure
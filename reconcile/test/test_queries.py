@@ -51,3 +51,14 @@ class TestQueries:
 
         for k in ["retention", "deployResources"]:
             assert data["pipelines_providers"][0][k] == pps[0][k]
+
+    def test_get_namespaces_projects_fields(self) -> None:
+        self.fixture_data = {"namespaces": [{"name": "ns", "cluster": {"name": "c"}}]}
+
+        namespaces = queries.get_namespaces(fields=["name", "cluster.name"])
+
+        assert namespaces == [{"name": "ns", "cluster": {"name": "c"}}]
+        (query,) = self.gql.return_value.query.call_args.args
+        assert " ".join(query.split()) == (
+            "{ namespaces: namespaces_v1 { name cluster { name } } }"
+        )
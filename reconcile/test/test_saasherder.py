@@ -12,12 +12,14 @@ from unittest.mock import (
 )
 
 import pytest
+import requests
 import yaml
 from github import (
     Github,
     GithubException,
 )
 from pydantic import BaseModel
+from sretoolbox.container import Image
 
 from reconcile.gql_definitions.common.saas_files import (
     SaasResourceTemplateTargetImageV1,
@@ -665,9 +667,13 @@ class TestGetContainerImagesDiffSaasFile(TestCase):
             SaasHerder, "_get_commit_sha", autospec=True
         )
         self.get_image_patcher = patch.object(SaasHerder, "_get_image", autospec=True)
+        self.image_cache_patcher = patch(
+            "reconcile.utils.saasherder.saasherder.IMAGE_CACHE"
+        )
         self.initiate_gh = self.initiate_gh_patcher.start()
         self.get_commit_sha = self.get_commit_sha_patcher.start()
         self.get_image = self.get_image_patcher.start()
+        self.image_cache = self.image_cache_patcher.start()
         self.maxDiff = None
 
     def tearDown(self) -> None:
@@ -675,6 +681,7 @@ class TestGetContainerImagesDiffSaasFile(TestCase):
             self.initiate_gh_patcher,
             self.get_commit_sha_patcher,
             self.get_image_patcher,
+            self.image_cache_patcher,
         ):
             p.stop()
 
@@ -749,6 +756,29 @@ class TestGetContainerImagesDiffSaasFile(TestCase):
             expected,
         )
 
+    def test_get_container_images_diff_saas_file_cached_image(self) -> None:
+        saasherder = SaasHerder(
+            [self.saas_file],
+            secret_reader=MockSecretReader(),
+            thread_pool_size=1,
+            integration="",
+            integration_version="",
+            hash_length=7,
+            repo_url="https://repo-url.com",
+        )
+        saasherder.state = MagicMock()
+        saasherder.state.get.return_value = "asha"
+        self.get_commit_sha.return_value = "abcd4242"
+        self.get_image.return_value = Image("quay.io/centos/centos:abcd424")
+        self.image_cache.digest.return_value = "sha256:" + "0" * 64
+
+        with patch.object(
+            requests, "request", side_effect=AssertionError("registry called")
+        ):
+            diff = saasherder.get_container_images_diff_saas_file(self.saas_file, True)
+
+        self.assertEqual(len(diff), 1)
+
 
 @pytest.mark.usefixtures("inject_gql_class_factory")
 class TestGetArchiveInfo(TestCase):
@@ -1065,6 +1095,8 @@ class TestConfigHashPromotionsValidation(TestCase):
 
         self.gfc_patcher = patch.object(SaasHerder, "_get_file_contents", autospec=True)
         gfc_mock = self.gfc_patcher.start()
+        # setUp fails on errors registered while populating the desired state
+        self.addCleanup(self.gfc_patcher.stop)
         gfc_mock.return_value = (self.template, "ahash")
 
         self.deploy_current_state_fxt = self.fxt.get_anymarkup("saas_deploy.state.json")
@@ -1099,7 +1131,6 @@ class TestConfigHashPromotionsValidation(TestCase):
     def tearDown(self) -> None:
         self.state_patcher.stop()
         self.ig_patcher.stop()
-        self.gfc_patcher.stop()
 
     def test_promotion_state_config_hash_match_validates(self) -> None:
         """A promotion is valid if the parent target config_hash set in
@@ -1267,6 +1298,8 @@ class TestSoakDays(TestCase):
 
         self.gfc_patcher = patch.object(SaasHerder, "_get_file_contents", autospec=True)
         gfc_mock = self.gfc_patcher.start()
+        # setUp fails on errors registered while populating the desired state
+        self.addCleanup(self.gfc_patcher.stop)
         gfc_mock.return_value = (self.template, "ahash")
 
         self.deploy_current_state_fxt = self.fxt.get_anymarkup("saas_deploy.state.json")
@@ -1301,7 +1334,6 @@ class TestSoakDays(TestCase):
     def tearDown(self) -> None:
         self.state_patcher.stop()
         self.ig_patcher.stop()
-        self.gfc_patcher.stop()
 
     def test_soak_days_passed(self) -> None:
         """A promotion is valid if the parent targets accumulated soak_days
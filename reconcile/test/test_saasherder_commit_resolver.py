@@ -0,0 +1,117 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from reconcile.utils.saasherder.commit_resolver import (
+    BULK_REF_THRESHOLD,
+    CommitResolver,
+)
+
+GITHUB_URL = "https://github.com/app-sre/app"
+GITLAB_URL = "https://gitlab.example.com/app-sre/app"
+BRANCHES = [f"branch-{i}" for i in range(BULK_REF_THRESHOLD)]
+
+
+def git_ref(ref: str, sha: str) -> MagicMock:
+    r = MagicMock(ref=ref)
+    r.object.sha = sha
+    return r
+
+
+def paginated(items: list[MagicMock]) -> MagicMock:
+    refs = MagicMock(totalCount=len(items))
+    refs.__iter__.side_effect = lambda: iter(items)
+    return refs
+
+
+@pytest.fixture
+def github() -> MagicMock:
+    github = MagicMock(per_page=100)
+    repo = github.get_repo.return_value
+    repo.get_commit.side_effect = lambda sha: MagicMock(sha=f"api-{sha}")
+    repo.get_git_matching_refs.side_effect = lambda prefix: paginated(
+        [git_ref(f"refs/heads/{b}", f"head-{b}") for b in [*BRANCHES, "release"]]
+        if prefix == "heads/"
+        else [git_ref("refs/tags/release", "tag-object")]
+    )
+    return github
+
+
+def test_resolve_is_memoized(github: MagicMock) -> None:
+    resolver = CommitResolver()
+
+    assert resolver.resolve(GITHUB_URL, "main", github) == "api-main"
+    assert resolver.resolve(GITHUB_URL, "main", github) == "api-main"
+    github.get_repo.return_value.get_commit.assert_called_once_with(sha="main")
+
+
+def test_resolve_commit_sha_without_api(github: MagicMock) -> None:
+    sha = "a" * 40
+
+    assert CommitResolver().resolve(GITHUB_URL, sha, github) == sha
+    github.get_repo.assert_not_called()
+
+
+def test_resolve_does_not_memoize_errors(github: MagicMock) -> None:
+    resolver = CommitResolver()
+    repo = github.get_repo.return_value
+    repo.get_commit.side_effect = [Exception("rate limited"), MagicMock(sha="abc")]
+
+    with pytest.raises(Exception, match="rate limited"):
+        resolver.resolve(GITHUB_URL, "main", github)
+    assert resolver.resolve(GITHUB_URL, "main", github) == "abc"
+
+
+def test_prefetch_lists_branches_of_repos_with_many_refs(github: MagicMock) -> None:
+    resolver = CommitResolver()
+    refs = [(GITHUB_URL, ref) for ref in [*BRANCHES, "release", "v1.0"]]
+
+    resolver.prefetch(refs, github=lambda url: github)
+
+    assert [resolver.resolve(GITHUB_URL, b, github) for b in BRANCHES] == [
+        f"head-{b}" for b in BRANCHES
+    ]
+    repo = github.get_repo.return_value
+    repo.get_commit.assert_not_called()
+    # both a branch and a tag, and not a branch at all, are left to the API
+    assert resolver.resolve(GITHUB_URL, "release", github) == "api-release"
+    assert resolver.resolve(GITHUB_URL, "v1.0", github) == "api-v1.0"
+
+
+def test_prefetch_skips_repos_with_few_refs(github: MagicMock) -> None:
+    resolver = CommitResolver()
+
+    resolver.prefetch([(GITHUB_URL, "main")] * 20, github=lambda url: github)
+
+    github.get_repo.assert_not_called()
+
+
+def test_prefetch_skips_repos_with_many_branches(github: MagicMock) -> None:
+    # listing takes a request per branch, no cheaper than resolving the refs
+    github.per_page = 1
+    resolver = CommitResolver()
+
+    resolver.prefetch([(GITHUB_URL, b) for b in BRANCHES], github=lambda url: github)
+
+    assert resolver.resolve(GITHUB_URL, BRANCHES[0], github) == f"api-{BRANCHES[0]}"
+
+
+def test_prefetch_gitlab() -> None:
+    gitlab = MagicMock()
+    project = gitlab.get_project.return_value
+    project.branches.list.return_value.total_pages = 1
+    project.tags.list.return_value.total_pages = 1
+    branches = [MagicMock(commit={"id": f"head-{b}"}) for b in BRANCHES]
+    for branch, name in zip(branches, BRANCHES, strict=True):
+        branch.name = name
+    gitlab.get_items.side_effect = lambda method: (
+        branches if method == gitlab.get_project.return_value.branches.list else []
+    )
+    resolver = CommitResolver(gitlab)
+
+    resolver.prefetch([(GITLAB_URL, b) for b in BRANCHES], github=MagicMock())
+
+    assert resolver.resolve(GITLAB_URL, BRANCHES[0], MagicMock()) == (
+        f"head-{BRANCHES[0]}"
+    )
+    gitlab.get_project.return_value.commits.list.assert_not_called()
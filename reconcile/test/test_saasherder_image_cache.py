@@ -0,0 +1,155 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, cast
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from pytest_mock import MockerFixture
+from sretoolbox.container import Image
+
+from reconcile.utils.disk_cache import DiskCache
+from reconcile.utils.saasherder import image_cache
+from reconcile.utils.saasherder.image_cache import (
+    ImageCache,
+    is_immutable,
+    url_digest,
+)
+from reconcile.utils.state import State
+
+DIGEST = "sha256:" + "0" * 64
+IMAGE = "quay.io/app-sre/app:abcdef1"
+
+
+def manifest_response(status: HTTPStatus = HTTPStatus.OK) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    if status == HTTPStatus.OK:
+        response.headers["Docker-Content-Digest"] = DIGEST
+    response._content = b"{}"
+    return response
+
+
+@pytest.fixture
+def registry(mocker: MockerFixture) -> MagicMock:
+    """The HTTP layer under sretoolbox, every image exists."""
+    return mocker.patch.object(
+        requests, "request", side_effect=lambda *args, **kwargs: manifest_response()
+    )
+
+
+@pytest.mark.parametrize(
+    "image, immutable",
+    [
+        ("quay.io/app-sre/app:abcdef1", True),
+        ("quay.io/app-sre/app:stable-abcdef1", True),
+        (f"quay.io/app-sre/app@{DIGEST}", True),
+        ("quay.io/app-sre/app:latest", False),
+        ("quay.io/app-sre/app:v1.0.0", False),
+        ("quay.io/app-sre/app:20241018", False),
+        ("quay.io/app-sre/app:1234567", False),
+        ("quay.io/app-sre/app:build-20241018", False),
+    ],
+)
+def test_is_immutable(image: str, immutable: bool) -> None:
+    assert is_immutable(Image(image)) == immutable
+
+
+def test_url_digest() -> None:
+    assert url_digest(Image(IMAGE), DIGEST) == f"quay.io/app-sre/app@{DIGEST}"
+
+
+def test_image_cache_key_depends_on_user() -> None:
+    assert ImageCache.key(Image(IMAGE)) == ImageCache.key(Image(IMAGE))
+    assert ImageCache.key(Image(IMAGE)) != ImageCache.key(
+        Image(IMAGE, username="user", password="password")
+    )
+
+
+def test_image_cache_tiers(tmp_path: Path, registry: MagicMock) -> None:
+    # a dict quacks like the State the shared tier needs
+    shared = cast("State", {})
+
+    cache = ImageCache(DiskCache(str(tmp_path / "a")), shared)
+    assert cache.digest(Image(IMAGE)) == DIGEST
+    # another pod, found in the shared tier
+    other_disk = DiskCache(str(tmp_path / "b"))
+    assert ImageCache(other_disk, shared).digest(Image(IMAGE)) == DIGEST
+    # another process on the same host, found on disk
+    assert ImageCache(other_disk).digest(Image(IMAGE)) == DIGEST
+    registry.assert_called_once()
+
+
+def test_image_cache_shares_immutable_tags_only(
+    tmp_path: Path, registry: MagicMock
+) -> None:
+    shared: dict[str, str] = {}
+    cache = ImageCache(DiskCache(str(tmp_path)), cast("State", shared))
+
+    cache.digest(Image("quay.io/app-sre/app:latest"))
+
+    assert not shared
+
+
+def test_image_cache_expires_mutable_tags(
+    mocker: MockerFixture, tmp_path: Path, registry: MagicMock
+) -> None:
+    mocker.patch.object(image_cache, "MUTABLE_TAG_TTL", -1)
+    cache = ImageCache(DiskCache(str(tmp_path)))
+
+    for _ in range(2):
+        assert cache.digest(Image("quay.io/app-sre/app:latest")) == DIGEST
+        assert cache.digest(Image(IMAGE)) == DIGEST
+
+    assert registry.call_count == 3
+
+
+def test_image_cache_does_not_cache_missing_images(
+    mocker: MockerFixture, tmp_path: Path, registry: MagicMock
+) -> None:
+    # sretoolbox retries the manifest request of missing images
+    mocker.patch.object(time, "sleep")
+    registry.side_effect = lambda *args, **kwargs: manifest_response(
+        HTTPStatus.NOT_FOUND
+    )
+    cache = ImageCache(DiskCache(str(tmp_path)))
+
+    assert cache.digest(Image(IMAGE)) is None
+    registry.side_effect = lambda *args, **kwargs: manifest_response()
+    assert cache.digest(Image(IMAGE)) == DIGEST
+
+
+def test_image_cache_coalesces_lookups(tmp_path: Path, registry: MagicMock) -> None:
+    started = threading.Event()
+    release = threading.Event()
+
+    def get_manifest(*args: Any, **kwargs: Any) -> requests.Response:
+        started.set()
+        release.wait(timeout=5)
+        return manifest_response()
+
+    registry.side_effect = get_manifest
+    cache = ImageCache(DiskCache(str(tmp_path)))
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(cache.digest, Image(IMAGE))
+        started.wait(timeout=5)
+        second = executor.submit(cache.digest, Image(IMAGE))
+        release.set()
+        assert first.result() == second.result() == DIGEST
+    registry.assert_called_once()
+
+
+def test_image_cache_hit_does_not_call_registry(
+    tmp_path: Path, registry: MagicMock
+) -> None:
+    cache = ImageCache(DiskCache(str(tmp_path)))
+    assert cache.digest(Image(IMAGE)) == DIGEST
+    registry.side_effect = AssertionError("the registry was called on a cache hit")
+
+    assert cache.digest(Image(IMAGE)) == DIGEST
+    # another process on the same host, found on disk
+    assert ImageCache(DiskCache(str(tmp_path))).digest(Image(IMAGE)) == DIGEST
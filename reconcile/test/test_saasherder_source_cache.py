@@ -0,0 +1,87 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import cast
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+
+from reconcile.utils.disk_cache import DiskCache
+from reconcile.utils.saasherder import saasherder
+from reconcile.utils.saasherder.saasherder import SaasHerder
+from reconcile.utils.saasherder.source_cache import SourceCache
+from reconcile.utils.state import State
+
+URL = "https://github.com/app-sre/app"
+KEY = SourceCache.key("file", URL, "/openshift/template.yml", "abc")
+
+
+@pytest.fixture
+def source_cache(mocker: MockerFixture, tmp_path: Path) -> SourceCache:
+    cache = SourceCache(DiskCache(str(tmp_path)))
+    mocker.patch.object(saasherder, "SOURCE_CACHE", cache)
+    return cache
+
+
+def test_source_cache_key_depends_on_location_and_sha() -> None:
+    assert SourceCache.key("file", URL + "/", "openshift/template.yml", "abc") == KEY
+    assert SourceCache.key("file", URL, "/openshift/template.yml", "def") != KEY
+    assert SourceCache.key("directory", URL, "/openshift/template.yml", "abc") != KEY
+
+
+def test_source_cache_tiers(tmp_path: Path) -> None:
+    # a dict quacks like the State the shared tier needs
+    shared = cast("State", {})
+    fetch = MagicMock(return_value="content")
+
+    assert SourceCache(DiskCache(str(tmp_path / "a")), shared).get(KEY, fetch) == (
+        "content"
+    )
+    # another pod, found in the shared tier
+    other_disk = DiskCache(str(tmp_path / "b"))
+    assert SourceCache(other_disk, shared).get(KEY, fetch) == "content"
+    # another process on the same host, found on disk
+    assert SourceCache(other_disk).get(KEY, fetch) == "content"
+    fetch.assert_called_once()
+
+
+def test_source_cache_coalesces_fetches(source_cache: SourceCache) -> None:
+    started = threading.Event()
+    release = threading.Event()
+
+    def fetch() -> str:
+        started.set()
+        release.wait(timeout=5)
+        return "content"
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(source_cache.get, KEY, fetch)
+        started.wait(timeout=5)
+        second = executor.submit(source_cache.get, KEY, MagicMock())
+        release.set()
+        assert first.result() == second.result() == "content"
+    second_fetch = MagicMock()
+    assert source_cache.get(KEY, second_fetch) == "content"
+    second_fetch.assert_not_called()
+
+
+def test_source_cache_does_not_cache_errors(source_cache: SourceCache) -> None:
+    with pytest.raises(ValueError):
+        source_cache.get(KEY, MagicMock(side_effect=ValueError("not found")))
+
+    assert source_cache.get(KEY, lambda: "content") == "content"
+
+
+def test_get_file_contents_fetches_once_per_commit(source_cache: SourceCache) -> None:
+    herder = MagicMock()
+    herder._get_commit_sha.side_effect = ["abc", "abc", "def"]
+    herder._fetch_file_contents.return_value = "kind: Template\n"
+
+    for _ in range(3):
+        content, _ = SaasHerder._get_file_contents(
+            herder, URL, "/openshift/template.yml", "master", MagicMock()
+        )
+        assert content == {"kind": "Template"}
+
+    assert herder._fetch_file_contents.call_count == 2
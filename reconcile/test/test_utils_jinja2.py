@@ -1,6 +1,9 @@
 import pytest
 from jsonpath_ng.exceptions import JsonPathParserError
+from pytest_mock import MockerFixture
 
+from reconcile.utils.gql import GqlMemo
+from reconcile.utils.jinja2 import utils
 from reconcile.utils.jinja2.filters import (
     extract_jsonpath,
     hash_list,
@@ -128,3 +131,23 @@ def test_str_format() -> None:
     value = "path/to/object"
     format = "s3://%s"
     assert str_format(value, format) == "s3://path/to/object"
+
+
+def test_lookup_graphql_query_results_is_memoized(mocker: MockerFixture) -> None:
+    gqlapi = mocker.patch.object(utils.gql, "get_api").return_value
+    gqlapi.lookups = GqlMemo("lookup")
+    gqlapi.get_resource.return_value = {
+        "content": '{ clusters: clusters_v1(name: "{{ name }}") { name } }'
+    }
+    gqlapi.query.side_effect = lambda q: {"clusters": [q]}
+
+    for _ in range(3):
+        a = utils.lookup_graphql_query_results("/q.gql", name="a")
+        # templates may modify the results
+        a.append("modified")
+    b = utils.lookup_graphql_query_results("/q.gql", name="b")
+
+    assert a == ['{ clusters: clusters_v1(name: "a") { name } }', "modified"]
+    assert b == ['{ clusters: clusters_v1(name: "b") { name } }']
+    gqlapi.get_resource.assert_called_once_with("/q.gql")
+    assert gqlapi.query.call_count == 2
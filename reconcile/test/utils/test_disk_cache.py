@@ -0,0 +1,134 @@
+import os
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from pytest_mock import MockerFixture
+
+from reconcile.utils import state
+from reconcile.utils.disk_cache import (
+    DiskCache,
+    cache_dir,
+    get_tiered,
+    init_shared_tier,
+    set_tiered,
+)
+
+
+@pytest.fixture
+def disk_cache(tmp_path: Path) -> DiskCache:
+    return DiskCache(str(tmp_path))
+
+
+def test_disk_cache_get_set(disk_cache: DiskCache) -> None:
+    assert disk_cache.get("key") is None
+    disk_cache.set("key", {"a": [1, 2]})
+    assert disk_cache.get("key") == {"a": [1, 2]}
+
+
+def test_disk_cache_shared_between_instances(
+    tmp_path: Path, disk_cache: DiskCache
+) -> None:
+    disk_cache.set("key", "value")
+    assert DiskCache(str(tmp_path)).get("key") == "value"
+
+
+def test_disk_cache_ttl(disk_cache: DiskCache) -> None:
+    disk_cache.set("expired", "value", ttl=-1)
+    disk_cache.set("valid", "value", ttl=60)
+    assert disk_cache.get("expired") is None
+    assert disk_cache.get("valid") == "value"
+
+
+def test_disk_cache_delete(disk_cache: DiskCache) -> None:
+    disk_cache.set("key", "value")
+    disk_cache.delete("key")
+    disk_cache.delete("key")
+    assert disk_cache.get("key") is None
+
+
+def test_disk_cache_corrupted_entry(disk_cache: DiskCache) -> None:
+    disk_cache.set("key", "value")
+    disk_cache._path("key").write_text("{not json")
+    assert disk_cache.get("key") is None
+
+
+def test_disk_cache_unserializable_value(disk_cache: DiskCache) -> None:
+    disk_cache.set("key", object())
+    assert disk_cache.get("key") is None
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    disk_cache = DiskCache(str(tmp_path))
+    for i in range(3):
+        disk_cache.set(f"key{i}", "x" * 100)
+        past = time.time() - 100 + i
+        os.utime(disk_cache._path(f"key{i}"), (past, past))
+    # a read makes key0 the most recently used entry
+    disk_cache.get("key0")
+    entry_size = disk_cache._path("key0").stat().st_size
+    disk_cache.max_bytes = 2 * entry_size
+
+    disk_cache.evict()
+
+    assert disk_cache.get("key1") is None
+    assert disk_cache.get("key0") is not None
+    assert disk_cache.get("key2") is not None
+
+
+def test_cache_dir(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("QONTRACT_RECONCILE_CACHE_DIR", "/cache")
+    assert cache_dir("name") == "/cache/name"
+
+
+def test_init_shared_tier(
+    mocker: MockerFixture, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    init_state = mocker.patch.object(state, "init_state")
+    cache = SimpleNamespace(shared=None)
+
+    init_shared_tier(cache, "some-cache")
+    assert cache.shared is None
+    monkeypatch.setenv("SOME_CACHE_SHARED", "true")
+    init_shared_tier(cache, "some-cache")
+    init_shared_tier(cache, "some-cache")
+
+    assert cache.shared == init_state.return_value
+    init_state.assert_called_once_with(integration="some-cache")
+
+
+def test_init_shared_tier_unavailable(
+    mocker: MockerFixture, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    mocker.patch.object(state, "init_state", side_effect=Exception("no settings"))
+    monkeypatch.setenv("SOME_CACHE_SHARED", "true")
+    cache = SimpleNamespace(shared=None)
+
+    init_shared_tier(cache, "some-cache")
+
+    assert cache.shared is None
+
+
+def test_tiered_lookup(tmp_path: Path) -> None:
+    shared: dict[str, dict] = {}
+    cache = SimpleNamespace(disk=DiskCache(str(tmp_path / "a")), shared=shared)
+    set_tiered(cache, "key", {"a": 1}, "test cache")
+    set_tiered(cache, "private", {"a": 2}, "test cache", share=False)
+
+    assert get_tiered(cache, "key", "test cache") == ({"a": 1}, "disk")
+    assert "private" not in shared
+    # another pod, the shared hit is copied to its disk
+    other = SimpleNamespace(disk=DiskCache(str(tmp_path / "b")), shared=shared)
+    assert get_tiered(other, "key", "test cache") == ({"a": 1}, "shared")
+    assert get_tiered(other, "key", "test cache") == ({"a": 1}, "disk")
+    assert get_tiered(other, "private", "test cache") == (None, "miss")
+
+
+def test_tiered_lookup_skips_expired_values(tmp_path: Path) -> None:
+    cache = SimpleNamespace(disk=DiskCache(str(tmp_path)), shared=None)
+    set_tiered(cache, "key", {"expire_at": 0}, "test cache")
+
+    assert get_tiered(
+        cache, "key", "test cache", ttl=lambda v: v["expire_at"] - time.time()
+    ) == (None, "miss")
@@ -1,12 +1,37 @@
+import json
+import socket
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+from unittest.mock import MagicMock
+
 import pytest
 import requests
+import responses
 from gql.transport.exceptions import TransportQueryError
+from graphql import (
+    build_schema,
+    introspection_from_schema,
+)
 
+from reconcile.utils import (
+    gql,
+    metrics,
+)
+from reconcile.utils.disk_cache import DiskCache
 from reconcile.utils.gql import (
     GqlApi,
     GqlApiError,
     GqlApiErrorForbiddenSchema,
     GqlApiIntegrationNotFound,
+    GqlGetResourceError,
+    GqlMemo,
+    GqlResponseCache,
 )
 
 TEST_QUERY = """
@@ -79,3 +104,318 @@ def test_gqlapi_throws_gqlapierrorforbiddenschema_exception(mocker):
     with pytest.raises(GqlApiErrorForbiddenSchema):
         gql_api = GqlApi("test_url", "test_token", "INTEGRATION", validate_schemas=True)
         gql_api.query.__wrapped__(gql_api, TEST_QUERY)
+
+
+SHA_URL = "https://gql.example.com/graphqlsha/abc123"
+
+
+@pytest.fixture
+def response_cache(mocker, tmp_path) -> GqlResponseCache:
+    cache = GqlResponseCache(DiskCache(str(tmp_path)))
+    mocker.patch.object(gql, "RESPONSE_CACHE", cache)
+    return cache
+
+
+def test_gqlapi_caches_sha_pinned_queries(mocker, response_cache):
+    patched_client = mocker.patch("reconcile.utils.gql.Client.execute", autospec=True)
+    patched_client.return_value.formatted = {
+        "data": {"integrations": []},
+        "extensions": {"schemas": ["/app-sre/integration-1.yml"]},
+    }
+    gql_api = GqlApi(SHA_URL, "test_token")
+
+    assert gql_api.query(TEST_QUERY) == {"integrations": []}
+    # whitespace doesn't matter, variables do
+    assert gql_api.query(" ".join(TEST_QUERY.split())) == {"integrations": []}
+    assert patched_client.call_count == 1
+    gql_api.query(TEST_QUERY, {"path": "/a.yml"})
+    assert patched_client.call_count == 2
+    # another bundle sha is another cache
+    GqlApi(SHA_URL.replace("abc123", "def456"), "test_token").query(TEST_QUERY)
+    assert patched_client.call_count == 3
+
+
+def test_gqlapi_cache_hit_validates_schemas(mocker, response_cache):
+    patched_client = mocker.patch("reconcile.utils.gql.Client.execute", autospec=True)
+    patched_client.return_value.formatted = {
+        "data": {"integrations": [{"name": "INTEGRATION", "schemas": ["SCHEMA"]}]},
+        "extensions": {"schemas": ["FORBIDDEN_SCHEMA"]},
+    }
+    gql_api = GqlApi(SHA_URL, "test_token")
+    gql_api.query(TEST_QUERY)
+    GqlApi._queried_schemas.discard("FORBIDDEN_SCHEMA")
+
+    gql_api.validate_schemas = True
+    gql_api._valid_schemas = ["SCHEMA"]
+    with pytest.raises(GqlApiErrorForbiddenSchema):
+        gql_api.query.__wrapped__(gql_api, TEST_QUERY)
+    assert "FORBIDDEN_SCHEMA" in gql_api.get_queried_schemas()
+    assert patched_client.call_count == 1
+
+
+def test_gqlapi_does_not_cache_unpinned_queries(mocker, response_cache):
+    patched_client = mocker.patch("reconcile.utils.gql.Client.execute", autospec=True)
+    patched_client.return_value.formatted = {"data": {"integrations": []}}
+    gql_api = GqlApi("https://gql.example.com/graphql", "test_token")
+
+    gql_api.query(TEST_QUERY)
+    gql_api.query(TEST_QUERY)
+
+    assert patched_client.call_count == 2
+
+
+def test_gql_response_cache_shared_tier(tmp_path):
+    shared = MagicMock()
+    shared.get.return_value = {"data": {"a": 1}}
+    cache = GqlResponseCache(DiskCache(str(tmp_path)), shared=shared)
+
+    assert cache.get("sha/key") == {"data": {"a": 1}}
+    shared.get.return_value = None
+    # the shared hit was copied to disk
+    assert cache.get("sha/key") == {"data": {"a": 1}}
+    assert shared.get.call_count == 1
+
+    cache.set("sha/other", {"data": {"b": 2}})
+    shared.__setitem__.assert_called_once_with("sha/other", {"data": {"b": 2}})
+
+
+def resources_response(*args, **kwargs):
+    variables = args[2]
+    return MagicMock(
+        formatted={
+            "data": {
+                f"r{name[1:]}": []
+                if path == "/missing.yml"
+                else [{"path": path, "content": "c", "sha256sum": "s"}]
+                for name, path in variables.items()
+            }
+        }
+    )
+
+
+def test_gqlapi_get_resources_batches(mocker, response_cache):
+    mocker.patch.object(gql, "RESOURCES_BATCH_SIZE", 2)
+    patched_client = mocker.patch("reconcile.utils.gql.Client.execute", autospec=True)
+    patched_client.side_effect = resources_response
+    gql_api = GqlApi("test_url", "test_token")
+
+    resources = gql_api.get_resources(["/a.yml", "/b.yml", "/missing.yml", "/a.yml"])
+
+    assert sorted(resources) == ["/a.yml", "/b.yml"]
+    assert resources["/a.yml"]["path"] == "/a.yml"
+    assert patched_client.call_count == 2
+    assert gql_api.get_resource("/b.yml")["path"] == "/b.yml"
+    with pytest.raises(GqlGetResourceError, match="one and only one"):
+        gql_api.get_resource("/missing.yml")
+
+
+def test_gqlapi_get_resource_not_found(mocker):
+    mocker.patch("reconcile.utils.gql.Client.execute", autospec=True)
+    gql_api = GqlApi("test_url", "test_token")
+    mocker.patch.object(gql_api, "query", side_effect=GqlApiError("error"))
+
+    with pytest.raises(GqlGetResourceError, match="Resource not found"):
+        gql_api.get_resource("/a.yml")
+    assert len(gql_api._resources_in_flight) == 0
+
+
+def test_gqlapi_get_resources_coalesces_in_flight_requests(mocker, response_cache):
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_response(*args, **kwargs):
+        started.set()
+        release.wait(timeout=5)
+        return resources_response(*args, **kwargs)
+
+    patched_client = mocker.patch("reconcile.utils.gql.Client.execute", autospec=True)
+    patched_client.side_effect = slow_response
+    gql_api = GqlApi("test_url", "test_token")
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        first = executor.submit(gql_api.get_resource, "/a.yml")
+        started.wait(timeout=5)
+        # doesn't block, the path is already in flight
+        second = gql_api._fetch_resources(["/a.yml"])["/a.yml"]
+        release.set()
+        assert first.result()["path"] == "/a.yml"
+    assert second.result() == [first.result()]
+    assert patched_client.call_count == 1
+
+
+def test_gql_memo_shares_results_between_threads():
+    memo = GqlMemo("test")
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(timeout=5)
+        return ["result"]
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        first = executor.submit(memo.get, "key", compute)
+        started.wait(timeout=5)
+        second = executor.submit(memo.get, "key", compute)
+        release.set()
+        assert first.result() == second.result() == ["result"]
+    assert memo.get("key", compute) == ["result"]
+    assert len(calls) == 1
+    hits = metrics.gql_memo_lookups.labels(memo="test", result="hit")
+    assert hits._value.get() >= 1
+
+
+def test_gql_memo_does_not_memoize_errors():
+    memo = GqlMemo("test")
+
+    with pytest.raises(GqlApiError):
+        memo.get("key", MagicMock(side_effect=GqlApiError("error")))
+    assert memo.get("key", lambda: "result") == "result"
+
+
+def test_gqlapi_get_template_is_memoized(mocker):
+    mocker.patch("reconcile.utils.gql.Client.execute", autospec=True)
+    gql_api = GqlApi("test_url", "test_token")
+    query = mocker.patch.object(
+        gql_api,
+        "query",
+        return_value={"templates": [{"path": "/t.yml", "template": "body"}]},
+    )
+
+    assert gql_api.get_template("/t.yml")["template"] == "body"
+    assert gql_api.get_template("/t.yml")["template"] == "body"
+    assert query.call_count == 1
+
+
+def test_parse_query_is_cached():
+    query = "query CachedQuery { integrations: integrations_v1 { name } }"
+
+    assert gql.parse_query(query) is gql.parse_query(query)
+    assert gql.operation_name(gql.parse_query(query)) == "CachedQuery"
+    assert gql.operation_name(gql.parse_query(TEST_QUERY)) == "anonymous"
+
+
+def test_registered_definitions():
+    definitions = gql.registered_definitions()
+
+    assert "reconcile.gql_definitions.common.app_interface_state_settings" in (
+        definitions
+    )
+    assert all("query" in definition for definition in definitions.values())
+
+
+def test_gqlapi_validate_definitions(mocker):
+    schema = build_schema(
+        "type Integration { name: String } "
+        "type Query { integrations_v1: [Integration] }"
+    )
+    mocker.patch("reconcile.utils.gql.Client.execute", autospec=True)
+    gql_api = GqlApi("test_url", "test_token")
+    mocker.patch.object(
+        gql_api, "query", return_value=introspection_from_schema(schema)
+    )
+
+    errors = gql_api.validate_definitions({
+        "valid": TEST_QUERY.replace("description\n", "").replace("schemas\n", ""),
+        "invalid": TEST_QUERY,
+    })
+
+    assert list(errors) == ["invalid"]
+    assert "description" in errors["invalid"]
+
+
+@responses.activate
+def test_gqlapi_records_query_stats(mocker):
+    body = json.dumps({"data": {"integrations": []}})
+    responses.add(responses.POST, "https://gql.example.com/graphql", body=body)
+    record_query_stats = mocker.patch.object(gql, "record_query_stats")
+    gql_api = GqlApi("https://gql.example.com/graphql", "test_token")
+
+    gql_api.query(TEST_QUERY)
+
+    name, response_bytes, parse_seconds = record_query_stats.call_args.args
+    assert name == "integrations"
+    assert response_bytes == len(body)
+    assert parse_seconds >= 0
+
+
+def test_query_report(mocker):
+    mocker.patch.object(gql, "_query_stats", defaultdict(gql.QueryStats))
+    gql.record_query_stats("namespaces", 2 * 2**20, 0.5)
+    gql.record_query_stats("namespaces", 2 * 2**20, 0.5)
+    gql.record_query_stats("clusters", 2**20, 0.25)
+
+    assert gql.query_report() == (
+        "namespaces: 2 queries, 4.00 MiB, 1.000s parsing\n"
+        "clusters: 1 queries, 1.00 MiB, 0.250s parsing"
+    )
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with self.lock:
+            CountingHandler.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps({"data": {"integrations": []}}).encode()
+        time.sleep(0.01)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def gql_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CountingHandler)
+    CountingHandler.connections = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/graphql"
+    server.shutdown()
+    server.server_close()
+
+
+def test_gqlapi_reuses_pooled_connections(gql_server):
+    gql_api = GqlApi(gql_server, "test_token", pool_maxsize=4)
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(lambda _: gql_api.query(TEST_QUERY), range(64)))
+
+    assert results == [{"integrations": []}] * 64
+    # threads wait for a pooled connection instead of opening new ones
+    assert CountingHandler.connections <= 4
+    gql_api.close()
+
+
+def test_gqlapi_observes_request_latency(gql_server):
+    gql_api = GqlApi(gql_server, "test_token")
+    histogram = metrics.gql_request_time.labels(query="integrations")
+    before = histogram._sum.get()
+
+    gql_api.query(TEST_QUERY)
+
+    assert histogram._sum.get() - before >= 0.01
+    gql_api.close()
+
+
+def test_pooled_session_enables_keep_alive():
+    adapter = gql.pooled_session(8).get_adapter("https://gql.example.com")
+
+    pool = adapter.poolmanager.connection_from_url("https://gql.example.com")
+
+    assert pool.pool.maxsize == 8
+    assert pool.block
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in pool.conn_kw["socket_options"]
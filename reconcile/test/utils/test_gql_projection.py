@@ -0,0 +1,98 @@
+import pytest
+from graphql import print_ast
+
+from reconcile.utils.gql import parse_query
+from reconcile.utils.gql_projection import (
+    ProjectionError,
+    project_query,
+)
+
+QUERY = """
+query Namespaces($name: String) {
+  namespaces: namespaces_v1(name: $name) {
+    name
+    delete
+    cluster {
+      name
+      jumpHost {
+        hostname
+        identity {
+          path
+        }
+      }
+    }
+    externalResources {
+      provider
+      ... on NamespaceTerraformProviderResourceAWS_v1 {
+        resources {
+          provider
+          ... on NamespaceTerraformResourceRDS_v1 {
+            identifier
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+def normalize(query: str) -> str:
+    return " ".join(query.split())
+
+
+def test_project_query_keeps_declared_fields() -> None:
+    query = project_query(QUERY, ["name", "cluster.jumpHost"])
+
+    assert normalize(query) == normalize("""
+        query Namespaces($name: String) {
+          namespaces: namespaces_v1(name: $name) {
+            name
+            cluster {
+              jumpHost {
+                hostname
+                identity {
+                  path
+                }
+              }
+            }
+          }
+        }
+    """)
+
+
+def test_project_query_inline_fragments() -> None:
+    query = project_query(QUERY, ["externalResources.resources.identifier"])
+
+    assert normalize(query) == normalize("""
+        query Namespaces($name: String) {
+          namespaces: namespaces_v1(name: $name) {
+            externalResources {
+              ... on NamespaceTerraformProviderResourceAWS_v1 {
+                resources {
+                  ... on NamespaceTerraformResourceRDS_v1 {
+                    identifier
+                  }
+                }
+              }
+            }
+          }
+        }
+    """)
+
+
+def test_project_query_does_not_modify_parsed_query() -> None:
+    before = print_ast(parse_query(QUERY))
+
+    project_query(QUERY, ["name"])
+
+    assert print_ast(parse_query(QUERY)) == before
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [[], ["name", "unknown"], ["cluster.name.unknown"]],
+)
+def test_project_query_invalid_fields(fields: list[str]) -> None:
+    with pytest.raises(ProjectionError):
+        project_query(QUERY, fields)
@@ -0,0 +1,150 @@
+from collections.abc import Generator
+from typing import Any
+
+import boto3
+import pytest
+from moto import mock_s3
+from mypy_boto3_s3 import S3Client
+from pytest_mock import MockerFixture
+
+from reconcile.utils import (
+    gql,
+    gql_snapshot,
+)
+from reconcile.utils.gql import (
+    GqlApi,
+    GqlResponseCache,
+)
+from reconcile.utils.gql_snapshot import (
+    SnapshotError,
+    build_snapshot,
+    init_snapshot,
+    load_snapshot,
+    parse_snapshot,
+    snapshot_key,
+    store_snapshot,
+)
+from reconcile.utils.state import State
+
+SHA = "abcdef0123"
+SHA_URL = f"https://gql.example.com/graphqlsha/{SHA}"
+BUCKET = "some-bucket"
+QUERIES: list[tuple[str, dict[str, Any] | None]] = [
+    ("{ namespaces: namespaces_v1 { name } }", None),
+    ("{ clusters: clusters_v1 { name } }", {}),
+]
+
+
+@pytest.fixture
+def response_cache(mocker: MockerFixture) -> GqlResponseCache:
+    cache = GqlResponseCache(None)
+    mocker.patch.object(gql, "RESPONSE_CACHE", cache)
+    mocker.patch.object(gql_snapshot, "RESPONSE_CACHE", cache)
+    return cache
+
+
+@pytest.fixture
+def execute(mocker: MockerFixture) -> Any:
+    patched_client = mocker.patch("reconcile.utils.gql.Client.execute", autospec=True)
+    patched_client.return_value.formatted = {
+        "data": {"items": [{"name": "a"}]},
+        "extensions": {"schemas": ["/some-1.yml"]},
+    }
+    return patched_client
+
+
+@pytest.fixture
+def state(monkeypatch: pytest.MonkeyPatch) -> Generator[State, None, None]:
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_s3():
+        s3_client: S3Client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket=BUCKET)
+        yield State(integration="gql-snapshot", bucket=BUCKET, client=s3_client)
+
+
+def test_build_and_parse_snapshot(
+    response_cache: GqlResponseCache, execute: Any
+) -> None:
+    gql_api = GqlApi(SHA_URL, "test_token")
+
+    responses = parse_snapshot(build_snapshot(gql_api, QUERIES), SHA)
+
+    assert execute.call_count == len(QUERIES)
+    for query, variables in QUERIES:
+        key = GqlResponseCache.key(SHA, query, variables)
+        assert responses[key] == {  # type: ignore[index]
+            "data": {"items": [{"name": "a"}]},
+            "extensions": {"schemas": ["/some-1.yml"]},
+        }
+
+
+def test_build_snapshot_requires_sha(
+    response_cache: GqlResponseCache, execute: Any
+) -> None:
+    gql_api = GqlApi("https://gql.example.com/graphql", "test_token")
+
+    with pytest.raises(SnapshotError):
+        build_snapshot(gql_api, QUERIES)
+
+
+def test_parse_snapshot_of_another_sha(
+    response_cache: GqlResponseCache, execute: Any
+) -> None:
+    data = build_snapshot(GqlApi(SHA_URL, "test_token"), QUERIES)
+
+    with pytest.raises(SnapshotError):
+        parse_snapshot(data, "another")
+
+
+def test_store_snapshot_once(
+    mocker: MockerFixture,
+    response_cache: GqlResponseCache,
+    execute: Any,
+    state: State,
+) -> None:
+    mocker.patch.object(gql_snapshot, "SNAPSHOT_QUERIES", QUERIES)
+    gql_api = GqlApi(SHA_URL, "test_token")
+
+    assert store_snapshot(state, gql_api)
+    assert state.exists(snapshot_key(SHA))
+    assert not store_snapshot(state, gql_api)
+    assert load_snapshot(state, "another") is None
+
+
+def test_init_snapshot_serves_queries(
+    mocker: MockerFixture,
+    monkeypatch: pytest.MonkeyPatch,
+    response_cache: GqlResponseCache,
+    execute: Any,
+    state: State,
+) -> None:
+    state.set_bytes(
+        snapshot_key(SHA), build_snapshot(GqlApi(SHA_URL, "test_token"), QUERIES)
+    )
+    gql_api = GqlApi(SHA_URL, "test_token")
+    mocker.patch.object(gql_snapshot.gql, "get_api", return_value=gql_api)
+    mocker.patch.object(gql_snapshot, "init_state", return_value=state)
+    execute.reset_mock()
+    monkeypatch.setenv("GQL_SNAPSHOT_ENABLED", "true")
+
+    init_snapshot()
+
+    data = gql_api.query(*QUERIES[0])
+    assert data == {"items": [{"name": "a"}]}
+    # hits are not affected by callers modifying earlier results
+    data["items"].clear()
+    assert gql_api.query(*QUERIES[0]) == {"items": [{"name": "a"}]}
+    assert gql_api.query(*QUERIES[1]) == {"items": [{"name": "a"}]}
+    execute.assert_not_called()
+
+
+def test_init_snapshot_disabled(
+    mocker: MockerFixture, response_cache: GqlResponseCache
+) -> None:
+    init_state = mocker.patch.object(gql_snapshot, "init_state")
+
+    init_snapshot()
+
+    init_state.assert_not_called()
+    assert not response_cache.snapshot
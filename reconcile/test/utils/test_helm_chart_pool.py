@@ -0,0 +1,155 @@
+import logging
+import os
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+import yaml
+from pytest_mock import MockerFixture
+
+from reconcile.utils import (
+    git,
+    helm,
+)
+from reconcile.utils.helm import ChartPool
+from reconcile.utils.single_flight import SingleFlight
+
+CHART_PATH = "/helm/qontract-reconcile"
+CHART = Path(__file__).parents[3] / CHART_PATH.lstrip("/")
+# e.g. 10 to benchmark rendering, needs git and helm, not part of the unit tests
+TARGETS = int(os.environ.get("HELM_RENDER_BENCHMARK_TARGETS", 0))
+
+
+def commit(repo: Path, message: str) -> str:
+    subprocess.run(["git", "add", "-A"], cwd=repo, check=True)
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+        + ["commit", "-q", "-m", message],
+        cwd=repo,
+        check=True,
+    )
+    result = subprocess.run(
+        ["git", "rev-parse", "HEAD"], cwd=repo, capture_output=True, check=True
+    )
+    return result.stdout.decode().strip()
+
+
+@pytest.fixture
+def chart_repo(tmp_path: Path) -> tuple[str, list[str]]:
+    """A repository with the qontract-reconcile chart, and its two commits."""
+    repo = tmp_path / "repo"
+    shutil.copytree(CHART, repo / CHART_PATH.lstrip("/"))
+    subprocess.run(["git", "init", "-q"], cwd=repo, check=True)
+    first = commit(repo, "chart")
+    (repo / "README.md").write_text("second commit\n")
+    second = commit(repo, "readme")
+    return f"file://{repo}", [first, second]
+
+
+@pytest.fixture
+def pool(tmp_path: Path) -> ChartPool:
+    return ChartPool(str(tmp_path / "charts"), max_checkouts=10)
+
+
+def test_chart_pool_checks_out_commit(
+    chart_repo: tuple[str, list[str]], pool: ChartPool
+) -> None:
+    url, (first, second) = chart_repo
+
+    chart = Path(pool.checkout(url, CHART_PATH, first))
+
+    assert (chart / "Chart.yaml").is_file()
+    assert not (chart.parents[1] / "README.md").exists()
+    chart = Path(pool.checkout(url, CHART_PATH, second))
+    assert (chart.parents[1] / "README.md").is_file()
+
+
+def test_chart_pool_reuses_checkouts(
+    mocker: MockerFixture, chart_repo: tuple[str, list[str]], pool: ChartPool
+) -> None:
+    url, (first, _) = chart_repo
+    fetch_commit = mocker.spy(git, "fetch_commit")
+    chart = pool.checkout(url, CHART_PATH, first)
+
+    assert pool.checkout(url, CHART_PATH, first) == chart
+    # another process on the same host
+    other = ChartPool(str(pool.directory), max_checkouts=10)
+    assert other.checkout(url, CHART_PATH, first) == chart
+    fetch_commit.assert_called_once()
+
+
+def test_chart_pool_evicts_least_recently_used(
+    chart_repo: tuple[str, list[str]], pool: ChartPool
+) -> None:
+    url, (first, second) = chart_repo
+    pool.max_checkouts = 1
+    old = Path(pool.checkout(url, CHART_PATH, first)).parents[1]
+    os.utime(old, (0, 0))
+
+    new = Path(pool.checkout(url, CHART_PATH, second)).parents[1]
+
+    assert not old.exists()
+    assert new.is_dir()
+
+
+def test_values_digest_is_canonical(mocker: MockerFixture) -> None:
+    mocker.patch.object(helm, "helm_version", return_value="v3")
+    assert helm.values_digest("name", {"a": 1, "b": {"c": 2}}) == (
+        helm.values_digest("name", {"b": {"c": 2}, "a": 1})
+    )
+    assert helm.values_digest("name", {"a": 1}) != (
+        helm.values_digest("other", {"a": 1})
+    )
+
+
+def test_render_memoizes_in_memory(
+    mocker: MockerFixture, chart_repo: tuple[str, list[str]], pool: ChartPool
+) -> None:
+    url, (first, _) = chart_repo
+    mocker.patch.object(helm, "CHART_POOL", pool)
+    mocker.patch.object(helm, "RENDERINGS", SingleFlight())
+    mocker.patch.object(helm, "helm_version", return_value="v3")
+    do_template = mocker.patch.object(helm, "do_template", return_value="kind: A")
+
+    for _ in range(2):
+        assert helm.render(url, CHART_PATH, first, "name", {"a": 1}) == "kind: A"
+    helm.render(url, CHART_PATH, first, "name", {"a": 2})
+
+    assert do_template.call_count == 2
+
+
+@pytest.mark.skipif(
+    not TARGETS, reason="set HELM_RENDER_BENCHMARK_TARGETS to run the benchmark"
+)
+def test_benchmark_render(
+    mocker: MockerFixture, chart_repo: tuple[str, list[str]], pool: ChartPool
+) -> None:
+    url, (first, _) = chart_repo
+    mocker.patch.object(helm, "CHART_POOL", pool)
+    # one saas target each, as many targets of a saas file deploy one chart
+    targets = [
+        (f"target-{i}", {"integrations": [{"name": f"integration-{i}"}]})
+        for i in range(TARGETS)
+    ]
+
+    start = time.perf_counter()
+    cloned = [
+        list(helm.template_all(url=url, path=CHART_PATH, name=name, values=values))
+        for name, values in targets
+    ]
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rendered = [
+        list(yaml.safe_load_all(helm.render(url, CHART_PATH, first, name, values)))
+        for name, values in targets
+    ]
+    warm = time.perf_counter() - start
+
+    logging.info(
+        f"rendered {TARGETS} targets in {cold:.3f}s cloning the chart per "
+        f"target, {warm:.3f}s from the chart pool"
+    )
+    assert rendered == cloned
@@ -0,0 +1,67 @@
+import json
+from collections.abc import Iterator
+
+import pytest
+
+from reconcile.utils.json_stream import iter_list_items
+
+ITEMS = [
+    {"kind": "ConfigMap", "metadata": {"name": f"cm-{i}"}, "data": {"k": "ü" * i}}
+    for i in range(20)
+]
+LIST = {"apiVersion": "v1", "items": ITEMS, "kind": "List", "metadata": {}}
+
+
+def chunked(data: bytes, size: int) -> list[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64, 1024 * 1024])
+def test_iter_list_items(size: int) -> None:
+    data = json.dumps(LIST, indent=4).encode()
+    assert list(iter_list_items(chunked(data, size))) == ITEMS
+
+
+def test_iter_list_items_compact() -> None:
+    data = json.dumps(LIST, separators=(",", ":")).encode()
+    assert list(iter_list_items(chunked(data, 3))) == ITEMS
+
+
+def test_iter_list_items_scalars() -> None:
+    data = b'{"count": 12345, "items": [1, 2.5, "x", null, true]}'
+    assert list(iter_list_items(chunked(data, 1))) == [1, 2.5, "x", None, True]
+
+
+@pytest.mark.parametrize("data", [b'{"items": []}', b'{"items":[]}'])
+def test_iter_list_items_empty(data: bytes) -> None:
+    assert list(iter_list_items([data])) == []
+
+
+def test_iter_list_items_is_lazy() -> None:
+    read = []
+
+    def chunks() -> Iterator[bytes]:
+        for chunk in chunked(json.dumps(LIST).encode(), 16):
+            read.append(chunk)
+            yield chunk
+
+    items = iter_list_items(chunks())
+    assert next(items) == ITEMS[0]
+    assert len(read) < len(chunked(json.dumps(LIST).encode(), 16)) / 2
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"{}",
+        b'{"kind": "Pod"}',
+        b"[]",
+        b'{"items": [{"a": 1}',
+        b'{"items": [{"a": 1} {"b": 2}]}',
+        b'{"items": []} {}',
+    ],
+)
+def test_iter_list_items_invalid(data: bytes) -> None:
+    with pytest.raises(ValueError):
+        list(iter_list_items(chunked(data, 4) or [b""]))
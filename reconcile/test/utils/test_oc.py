@@ -1,25 +1,36 @@
+import json
 import logging
 import os
+import sys
+from dataclasses import asdict
 from unittest import TestCase
 from unittest.mock import patch
 
 import pytest
+from kubernetes.client.exceptions import ApiException
 from kubernetes.dynamic import Resource
-from kubernetes.dynamic.exceptions import ResourceNotFoundError
+from kubernetes.dynamic.exceptions import DynamicApiError, ResourceNotFoundError
 
 import reconcile.utils.oc
+from reconcile.utils.disk_cache import DiskCache
 from reconcile.utils.oc import (
     GET_REPLICASET_MAX_ATTEMPTS,
     LABEL_MAX_KEY_NAME_LENGTH,
     LABEL_MAX_KEY_PREFIX_LENGTH,
     LABEL_MAX_VALUE_LENGTH,
     OC,
+    ClusterStateCache,
+    FieldIsImmutableError,
+    JSONParsingError,
+    NoOutputError,
     OC_Map,
     OCCli,
+    OCCliApiResource,
     OCLogMsg,
     OCNative,
     PodNotReadyError,
     StatusCodeError,
+    WatchedKind,
     equal_spec_template,
     validate_labels,
 )
@@ -1068,3 +1079,380 @@ def test_oc_native_get_all(oc_native: OCNative) -> None:
     oc_native.client.resources.get.return_value.get.assert_called_once_with(
         _request_timeout=60,
     )
+
+
+def _watched_item(namespace: str, name: str, rv: str, labels=None) -> dict:
+    return {
+        "kind": "kind1",
+        "metadata": {
+            "namespace": namespace,
+            "name": name,
+            "resourceVersion": rv,
+            "labels": labels or {},
+        },
+    }
+
+
+@pytest.fixture
+def watched_kind(mocker) -> WatchedKind:
+    obj_client = mocker.Mock()
+    obj_client.get.return_value.to_dict.return_value = {
+        "metadata": {"resourceVersion": "10"},
+        "items": [
+            _watched_item("ns1", "a", "5", labels={"app": "a"}),
+            _watched_item("ns2", "b", "6"),
+        ],
+    }
+    store = WatchedKind("cluster", "kind1", mocker.Mock(), obj_client)
+    store.relist()
+    return store
+
+
+def test_watched_kind_relist(watched_kind: WatchedKind) -> None:
+    assert watched_kind.synced
+    assert len(watched_kind.list_items()) == 2
+    assert [i["metadata"]["name"] for i in watched_kind.list_items("ns1")] == ["a"]
+    assert watched_kind.list_items(labels={"app": "b"}) == []
+    assert watched_kind.list_items(resource_names=["b"])[0]["metadata"]["name"] == "b"
+    assert watched_kind.get_item("ns2", "b")
+    assert watched_kind.get_item("ns1", "b") is None
+
+
+def test_watched_kind_events(watched_kind: WatchedKind) -> None:
+    watched_kind._handle_event("ADDED", _watched_item("ns1", "c", "11"))
+    watched_kind._handle_event("DELETED", _watched_item("ns1", "a", "12"))
+    watched_kind._handle_event(
+        "MODIFIED", _watched_item("ns2", "b", "13", labels={"x": "y"})
+    )
+    assert sorted(i["metadata"]["name"] for i in watched_kind.list_items()) == [
+        "b",
+        "c",
+    ]
+    assert watched_kind.list_items(labels={"x": "y"})[0]["metadata"]["name"] == "b"
+    assert watched_kind._resource_version == "13"
+
+
+def test_watched_kind_returns_copies(watched_kind: WatchedKind) -> None:
+    item = watched_kind.get_item("ns1", "a")
+    assert item
+    item["metadata"]["name"] = "changed"
+    assert watched_kind.get_item("ns1", "a")
+
+
+def test_watched_kind_relist_on_gone(mocker, watched_kind: WatchedKind) -> None:
+    watched_kind._dynamic_client.watch.side_effect = [
+        ApiException(status=410),
+        iter([]),
+    ]
+    relist = mocker.patch.object(
+        watched_kind, "relist", autospec=True, side_effect=watched_kind.stop
+    )
+    watched_kind._watch_loop()
+    relist.assert_called_once()
+    assert not watched_kind.synced
+
+
+def test_watched_kind_unsynced_on_watch_error(
+    mocker, watched_kind: WatchedKind
+) -> None:
+    watched_kind._dynamic_client.watch.side_effect = ApiException(status=500)
+    mocker.patch.object(
+        watched_kind._stopped, "wait", side_effect=lambda _: watched_kind.stop()
+    )
+
+    watched_kind._watch_loop()
+
+    assert not watched_kind.synced
+
+
+def test_cluster_state_cache_retries_unlistable_kinds_later(mocker) -> None:
+    cache = ClusterStateCache()
+    factory = mocker.Mock(side_effect=StatusCodeError("forbidden"))
+    monotonic = mocker.patch.object(reconcile.utils.oc.time, "monotonic")
+    monotonic.return_value = 1000.0
+    for _ in range(2):
+        assert (
+            cache.get_store("server", "id", "cluster", "kind1", "group1/v1", factory)
+            is None
+        )
+    factory.assert_called_once()
+
+    monotonic.return_value += reconcile.utils.oc.WATCH_KIND_RETRY_INTERVAL + 1
+    cache.get_store("server", "id", "cluster", "kind1", "group1/v1", factory)
+    assert factory.call_count == 2
+
+
+def test_cluster_state_cache_stores_per_identity(
+    mocker, watched_kind: WatchedKind
+) -> None:
+    mocker.patch.object(reconcile.utils.oc, "WatchedKind", return_value=watched_kind)
+    mocker.patch.object(watched_kind, "start")
+    cache = ClusterStateCache()
+    factory = mocker.Mock()
+
+    admin = cache.get_store("server", "admin", "cluster", "kind1", "v1", factory)
+    again = cache.get_store("server", "admin", "cluster", "kind1", "v1", factory)
+    cache.get_store("server", "user", "cluster", "kind1", "v1", factory)
+
+    assert again is admin
+    assert factory.call_count == 2
+
+
+@pytest.fixture
+def oc_native_watch_cache(
+    mocker,
+    oc_native: OCNative,
+    watched_kind: WatchedKind,
+) -> OCNative:
+    cache = mocker.Mock()
+    cache.get_store.return_value = watched_kind
+    oc_native.state_cache = cache
+    return oc_native
+
+
+def test_oc_native_get_items_from_watch_cache(
+    oc_native_watch_cache: OCNative,
+) -> None:
+    items = oc_native_watch_cache.get_items("kind1", namespace="ns1")
+    assert [i["metadata"]["name"] for i in items] == ["a"]
+    oc_native_watch_cache.client.resources.get.assert_not_called()
+
+
+def test_oc_native_get_from_watch_cache_falls_back(
+    oc_native_watch_cache: OCNative,
+) -> None:
+    assert oc_native_watch_cache.get("ns1", "kind1", "a")["metadata"]["name"] == "a"
+    oc_native_watch_cache.client.resources.get.assert_not_called()
+    oc_native_watch_cache.get("ns1", "kind1", "missing")
+    oc_native_watch_cache.client.resources.get.assert_called_once()
+
+
+def test_oc_native_bypasses_watch_cache_after_write(
+    mocker,
+    oc_native_watch_cache: OCNative,
+) -> None:
+    mocker.patch.object(OCCli, "_run", autospec=True)
+    oc_native_watch_cache._run(["apply", "-f", "-"])
+    assert oc_native_watch_cache.state_cache is None
+
+
+def test_oc_native_get_cluster_items_paginates(oc_native: OCNative) -> None:
+    obj_client = oc_native.client.resources.get.return_value
+    obj_client.get.return_value.to_dict.side_effect = [
+        {"metadata": {"continue": "token"}, "items": [{"a": 1}]},
+        {"metadata": {}, "items": [{"b": 2}]},
+    ]
+
+    assert oc_native.get_cluster_items("kind1", chunk_size=1) == [{"a": 1}, {"b": 2}]
+    assert obj_client.get.call_args_list[1].kwargs == {
+        "label_selector": "",
+        "limit": 1,
+        "_continue": "token",
+        "_request_timeout": 60,
+    }
+
+
+def test_oc_cli_get_cluster_items(mocker, oc_cli: OCCli) -> None:
+    run_json_items = mocker.patch.object(oc_cli, "_run_json_items", autospec=True)
+    run_json_items.return_value = iter([])
+
+    oc_cli.get_cluster_items("kind1", labels={"app": "a"})
+
+    run_json_items.assert_called_once_with([
+        "get",
+        "kind1",
+        "-o",
+        "json",
+        "--all-namespaces",
+        "--chunk-size=500",
+        "-l",
+        "app=a",
+    ])
+
+
+def fake_oc(oc_cli: OCCli, stdout: str, returncode: int = 0) -> None:
+    """Replaces the oc binary with a script printing stdout."""
+    oc_cli.oc_base_cmd = [
+        sys.executable,
+        "-c",
+        f"import sys; sys.stdout.write({stdout!r}); "
+        f"sys.stderr.write('error'); sys.exit({returncode})",
+    ]
+
+
+def test_oc_cli_iter_items_streams_list(mocker, oc_cli: OCCli) -> None:
+    mocker.patch.object(reconcile.utils.oc, "JSON_STREAM_READ_SIZE", 16)
+    items = [{"metadata": {"name": f"cm-{i}"}} for i in range(100)]
+    fake_oc(oc_cli, json.dumps({"apiVersion": "v1", "items": items, "kind": "List"}))
+
+    assert list(oc_cli.iter_items("ConfigMap", namespace="cluster")) == items
+    assert oc_cli.get_cluster_items("ConfigMap") == items
+
+
+def test_oc_cli_iter_items_error(mocker, oc_cli: OCCli) -> None:
+    sleep = mocker.patch.object(reconcile.utils.oc.time, "sleep")
+    fake_oc(oc_cli, "", returncode=1)
+
+    with pytest.raises(StatusCodeError, match="error"):
+        list(oc_cli.iter_items("ConfigMap", namespace="cluster"))
+    assert sleep.call_count == 9
+
+
+def test_oc_cli_iter_items_invalid_json(oc_cli: OCCli) -> None:
+    fake_oc(oc_cli, '{"items": [{"a": 1}')
+
+    with pytest.raises(JSONParsingError):
+        list(oc_cli.iter_items("ConfigMap", namespace="cluster"))
+
+
+def test_oc_cli_iter_items_no_output(mocker, oc_cli: OCCli) -> None:
+    sleep = mocker.patch.object(reconcile.utils.oc.time, "sleep")
+    fake_oc(oc_cli, "\n")
+
+    with pytest.raises(NoOutputError, match="error"):
+        list(oc_cli.iter_items("ConfigMap", namespace="cluster"))
+    assert sleep.call_count == 9
+
+
+def test_oc_native_iter_items_paginates(oc_native: OCNative) -> None:
+    obj_client = oc_native.client.resources.get.return_value
+    obj_client.get.return_value.to_dict.side_effect = [
+        {"metadata": {"continue": "token"}, "items": [{"a": 1}]},
+        {"metadata": {}, "items": [{"b": 2}]},
+    ]
+
+    items = oc_native.iter_items("kind1", labels={"label1": "value1"})
+
+    assert next(items) == {"a": 1}
+    assert obj_client.get.call_count == 1
+    assert list(items) == [{"b": 2}]
+    assert obj_client.get.call_args_list[1].kwargs == {
+        "namespace": "",
+        "label_selector": "label1=value1",
+        "limit": 500,
+        "_continue": "token",
+        "_request_timeout": 60,
+    }
+
+
+def test_oc_native_server_side_apply(oc_native: OCNative) -> None:
+    resource = OR(
+        {"apiVersion": "group1/v1", "kind": "kind1", "metadata": {"name": "a"}}, "", ""
+    )
+    oc_native.server_side_apply("ns1", resource, dry_run=True)
+
+    obj_client = oc_native.client.resources.get.return_value
+    obj_client.server_side_apply.assert_called_once_with(
+        body=resource.body,
+        namespace="ns1",
+        field_manager="qontract-reconcile",
+        force_conflicts=True,
+        dry_run="All",
+        _request_timeout=60,
+    )
+
+
+def test_oc_native_server_side_apply_immutable(oc_native: OCNative) -> None:
+    obj_client = oc_native.client.resources.get.return_value
+    obj_client.server_side_apply.side_effect = DynamicApiError(
+        ApiException(status=422, reason="Invalid value: x: field is immutable")
+    )
+    resource = OR(
+        {"apiVersion": "group1/v1", "kind": "kind1", "metadata": {"name": "a"}}, "", ""
+    )
+
+    with pytest.raises(FieldIsImmutableError):
+        oc_native.server_side_apply("ns1", resource)
+
+
+def test_oc_native_connection_pool_maxsize(monkeypatch, mocker, api_resources) -> None:
+    monkeypatch.setenv("USE_NATIVE_CLIENT", "True")
+    mocker.patch.object(
+        OCCli, "get_api_resources", autospec=True, return_value=api_resources
+    )
+    api_client = mocker.patch("reconcile.utils.oc.ApiClient", autospec=True)
+    mocker.patch("reconcile.utils.oc.DynamicClient", autospec=True)
+
+    OC("cluster", "server", "token", local=True, connection_pool_maxsize=1000)
+
+    configuration = api_client.call_args.args[0]
+    assert configuration.connection_pool_maxsize == 1000
+
+
+@pytest.fixture
+def api_resources_cache(mocker, tmp_path) -> DiskCache:
+    cache = DiskCache(str(tmp_path))
+    mocker.patch.object(reconcile.utils.oc, "API_RESOURCES_CACHE", cache)
+    return cache
+
+
+@pytest.fixture
+def oc_cli_with_server(monkeypatch, mocker) -> OCCli:
+    monkeypatch.setenv("USE_NATIVE_CLIENT", "False")
+    mocker.patch.object(OCCli, "get_version", autospec=True, return_value=b"4.14")
+    return OC("cluster", "server", "token")  # type: ignore[return-value]
+
+
+def test_get_api_resources_cached(
+    mocker, api_resources_cache: DiskCache, oc_cli_with_server: OCCli
+) -> None:
+    run = mocker.patch.object(oc_cli_with_server, "_run", autospec=True)
+    run.return_value = b"deployments  deploy  apps/v1  true  Deployment"
+
+    oc_cli_with_server.get_api_resources()
+    oc_cli_with_server.api_resources = {}
+    resources = oc_cli_with_server.get_api_resources()
+
+    run.assert_called_once()
+    assert oc_cli_with_server.api_resources_from_cache
+    assert resources["Deployment"][0].group_version == "apps/v1"
+    assert oc_cli_with_server.is_kind_namespaced("Deployment")
+
+
+def test_get_api_resources_rediscover_unknown_kind(
+    mocker, api_resources_cache: DiskCache, oc_cli_with_server: OCCli
+) -> None:
+    api_resources_cache.set(
+        "server:4.14",
+        {
+            "resources": {
+                "Deployment": [
+                    asdict(OCCliApiResource("Deployment", "apps", "v1", True))
+                ]
+            },
+        },
+    )
+
+    def api_resources(cmd: list[str]) -> bytes:
+        # the cached resources stay visible while they are being refreshed
+        assert "Deployment" in oc_cli_with_server.api_resources
+        return b"things  th  example.com/v1  false  Thing"
+
+    run = mocker.patch.object(oc_cli_with_server, "_run", side_effect=api_resources)
+
+    assert oc_cli_with_server.is_kind_supported("Deployment")
+    run.assert_not_called()
+    assert oc_cli_with_server.is_kind_supported("Thing")
+    run.assert_called_once()
+    assert not oc_cli_with_server.is_kind_namespaced("Thing")
+
+
+def test_get_api_resources_remembers_missing_kinds(
+    mocker, api_resources_cache: DiskCache, oc_cli_with_server: OCCli
+) -> None:
+    run = mocker.patch.object(oc_cli_with_server, "_run", autospec=True)
+    run.return_value = b"deployments  deploy  apps/v1  true  Deployment"
+    oc_cli_with_server.get_api_resources()
+    # another client reading the cache entry
+    oc_cli_with_server.api_resources = {}
+    oc_cli_with_server.get_api_resources()
+
+    assert not oc_cli_with_server.is_kind_supported("Project")
+    assert not oc_cli_with_server.is_kind_supported("Project")
+    assert run.call_count == 2
+    # misses are not shared, another client reading the cache refreshes again
+    oc_cli_with_server.api_resources = {}
+    oc_cli_with_server.api_resources_missing = frozenset()
+    oc_cli_with_server.get_api_resources()
+    assert not oc_cli_with_server.is_kind_supported("Project")
+    assert run.call_count == 3
@@ -0,0 +1,190 @@
+import copy
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from typing import Any
+
+import pytest
+import yaml
+from pytest_mock import MockerFixture
+
+from reconcile.test.fixtures import Fixtures
+from reconcile.utils import oc
+from reconcile.utils.openshift_template import (
+    TemplateProcessingError,
+    generate_value,
+    process_template,
+)
+
+fxt = Fixtures("openshift_template")
+
+CONFORMANCE_FIXTURES = ["parameters.yml", "non_string.yml", "namespaces_labels.yml"]
+RECORD_OC_OUTPUT = os.environ.get("OPENSHIFT_TEMPLATE_RECORD", "false") == "true"
+
+
+def load(fixture: str) -> dict[str, Any]:
+    return yaml.safe_load(fxt.get(fixture))
+
+
+def recorded_path(fixture: str) -> str:
+    return fxt.path(fixture.removesuffix(".yml") + ".oc.json")
+
+
+def record_oc_output(fixture: str) -> None:
+    """Writes the output of `oc process --local -o json` for a fixture next to
+    it, together with the version of the oc client that produced it."""
+    case = load(fixture)
+    oc_local = oc.OCLocal("cluster", None, None, local=True)
+    version = oc_local._run(["version", "--client", "-o", "json"])
+    cmd = ["process", "--local", "--ignore-unknown-parameters", "-o", "json"]
+    cmd += ["-f", "-"] + [f"{k}={v}" for k, v in case["parameters"].items()]
+    output = oc_local._run(cmd, stdin=json.dumps(case["template"], sort_keys=True))
+    recorded = {
+        "oc_version": json.loads(version)["clientVersion"]["gitVersion"],
+        "objects": json.loads(output)["items"],
+    }
+    with open(recorded_path(fixture), "w", encoding="locale") as f:
+        json.dump(recorded, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+@pytest.mark.parametrize("fixture", CONFORMANCE_FIXTURES)
+def test_process_template_expected(fixture: str) -> None:
+    case = load(fixture)
+    template = copy.deepcopy(case["template"])
+
+    assert process_template(template, case["parameters"]) == case["expected"]
+    assert template == case["template"]
+
+
+@pytest.mark.parametrize("fixture", CONFORMANCE_FIXTURES)
+def test_process_template_conformance(fixture: str) -> None:
+    if RECORD_OC_OUTPUT:
+        if shutil.which("oc") is None:
+            pytest.fail("recording needs the oc binary on PATH")
+        record_oc_output(fixture)
+    if not os.path.exists(recorded_path(fixture)):
+        pytest.skip(
+            "no recorded oc output, run with OPENSHIFT_TEMPLATE_RECORD=true "
+            "and oc on PATH to record it"
+        )
+    case = load(fixture)
+    recorded = json.loads(fxt.get(os.path.basename(recorded_path(fixture))))
+
+    assert (
+        process_template(case["template"], case["parameters"]) == (recorded["objects"])
+    )
+    assert case["expected"] == recorded["objects"]
+
+
+@pytest.mark.skipif(shutil.which("oc") is None, reason="oc binary not available")
+@pytest.mark.parametrize("fixture", CONFORMANCE_FIXTURES)
+def test_process_template_matches_oc_binary(fixture: str) -> None:
+    case = load(fixture)
+    oc_local = oc.OCLocal("cluster", None, None, local=True)
+
+    assert process_template(case["template"], case["parameters"]) == (
+        oc_local.process(case["template"], case["parameters"])
+    )
+
+
+def template(parameters: list[dict[str, Any]], value: Any) -> dict[str, Any]:
+    return {
+        "parameters": parameters,
+        "objects": [{"kind": "ConfigMap", "metadata": {"name": "c"}, "data": value}],
+    }
+
+
+def test_process_template_generates_values() -> None:
+    t = template(
+        [
+            {"name": "PASSWORD", "generate": "expression", "from": "[a-f0-9]{16}"},
+            {"name": "USER", "generate": "expression", "from": r"admin[\d]{4}"},
+        ],
+        {"password": "${PASSWORD}", "user": "${USER}"},
+    )
+
+    data = process_template(t)[0]["data"]
+
+    assert re.fullmatch(r"[a-f0-9]{16}", data["password"])
+    assert re.fullmatch(r"admin[0-9]{4}", data["user"])
+    # a passed value disables the generator
+    assert process_template(t, {"PASSWORD": "secret"})[0]["data"]["password"] == (
+        "secret"
+    )
+
+
+@pytest.mark.parametrize(
+    "expression,pattern",
+    [
+        (r"[\w]{8}", r"[a-zA-Z0-9_]{8}"),
+        (r"[\a]{8}", r"[a-zA-Z0-9]{8}"),
+        (r"x-[A-Z]{2}-[0-9]{3}", r"x-[A-Z]{2}-[0-9]{3}"),
+    ],
+)
+def test_generate_value(expression: str, pattern: str) -> None:
+    assert re.fullmatch(pattern, generate_value(expression))
+
+
+@pytest.mark.parametrize("expression", ["[a-z]{0}", "[a-z]{256}", "[z-a]{3}"])
+def test_generate_value_invalid(expression: str) -> None:
+    with pytest.raises(TemplateProcessingError):
+        generate_value(expression)
+
+
+@pytest.mark.parametrize("parameters", [None, {"NAME": ""}])
+def test_process_template_required_parameter(parameters: Any) -> None:
+    t = template([{"name": "NAME", "required": True}], {"name": "${NAME}"})
+
+    with pytest.raises(TemplateProcessingError, match="NAME is required"):
+        process_template(t, parameters)
+
+
+def test_process_template_invalid_non_string_value() -> None:
+    t = template([{"name": "COUNT", "value": "many"}], {"count": "${{COUNT}}"})
+
+    with pytest.raises(TemplateProcessingError, match="non-string"):
+        process_template(t)
+
+
+def test_oc_process_uses_binary_by_default(
+    mocker: MockerFixture, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    process = mocker.patch.object(oc.OCLocal, "process", return_value=[])
+    mocker.patch.object(oc.OCLocal, "__init__", return_value=None)
+    t = template([], {"a": "b"})
+
+    assert oc.oc_process(t, {"A": 1}) == []
+    process.assert_called_once_with(t, {"A": 1})
+
+    monkeypatch.setenv("OC_PROCESS_USE_BINARY", "false")
+    assert oc.oc_process(t)[0]["data"] == {"a": "b"}
+    process.assert_called_once()
+
+
+def test_process_template_parameter_without_name() -> None:
+    t = template([{"value": "a"}], {"a": "b"})
+
+    with pytest.raises(TemplateProcessingError, match="name is required"):
+        process_template(t)
+
+
+def test_benchmark_process_template() -> None:
+    case = load("parameters.yml")
+    t = copy.deepcopy(case["template"])
+    t["objects"] *= 50
+    runs = 200
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        items = process_template(t, case["parameters"])
+    elapsed = time.perf_counter() - start
+
+    logging.info(
+        f"processed {runs} templates of {len(t['objects'])} objects in "
+        f"{elapsed:.3f}s, {runs / elapsed:.0f} templates/s"
+    )
+    assert items == case["expected"] * 50
@@ -0,0 +1,77 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+
+from reconcile.utils.single_flight import SingleFlight
+
+
+def test_single_flight_memoizes() -> None:
+    flight: SingleFlight[str, int] = SingleFlight()
+    compute = MagicMock(return_value=1)
+
+    assert flight.get("key", compute) == 1
+    assert flight.get("key", compute) == 1
+    compute.assert_called_once()
+
+
+def test_single_flight_coalesces() -> None:
+    flight: SingleFlight[str, int] = SingleFlight(memoize=lambda _: False)
+    started = threading.Event()
+    release = threading.Event()
+
+    def compute() -> int:
+        started.set()
+        release.wait(timeout=5)
+        return 1
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(flight.get, "key", compute)
+        started.wait(timeout=5)
+        second = executor.submit(flight.get, "key", MagicMock())
+        release.set()
+        assert first.result() == second.result() == 1
+    assert "key" not in flight
+
+
+def test_single_flight_does_not_memoize_errors() -> None:
+    flight: SingleFlight[str, int] = SingleFlight()
+
+    with pytest.raises(ValueError):
+        flight.get("key", MagicMock(side_effect=ValueError("failed")))
+
+    assert "key" not in flight
+    assert flight.get("key", lambda: 1) == 1
+
+
+def test_single_flight_recomputes_stale_results() -> None:
+    flight: SingleFlight[str, int] = SingleFlight(stale=lambda value: value < 2)
+    compute = MagicMock(side_effect=[1, 2])
+
+    assert flight.get("key", compute) == 1
+    assert flight.get("key", compute) == 2
+    assert flight.get("key", compute) == 2
+
+
+def test_single_flight_evicts_least_recently_used() -> None:
+    flight: SingleFlight[str, int] = SingleFlight(max_size=2)
+    flight.get("a", lambda: 1)
+    flight.get("b", lambda: 2)
+    flight.get("a", lambda: 1)
+
+    flight.get("c", lambda: 3)
+
+    assert len(flight) == 2
+    assert "a" in flight
+    assert "b" not in flight
+
+
+def test_single_flight_put() -> None:
+    flight: SingleFlight[str, int] = SingleFlight()
+    flight.put("key", 1)
+    flight.put("key", 2)
+
+    assert flight.get("key", MagicMock()) == 1
+    flight.clear()
+    assert "key" not in flight
@@ -212,6 +212,17 @@ def test_add_with_metadata(integration_state: State) -> None:
     assert integration_state.get("k") == "v"
 
 
+def test_set_and_get_bytes(integration_state: State) -> None:
+    integration_state.set_bytes("k", b"\x1f\x8b\x00")
+
+    assert integration_state.get_bytes("k") == b"\x1f\x8b\x00"
+
+
+def test_get_bytes_missing_key(integration_state: State) -> None:
+    with pytest.raises(KeyError):
+        integration_state.get_bytes("k")
+
+
 #
 # aquire settings
 #
@@ -0,0 +1,209 @@
+import copy
+import importlib
+import inspect
+import json
+import logging
+import time
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from typing import Any
+
+import pytest
+import yaml
+from pydantic import (
+    BaseModel,
+    Extra,
+    Field,
+    Json,
+    ValidationError,
+)
+from pytest_mock import MockerFixture
+
+from reconcile.gql_definitions.common.app_interface_vault_settings import (
+    AppInterfaceVaultSettingsQueryData,
+    query,
+)
+from reconcile.utils.gql import registered_definitions
+from reconcile.utils.trusted_model import (
+    build_trusted,
+    query_trusted,
+)
+
+FIXTURES_DIR = Path(__file__).parent.parent / "fixtures"
+BENCHMARK_ROUNDS = 50
+
+
+def generated_models() -> list[type[BaseModel]]:
+    models: list[type[BaseModel]] = []
+    for module_name in registered_definitions():
+        module = importlib.import_module(module_name)
+        models.extend(
+            cls
+            for cls in vars(module).values()
+            if inspect.isclass(cls)
+            and issubclass(cls, BaseModel)
+            and cls.__module__ == module_name
+        )
+    return models
+
+
+def matching_model(
+    models: list[type[BaseModel]], data: dict[str, Any]
+) -> type[BaseModel] | None:
+    for cls in models:
+        aliases = {f.alias for f in cls.__fields__.values()}
+        required = {f.alias for f in cls.__fields__.values() if f.required}
+        if required <= data.keys() <= aliases:
+            try:
+                cls.parse_obj(copy.deepcopy(data))
+            except ValidationError:
+                continue
+            return cls
+    return None
+
+
+@pytest.fixture(scope="module")
+def corpus() -> list[tuple[type[BaseModel], dict[str, Any]]]:
+    """Recorded responses in the test fixtures, with the generated model
+    they validate as."""
+    models = generated_models()
+    corpus = []
+    for path in sorted(FIXTURES_DIR.rglob("*")):
+        try:
+            if path.suffix in {".yml", ".yaml"}:
+                docs = list(yaml.safe_load_all(path.read_text()))
+            elif path.suffix == ".json":
+                docs = [json.loads(path.read_text())]
+            else:
+                continue
+        except (ValueError, yaml.YAMLError):
+            continue
+        for doc in docs:
+            if isinstance(doc, dict) and doc and (cls := matching_model(models, doc)):
+                corpus.append((cls, doc))
+    return corpus
+
+
+def test_build_trusted_matches_validation(
+    corpus: list[tuple[type[BaseModel], dict[str, Any]]],
+) -> None:
+    assert len(corpus) > 10
+    for cls, data in corpus:
+        validated = cls.parse_obj(copy.deepcopy(data))
+        trusted = build_trusted(cls, copy.deepcopy(data))
+        # repr shows the classes union members were resolved to
+        assert repr(trusted) == repr(validated)
+        assert trusted.__fields_set__ == validated.__fields_set__
+
+
+def test_benchmark_build_trusted(
+    mocker: MockerFixture,
+    corpus: list[tuple[type[BaseModel], dict[str, Any]]],
+) -> None:
+    start = time.perf_counter()
+    for _ in range(BENCHMARK_ROUNDS):
+        for cls, data in corpus:
+            cls.parse_obj(data)
+    validated = time.perf_counter() - start
+
+    parse_obj = mocker.spy(BaseModel, "parse_obj")
+    start = time.perf_counter()
+    for _ in range(BENCHMARK_ROUNDS):
+        for cls, data in corpus:
+            build_trusted(cls, data)
+    trusted = time.perf_counter() - start
+
+    logging.info(
+        f"{BENCHMARK_ROUNDS} x {len(corpus)} recorded responses: "
+        f"{validated:.3f}s validated, {trusted:.3f}s trusted, "
+        f"{parse_obj.call_count} validated again"
+    )
+    # only responses that don't fit their model are validated
+    assert parse_obj.call_count < BENCHMARK_ROUNDS * len(corpus)
+
+
+class Color(Enum):
+    RED = "red"
+
+
+class ConfiguredBaseModel(BaseModel):
+    class Config:
+        smart_union = True
+        extra = Extra.forbid
+
+
+class Leaf(ConfiguredBaseModel):
+    name: str = Field(..., alias="name")
+
+
+class LeafWithColor(ConfiguredBaseModel):
+    name: str = Field(..., alias="name")
+    color: Color = Field(..., alias="color")
+
+
+class Twin(ConfiguredBaseModel):
+    name: str = Field(..., alias="name")
+
+
+class Root(ConfiguredBaseModel):
+    created: datetime = Field(..., alias="created")
+    ratio: float = Field(..., alias="ratio")
+    labels: Json | None = Field(..., alias="labels")
+    leaves: list[LeafWithColor | Leaf] | None = Field(..., alias="leaves")
+    by_name: dict[str, Leaf] = Field(..., alias="byName")
+
+
+class Ambiguous(ConfiguredBaseModel):
+    leaf: Leaf | Twin = Field(..., alias="leaf")
+
+
+def test_build_trusted_conversions() -> None:
+    data = {
+        "created": "2024-01-01T00:00:00Z",
+        "ratio": 1,
+        "labels": '{"a": "b"}',
+        "leaves": [{"name": "a"}, {"name": "b", "color": "red"}],
+        "byName": {"a": {"name": "a"}},
+    }
+
+    trusted = build_trusted(Root, copy.deepcopy(data))
+
+    assert repr(trusted) == repr(Root.parse_obj(copy.deepcopy(data)))
+    assert isinstance(trusted.leaves[1], LeafWithColor)  # type: ignore[index]
+    assert trusted.leaves[1].color is Color.RED  # type: ignore[index]
+    assert trusted.labels == {"a": "b"}
+    assert isinstance(trusted.ratio, float)
+
+
+def test_build_trusted_ambiguous_union_is_validated(mocker: Any) -> None:
+    parse_obj = mocker.spy(Ambiguous, "parse_obj")
+
+    trusted = build_trusted(Ambiguous, {"leaf": {"name": "a"}})
+
+    assert parse_obj.call_count == 1
+    assert isinstance(trusted.leaf, Leaf)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [{"name": "a", "unknown": 1}, {}, []],
+)
+def test_build_trusted_invalid_data_raises(data: Any) -> None:
+    with pytest.raises(ValidationError):
+        build_trusted(Leaf, data)
+
+
+def test_query_trusted(mocker: Any, monkeypatch: pytest.MonkeyPatch) -> None:
+    gql_api = mocker.Mock(sha="abc123")
+    gql_api.query.return_value = {"vault_settings": [{"vault": True}]}
+    parse_obj = mocker.spy(AppInterfaceVaultSettingsQueryData, "parse_obj")
+    expected = AppInterfaceVaultSettingsQueryData.parse_obj(gql_api.query.return_value)
+    parse_obj.reset_mock()
+
+    assert query_trusted(query, gql_api) == expected
+    monkeypatch.setenv("GQL_TRUSTED_RESPONSES", "true")
+    assert query_trusted(query, gql_api) == expected
+    gql_api.sha = None
+    assert query_trusted(query, gql_api) == expected
+    parse_obj.assert_not_called()
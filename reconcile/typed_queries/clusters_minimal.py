@@ -4,6 +4,7 @@ from reconcile.gql_definitions.common.clusters_minimal import (
 )
 from reconcile.utils import gql
 from reconcile.utils.gql import GqlApi
+from reconcile.utils.trusted_model import query_trusted
 
 
 def get_clusters_minimal(
@@ -13,5 +14,5 @@ def get_clusters_minimal(
     if name:
         variables["name"] = name
     api = gql_api if gql_api else gql.get_api()
-    data = query(query_func=api.query, variables=variables)
+    data = query_trusted(query, api, variables=variables)
     return list(data.clusters or [])
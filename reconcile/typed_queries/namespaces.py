@@ -3,9 +3,10 @@ from reconcile.gql_definitions.common.namespaces import (
     query,
 )
 from reconcile.utils import gql
+from reconcile.utils.trusted_model import query_trusted
 
 
 def get_namespaces() -> list[NamespaceV1]:
     gqlapi = gql.get_api()
-    data = query(gqlapi.query)
+    data = query_trusted(query, gqlapi)
     return list(data.namespaces or [])
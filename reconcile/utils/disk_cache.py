@@ -0,0 +1,212 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from collections.abc import Callable
+from contextlib import suppress
+from pathlib import Path
+from threading import Lock
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Protocol,
+)
+
+if TYPE_CHECKING:
+    from reconcile.utils.state import State
+
+DEFAULT_CACHE_ROOT = os.path.join(tempfile.gettempdir(), "qontract-reconcile-cache")
+# scanning the cache directory is not free, only check its size every
+# EVICTION_INTERVAL writes
+EVICTION_INTERVAL = 100
+
+
+def cache_dir(name: str) -> str:
+    """
+    Directory for a named cache. The root can be moved with the
+    QONTRACT_RECONCILE_CACHE_DIR env variable, e.g. to a persistent volume.
+    """
+    root = os.environ.get("QONTRACT_RECONCILE_CACHE_DIR", DEFAULT_CACHE_ROOT)
+    return os.path.join(root, name)
+
+
+class DiskCache:
+    """
+    A size-bounded key/value cache of JSON serializable values stored as
+    files on local disk, shared between runs of the same process and between
+    processes on the same host.
+
+    Entries expire after `ttl` seconds (None means never). When the cache
+    grows beyond `max_bytes`, least recently used entries are evicted.
+    Read and write errors are logged and treated as cache misses, a broken
+    cache must never break an integration.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        ttl: float | None = None,
+        max_bytes: int | None = None,
+    ):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self._writes = 0
+
+    def _path(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.directory / digest[:2] / digest
+
+    def get(self, key: str) -> Any | None:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.debug(f"unable to read cache entry {path}: {e}")
+            return None
+        expire_at = entry.get("expire_at")
+        if expire_at is not None and expire_at < time.time():
+            self.delete(key)
+            return None
+        # the mtime is the LRU timestamp
+        with suppress(OSError):
+            os.utime(path)
+        return entry["value"]
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        entry = {
+            "key": key,
+            "expire_at": time.time() + ttl if ttl is not None else None,
+            "value": value,
+        }
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # write to a temporary file first to never expose partial entries
+            with tempfile.NamedTemporaryFile(
+                "w", dir=path.parent, delete=False, encoding="utf-8"
+            ) as f:
+                json.dump(entry, f)
+            os.replace(f.name, path)
+        except (OSError, TypeError, ValueError) as e:
+            logging.debug(f"unable to write cache entry {path}: {e}")
+            return
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % EVICTION_INTERVAL == 1
+        if evict:
+            self.evict()
+
+    def delete(self, key: str) -> None:
+        with suppress(OSError):
+            self._path(key).unlink()
+
+    def evict(self) -> None:
+        """Removes least recently used entries until max_bytes is satisfied."""
+        if self.max_bytes is None:
+            return
+        with self._lock:
+            entries = []
+            for path in self.directory.glob("*/*"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= size
+
+
+class SharedTierCache(Protocol):
+    shared: "State | None"
+
+
+def init_shared_tier(cache: SharedTierCache, name: str) -> None:
+    """
+    Adds the app-interface state bucket as a tier of cache shared between
+    integration pods, if the env variable of name is set, e.g.
+    SAAS_SOURCE_CACHE_SHARED for saas-source-cache. Needs an initialized gql
+    connection to find the state settings.
+    """
+    if cache.shared is not None:
+        return
+    env = f"{name.upper().replace('-', '_')}_SHARED"
+    if os.environ.get(env, "false").lower() != "true":
+        return
+    # the state settings are queried from app-interface
+    from reconcile.utils.state import init_state  # noqa: PLC0415
+
+    try:
+        cache.shared = init_state(integration=name)
+    except Exception as e:
+        logging.warning(f"unable to use the shared {name}: {e}")
+
+
+class TieredCache(SharedTierCache, Protocol):
+    disk: DiskCache | None
+
+
+def get_tiered(
+    cache: TieredCache,
+    key: str,
+    name: str,
+    ttl: Callable[[Any], float | None] = lambda _: None,
+) -> tuple[Any | None, str]:
+    """
+    Looks key up on the disk of cache, then in its shared tier, copying
+    shared hits to disk. Returns the value and the tier it was found in, or
+    None and "miss". ttl returns the seconds a value is still valid for,
+    None if it never expires; expired values are misses.
+    """
+
+    def valid(value: Any) -> bool:
+        remaining = ttl(value)
+        return remaining is None or remaining > 0
+
+    if cache.disk:
+        value = cache.disk.get(key)
+        if value is not None and valid(value):
+            return value, "disk"
+    if cache.shared is not None:
+        try:
+            value = cache.shared.get(key, None)
+        except Exception as e:
+            logging.debug(f"unable to read shared {name} entry {key}: {e}")
+            return None, "miss"
+        if value is not None and valid(value):
+            if cache.disk:
+                cache.disk.set(key, value, ttl=ttl(value))
+            return value, "shared"
+    return None, "miss"
+
+
+def set_tiered(
+    cache: TieredCache,
+    key: str,
+    value: Any,
+    name: str,
+    ttl: float | None = None,
+    share: bool = True,
+) -> None:
+    """Stores value on the disk of cache and, if share is set, in its shared tier."""
+    if cache.disk:
+        cache.disk.set(key, value, ttl=ttl)
+    if cache.shared is not None and share:
+        try:
+            cache.shared[key] = value
+        except Exception as e:
+            logging.debug(f"unable to write shared {name} entry {key}: {e}")
@@ -19,6 +19,19 @@ def clone(repo_url, wd, depth=None, verify=True):
         raise GitError(f"git clone failed: {repo_url}")
 
 
+def fetch_commit(repo_url, commit, wd, verify=True):
+    """Checks out a single commit of repo_url into wd, without its history."""
+    config = [] if verify else ["-c", "http.sslVerify=false"]
+    for cmd in (
+        ["git", "init", "-q"],
+        ["git", *config, "fetch", "-q", "--depth", "1", repo_url, commit],
+        ["git", "checkout", "-q", "FETCH_HEAD"],
+    ):
+        result = subprocess.run(cmd, cwd=wd, capture_output=True, check=False)
+        if result.returncode != 0:
+            raise GitError(f"git fetch failed: {repo_url} {commit}")
+
+
 def checkout(commit, wd):
     cmd = ["git", "checkout", commit]
     result = subprocess.run(cmd, cwd=wd, capture_output=True, check=False)
@@ -1,12 +1,35 @@
 import contextlib
+import copy
+import functools
+import hashlib
+import importlib
+import json
 import logging
+import os
+import pkgutil
+import re
+import socket
 import textwrap
 import threading
+import time
+from collections import defaultdict
+from collections.abc import (
+    Callable,
+    Hashable,
+    Iterable,
+    Mapping,
+)
+from concurrent.futures import Future
+from dataclasses import dataclass
 from datetime import (
     UTC,
     datetime,
 )
-from typing import Any
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    TypeVar,
+)
 from urllib.parse import urlparse
 
 import requests
@@ -17,13 +40,35 @@ from gql import (
 from gql.transport.exceptions import TransportQueryError
 from gql.transport.requests import RequestsHTTPTransport
 from gql.transport.requests import log as requests_logger
+from graphql import (
+    DocumentNode,
+    ExecutionResult,
+    FieldNode,
+    OperationDefinitionNode,
+    build_client_schema,
+    get_introspection_query,
+    validate,
+)
+from requests.adapters import HTTPAdapter
 from requests.auth import AuthBase
 from requests.cookies import RequestsCookieJar
 from sentry_sdk import capture_exception
 from sretoolbox.utils import retry
+from urllib3.connection import HTTPConnection
 
 from reconcile.status import RunningState
+from reconcile.utils import metrics
 from reconcile.utils.config import get_config
+from reconcile.utils.disk_cache import (
+    DiskCache,
+    cache_dir,
+    get_tiered,
+    set_tiered,
+)
+from reconcile.utils.single_flight import SingleFlight
+
+if TYPE_CHECKING:
+    from reconcile.utils.state import State
 
 INTEGRATIONS_QUERY = """
 {
@@ -35,6 +80,23 @@ INTEGRATIONS_QUERY = """
 }
 """
 
+# distinct queries to keep parsed, the definitions plus dynamic queries
+PARSED_QUERY_CACHE_SIZE = 2048
+# resources_v1 fields per query of GqlApi.get_resources
+RESOURCES_BATCH_SIZE = 50
+# connections kept open to the GraphQL server, shared by all threads
+POOL_MAXSIZE = int(os.environ.get("GQL_POOL_MAXSIZE", 32))
+KEEPALIVE_SOCKET_OPTIONS = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+if hasattr(socket, "TCP_KEEPIDLE"):
+    KEEPALIVE_SOCKET_OPTIONS += [
+        (socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 60),
+        (socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10),
+        (socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3),
+    ]
+SHA_URL_PATH_RE = re.compile(r"/graphqlsha/(?P<sha>[0-9a-f]+)/?$")
+
+T = TypeVar("T")
+
 requests_logger.setLevel(logging.WARNING)
 
 
@@ -53,6 +115,93 @@ class GqlApiError(Exception):
     pass
 
 
+def operation_name(document: DocumentNode) -> str:
+    for definition in document.definitions:
+        if isinstance(definition, OperationDefinitionNode) and definition.name:
+            return definition.name.value
+    return "anonymous"
+
+
+def query_name(document: DocumentNode) -> str:
+    """The operation name, or the first top level field of anonymous queries
+    like the ones in reconcile.queries."""
+    name = operation_name(document)
+    if name != "anonymous":
+        return name
+    for definition in document.definitions:
+        if isinstance(definition, OperationDefinitionNode):
+            for selection in definition.selection_set.selections:
+                if isinstance(selection, FieldNode):
+                    return (selection.alias or selection.name).value
+    return name
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    response_bytes: int = 0
+    parse_seconds: float = 0.0
+
+
+_query_stats: dict[str, QueryStats] = defaultdict(QueryStats)
+_query_stats_lock = threading.Lock()
+
+
+def record_query_stats(name: str, response_bytes: int, parse_seconds: float) -> None:
+    metrics.gql_response_bytes.labels(query=name).inc(response_bytes)
+    metrics.gql_response_parse_time.labels(query=name).observe(parse_seconds)
+    with _query_stats_lock:
+        stats = _query_stats[name]
+        stats.count += 1
+        stats.response_bytes += response_bytes
+        stats.parse_seconds += parse_seconds
+
+
+def query_report() -> str:
+    """Bytes received and time spent decoding the responses per query since
+    the start of the process, largest first."""
+    with _query_stats_lock:
+        stats = sorted(
+            _query_stats.items(), key=lambda item: item[1].response_bytes, reverse=True
+        )
+    return "\n".join(
+        f"{name}: {s.count} queries, {s.response_bytes / 2**20:.2f} MiB, "
+        f"{s.parse_seconds:.3f}s parsing"
+        for name, s in stats
+    )
+
+
+@functools.lru_cache(maxsize=PARSED_QUERY_CACHE_SIZE)
+def parse_query(query: str) -> DocumentNode:
+    """
+    Parses a query once per process. Queries are mostly the constant
+    DEFINITION strings of reconcile.gql_definitions, so the parsed documents
+    are reused instead of parsing them on every GqlApi.query call.
+    """
+    start = time.perf_counter()
+    document = gql(query)
+    elapsed = time.perf_counter() - start
+    operation = operation_name(document)
+    metrics.gql_query_parse_time.labels(operation=operation).observe(elapsed)
+    logging.debug(f"parsed gql query {operation} in {elapsed:.4f}s")
+    return document
+
+
+def registered_definitions(
+    package: str = "reconcile.gql_definitions",
+) -> dict[str, str]:
+    """Returns the DEFINITION of every query module in package by module."""
+    definitions = {}
+    for module_info in pkgutil.walk_packages(
+        importlib.import_module(package).__path__, prefix=f"{package}."
+    ):
+        module = importlib.import_module(module_info.name)
+        definition = getattr(module, "DEFINITION", None)
+        if isinstance(definition, str):
+            definitions[module_info.name] = definition
+    return definitions
+
+
 class GqlApiIntegrationNotFound(Exception):
     def __init__(self, integration):
         msg = f"""
@@ -80,6 +229,86 @@ class GqlGetResourceError(Exception):
         super().__init__(f"Error getting resource from path {path}: {msg!s}")
 
 
+class GqlResponseCache:
+    """
+    Responses of queries against a bundle SHA never change, so they are
+    cached by (sha, query, variables): on local disk if
+    GQL_RESPONSE_CACHE_ENABLED is set, bounded in size with least recently
+    used entries evicted first, and optionally in a State
+    shared between all integration pods. A shared State is not evicted by
+    us, expire old entries with a lifecycle rule on the bucket.
+
+    A snapshot of commonly used responses, see reconcile.utils.gql_snapshot,
+    is looked up before all other tiers.
+    """
+
+    def __init__(self, disk: DiskCache | None, shared: "State | None" = None):
+        self.disk = disk
+        self.shared = shared
+        self.snapshot: dict[str, dict[str, Any]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.disk is not None or self.shared is not None or bool(self.snapshot)
+
+    @staticmethod
+    def key(sha: str, query: str, variables: dict[str, Any] | None) -> str | None:
+        try:
+            serialized_variables = json.dumps(variables, sort_keys=True)
+        except (TypeError, ValueError):
+            return None
+        normalized_query = " ".join(query.split())
+        digest = hashlib.sha256(
+            f"{normalized_query}\0{serialized_variables}".encode()
+        ).hexdigest()
+        return f"{sha}/{digest}"
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        if key in self.snapshot:
+            # callers may modify the result, the snapshot is read for every hit
+            return copy.deepcopy(self.snapshot[key])
+        result, _ = get_tiered(self, key, "gql cache")
+        return result
+
+    def set(self, key: str, result: dict[str, Any]) -> None:
+        set_tiered(self, key, result, "gql cache")
+
+
+RESPONSE_CACHE = GqlResponseCache(
+    DiskCache(
+        cache_dir("gql-responses"),
+        max_bytes=int(os.environ.get("GQL_RESPONSE_CACHE_MAX_BYTES", 1024**3)),
+    )
+    if os.environ.get("GQL_RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+    else None
+)
+
+
+class GqlMemo:
+    """
+    Memoizes results by key for the lifetime of a GqlApi, which reads a
+    single bundle. Threads asking for a key that is being computed wait for
+    that computation instead of repeating it. Errors are not memoized.
+
+    Lookups are counted in qontract_reconcile_gql_memo_lookups_total by
+    result: hit, shared (waited for another thread) or miss.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._results: SingleFlight[Hashable, Any] = SingleFlight()
+
+    def get(self, key: Hashable, compute: Callable[[], T]) -> T:
+        future, owner = self._results.claim(key)
+        if not owner:
+            result = "hit" if future.done() else "shared"
+            metrics.gql_memo_lookups.labels(memo=self.name, result=result).inc()
+            return future.result()
+
+        metrics.gql_memo_lookups.labels(memo=self.name, result="miss").inc()
+        return self._results.run(key, future, compute)
+
+
 class GqlApi:
     _valid_schemas: list[str] = []
     _queried_schemas: set[Any] = set()
@@ -92,13 +321,23 @@ class GqlApi:
         validate_schemas=False,
         commit: str | None = None,
         commit_timestamp: str | None = None,
+        pool_maxsize: int = POOL_MAXSIZE,
     ) -> None:
         self.url = url
+        self.pool_maxsize = pool_maxsize
         self.token = token
         self.integration = int_name
         self.validate_schemas = validate_schemas
         self.commit = commit
         self.commit_timestamp = commit_timestamp
+        self._resources_in_flight: SingleFlight[str, list[dict[str, Any]]] = (
+            SingleFlight(memoize=lambda _: False)
+        )
+        self.templates = GqlMemo("template")
+        self.lookups = GqlMemo("lookup")
+        match = SHA_URL_PATH_RE.search(urlparse(url).path)
+        # queries against a bundle SHA are immutable and can be cached
+        self.sha = match.group("sha") if match else None
         self.client = self._init_gql_client()
 
         if validate_schemas and not int_name:
@@ -123,7 +362,10 @@ class GqlApi:
             # The token stored in vault is already in the format 'Basic ...'
             req_headers = {"Authorization": self.token}
         transport = PersistentRequestsHTTPTransport(
-            requests.Session(), self.url, headers=req_headers, timeout=30
+            pooled_session(self.pool_maxsize),
+            self.url,
+            headers=req_headers,
+            timeout=30,
         )
         return Client(transport=transport)
 
@@ -136,23 +378,10 @@ class GqlApi:
     def query(
         self, query: str, variables=None, skip_validation=False
     ) -> dict[str, Any] | None:
-        try:
-            result = self.client.execute(
-                gql(query), variables, get_execution_result=True
-            ).formatted
-        except requests.exceptions.ConnectionError as e:
-            raise GqlApiError(f"Could not connect to GraphQL server ({e})") from None
-        except TransportQueryError as e:
-            raise GqlApiError(f"`error` returned with GraphQL response {e}") from None
-        except AssertionError:
-            raise GqlApiError(
-                "`data` field missing from GraphQL response payload"
-            ) from None
-        except Exception as e:
-            raise GqlApiError("Unexpected error occurred") from e
+        result = self.query_response(query, variables)
 
         # show schemas if log level is debug
-        query_schemas = result.get("extensions", {}).get("schemas", [])
+        query_schemas = result["extensions"]["schemas"]
         self._queried_schemas.update(query_schemas)
 
         for s in query_schemas:
@@ -172,7 +401,53 @@ class GqlApi:
 
         return result["data"]
 
+    def query_response(
+        self, query: str, variables: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        """
+        Returns the data and the queried schemas of a query, from the
+        response cache if possible. Does not validate the schemas.
+        """
+        cache_key = (
+            GqlResponseCache.key(self.sha, query, variables)
+            if self.sha and RESPONSE_CACHE.enabled
+            else None
+        )
+        result = RESPONSE_CACHE.get(cache_key) if cache_key else None
+        if result is None:
+            response = self._execute(query, variables)
+            result = {
+                "data": response.get("data"),
+                "extensions": {
+                    "schemas": (response.get("extensions") or {}).get("schemas", [])
+                },
+            }
+            if cache_key and result["data"] is not None:
+                RESPONSE_CACHE.set(cache_key, result)
+        return result
+
+    def _execute(self, query: str, variables: dict[str, Any] | None) -> dict[str, Any]:
+        try:
+            return dict(
+                self.client.execute(
+                    parse_query(query), variables, get_execution_result=True
+                ).formatted
+            )
+        except requests.exceptions.ConnectionError as e:
+            raise GqlApiError(f"Could not connect to GraphQL server ({e})") from None
+        except TransportQueryError as e:
+            raise GqlApiError(f"`error` returned with GraphQL response {e}") from None
+        except AssertionError:
+            raise GqlApiError(
+                "`data` field missing from GraphQL response payload"
+            ) from None
+        except Exception as e:
+            raise GqlApiError("Unexpected error occurred") from e
+
     def get_template(self, path: str) -> dict[str, str]:
+        return self.templates.get(path, lambda: self._fetch_template(path))
+
+    def _fetch_template(self, path: str) -> dict[str, str]:
         query = """
         query Template($path: String) {
           templates: template_v1(path: $path) {
@@ -196,30 +471,80 @@ class GqlApi:
         return templates[0]
 
     def get_resource(self, path: str) -> dict[str, Any]:
-        query = """
-        query Resource($path: String) {
-            resources: resources_v1 (path: $path) {
-                path
-                content
-                sha256sum
-            }
-        }
-        """
-
-        try:
-            # Do not validate schema in resources since schema support in the
-            # resources is not complete.
-            resources = self.query(query, {"path": path}, skip_validation=True)[
-                "resources"
-            ]
-        except GqlApiError:
-            raise GqlGetResourceError(path, "Resource not found.") from None
-
+        resources = self._fetch_resources([path])[path].result()
         if len(resources) != 1:
             raise GqlGetResourceError(path, "Expecting one and only one resource.")
 
         return resources[0]
 
+    def get_resources(self, paths: Iterable[str]) -> dict[str, dict[str, Any]]:
+        """
+        Returns the resources (resources_v1) of many paths by path, with one
+        query per RESOURCES_BATCH_SIZE paths. Paths not matching exactly one
+        resource are left out.
+        """
+        futures = self._fetch_resources(paths)
+        results = {}
+        for path, future in futures.items():
+            resources = future.result()
+            if len(resources) == 1:
+                results[path] = resources[0]
+        return results
+
+    def _fetch_resources(
+        self, paths: Iterable[str]
+    ) -> dict[str, Future[list[dict[str, Any]]]]:
+        """
+        Fetches resources in batches of aliased resources_v1 fields. A path
+        already being fetched by another thread isn't fetched again, instead
+        its in-flight request is shared.
+        """
+        futures: dict[str, Future[list[dict[str, Any]]]] = {}
+        to_fetch = []
+        for path in paths:
+            if path in futures:
+                continue
+            futures[path], owner = self._resources_in_flight.claim(path)
+            if owner:
+                to_fetch.append(path)
+
+        for i in range(0, len(to_fetch), RESOURCES_BATCH_SIZE):
+            batch = to_fetch[i : i + RESOURCES_BATCH_SIZE]
+            fields = "\n".join(
+                f"r{n}: resources_v1(path: $p{n}) {{ path content sha256sum }}"
+                for n in range(len(batch))
+            )
+            parameters = ", ".join(f"$p{n}: String" for n in range(len(batch)))
+            query = f"query Resources({parameters}) {{\n{fields}\n}}"
+            error: Exception | None = None
+            data = None
+            try:
+                # Do not validate schema in resources since schema support in the
+                # resources is not complete.
+                data = self.query(
+                    query,
+                    {f"p{n}": path for n, path in enumerate(batch)},
+                    skip_validation=True,
+                )
+            # waiting threads must never be left hanging
+            except Exception as e:
+                error = e
+            for n, path in enumerate(batch):
+                if data is not None:
+                    self._resources_in_flight.resolve(
+                        path, futures[path], data.get(f"r{n}") or []
+                    )
+                elif error is None or isinstance(error, GqlApiError):
+                    self._resources_in_flight.fail(
+                        path,
+                        futures[path],
+                        GqlGetResourceError(path, "Resource not found."),
+                    )
+                else:
+                    self._resources_in_flight.fail(path, futures[path], error)
+
+        return futures
+
     def get_resources_by_schema(self, schema: str) -> list[dict[str, str]]:
         """Return all resources (resources_v1) filtered by given schema."""
         query = """
@@ -240,6 +565,20 @@ class GqlApi:
     def get_queried_schemas(self):
         return list(self._queried_schemas)
 
+    def validate_definitions(self, definitions: Mapping[str, str]) -> dict[str, str]:
+        """
+        Validates query definitions against the server schema, fetched once
+        by introspection, and parses them into the parsed query cache on the
+        way. Returns the validation errors by definition name.
+        """
+        introspection = self.query(get_introspection_query(), skip_validation=True)
+        schema = build_client_schema(introspection)
+        errors = {}
+        for name, definition in definitions.items():
+            if validation_errors := validate(schema, parse_query(definition)):
+                errors[name] = "; ".join(e.message for e in validation_errors)
+        return errors
+
     @property
     def commit_timestamp_utc(self) -> str | None:
         if self.commit_timestamp:
@@ -300,6 +639,40 @@ def get_resource(path: str) -> dict[str, Any]:
     return get_api().get_resource(path)
 
 
+def get_resources(paths: Iterable[str]) -> dict[str, dict[str, Any]]:
+    return get_api().get_resources(paths)
+
+
+class KeepAliveHTTPAdapter(HTTPAdapter):
+    """
+    Enables TCP keep-alive on pooled connections, so connections idle
+    between queries aren't silently dropped by load balancers and the next
+    query doesn't hang on a dead socket.
+    """
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        kwargs["socket_options"] = [
+            *HTTPConnection.default_socket_options,
+            *KEEPALIVE_SOCKET_OPTIONS,
+        ]
+        super().init_poolmanager(*args, **kwargs)
+
+
+def pooled_session(pool_maxsize: int) -> requests.Session:
+    """
+    A session keeping up to pool_maxsize connections to the GraphQL server
+    open. Threads wait for a free connection instead of opening one that is
+    discarded afterwards, so size the pool to the threads querying.
+    """
+    session = requests.Session()
+    adapter = KeepAliveHTTPAdapter(
+        pool_connections=1, pool_maxsize=pool_maxsize, pool_block=True
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
 class PersistentRequestsHTTPTransport(RequestsHTTPTransport):
     """A transport for the GQL Client that uses an existing.
     Is a reduced version of the RequestsHTTPTransport class from gql library
@@ -336,6 +709,38 @@ class PersistentRequestsHTTPTransport(RequestsHTTPTransport):
         # can't directly assign, due to mypy type checking
         self.session = session  # type: ignore
 
+    def execute(
+        self,
+        document: DocumentNode,
+        variable_values: dict[str, Any] | None = None,
+        operation_name: str | None = None,
+        timeout: int | None = None,
+        extra_args: dict[str, Any] | None = None,
+        upload_files: bool = False,
+    ) -> ExecutionResult:
+        start = time.perf_counter()
+        received: list[tuple[int, float]] = []
+
+        def on_response(response: requests.Response, *args: Any, **kwargs: Any) -> None:
+            # called once the body is downloaded, before it is decoded
+            received.append((len(response.content), time.perf_counter()))
+
+        result = super().execute(
+            document,
+            variable_values,
+            operation_name,
+            timeout,
+            {**(extra_args or {}), "hooks": {"response": on_response}},
+            upload_files,
+        )
+        end = time.perf_counter()
+        name = query_name(document)
+        metrics.gql_request_time.labels(query=name).observe(end - start)
+        if received:
+            response_bytes, received_at = received[-1]
+            record_query_stats(name, response_bytes, end - received_at)
+        return result
+
     def connect(self):
         pass
 
@@ -379,7 +784,7 @@ def init_from_config(
 
     if print_url:
         logging.info(f"using gql endpoint {server}")
-    return init(
+    api = init(
         server,
         token,
         integration,
@@ -387,6 +792,33 @@ def init_from_config(
         commit=commit,
         commit_timestamp=timestamp,
     )
+    if (
+        os.environ.get("GQL_VALIDATE_DEFINITIONS", "false").lower() == "true"
+        and server not in _validated_servers
+    ):
+        validate_registered_definitions(api)
+        _validated_servers.add(server)
+    return api
+
+
+_validated_servers: set[str] = set()
+
+
+def validate_registered_definitions(api: GqlApi) -> None:
+    """Validates all reconcile.gql_definitions queries against the schema
+    of the server in one pass, failing early instead of on first use."""
+    start = time.perf_counter()
+    definitions = registered_definitions()
+    errors = api.validate_definitions(definitions)
+    logging.debug(
+        f"validated {len(definitions)} gql definitions "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    if errors:
+        raise GqlApiError(
+            "Invalid GraphQL definitions: "
+            + ", ".join(f"{name} ({error})" for name, error in errors.items())
+        )
 
 
 def _get_gql_server_and_token(
@@ -450,13 +882,16 @@ def get_api_for_server(
 
 @retry(exceptions=requests.exceptions.HTTPError, max_attempts=5)
 def get_diff(
-    old_sha: str, file_type: str | None = None, file_path: str | None = None
+    old_sha: str,
+    file_type: str | None = None,
+    file_path: str | None = None,
+    new_sha: str | None = None,
 ) -> dict[str, Any]:
     config = get_config()
 
     server_url = urlparse(config["graphql"]["server"])
     token = config["graphql"].get("token")
-    current_sha = get_sha(server_url, token)
+    current_sha = new_sha or get_sha(server_url, token)
     logging.debug(f"get bundle diffs between {old_sha} and {current_sha}...")
     if file_type and file_path:
         if not file_path.startswith("/"):
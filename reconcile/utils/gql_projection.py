@@ -0,0 +1,116 @@
+"""
+Projects broad GraphQL queries like queries.NAMESPACES_QUERY to the fields
+a caller actually uses.
+
+Fields are declared as dotted paths of response keys relative to the
+objects a top level field returns, e.g. "name" and "cluster.name" for
+namespaces. A declared path selects the whole subtree below it.
+"""
+
+import functools
+from collections.abc import Iterable
+from copy import copy
+
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    InlineFragmentNode,
+    OperationDefinitionNode,
+    SelectionNode,
+    SelectionSetNode,
+    print_ast,
+)
+
+from reconcile.utils.gql import parse_query
+
+Path = tuple[str, ...]
+
+
+class ProjectionError(Exception):
+    pass
+
+
+def _project_selection_set(
+    selection_set: SelectionSetNode,
+    prefix: Path,
+    declared: frozenset[Path],
+    prefixes: frozenset[Path],
+    matched: set[Path],
+) -> SelectionSetNode | None:
+    selections: list[SelectionNode] = []
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            path = (*prefix, (selection.alias or selection.name).value)
+            if path in declared:
+                matched.add(path)
+                selections.append(selection)
+            elif path in prefixes and selection.selection_set:
+                projected = _project_selection_set(
+                    selection.selection_set, path, declared, prefixes, matched
+                )
+                if projected:
+                    field = copy(selection)
+                    field.selection_set = projected
+                    selections.append(field)
+        elif isinstance(selection, InlineFragmentNode):
+            # fields of a union member have the path of the union field
+            projected = _project_selection_set(
+                selection.selection_set, prefix, declared, prefixes, matched
+            )
+            if projected:
+                fragment = copy(selection)
+                fragment.selection_set = projected
+                selections.append(fragment)
+        elif isinstance(selection, FragmentSpreadNode):
+            raise ProjectionError("named fragments can not be projected")
+    if not selections:
+        return None
+    projected_selection_set = copy(selection_set)
+    projected_selection_set.selections = tuple(selections)
+    return projected_selection_set
+
+
+@functools.lru_cache(maxsize=256)
+def _project_query(query: str, fields: frozenset[str]) -> str:
+    declared = frozenset(tuple(f.split(".")) for f in fields)
+    prefixes = frozenset(path[:i] for path in declared for i in range(1, len(path)))
+    matched: set[Path] = set()
+    document = copy(parse_query(query))
+    definitions = []
+    for definition in document.definitions:
+        if isinstance(definition, OperationDefinitionNode):
+            top_level = []
+            for field in definition.selection_set.selections:
+                if isinstance(field, FieldNode) and field.selection_set:
+                    projected = _project_selection_set(
+                        field.selection_set, (), declared, prefixes, matched
+                    )
+                    if projected is None:
+                        continue
+                    field = copy(field)
+                    field.selection_set = projected
+                top_level.append(field)
+            definition = copy(definition)
+            definition.selection_set = copy(definition.selection_set)
+            definition.selection_set.selections = tuple(top_level)
+        definitions.append(definition)
+    if unknown := declared - matched:
+        raise ProjectionError(
+            "fields not selected by the query: "
+            + ", ".join(sorted(".".join(path) for path in unknown))
+        )
+    document.definitions = tuple(definitions)
+    return print_ast(document)
+
+
+def project_query(query: str, fields: Iterable[str]) -> str:
+    """
+    Returns query with the selection sets of its top level fields reduced
+    to the declared fields. Projected queries are cached.
+
+    :raises ProjectionError: if a declared field is not selected by query
+    """
+    declared = frozenset(fields)
+    if not declared:
+        raise ProjectionError("no fields declared")
+    return _project_query(query, declared)
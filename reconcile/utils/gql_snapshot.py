@@ -0,0 +1,135 @@
+"""
+Snapshots of commonly used GraphQL datasets per bundle SHA.
+
+Dozens of integration pods query the same namespaces, clusters and saas
+files for the same bundle SHA. The gql-snapshot integration stores the
+responses to these queries as one compressed object in the app-interface
+state bucket. With GQL_SNAPSHOT_ENABLED set, integrations download that
+object once and serve these queries from it instead of the GraphQL server,
+see GqlResponseCache.
+"""
+
+import gzip
+import json
+import logging
+import os
+from typing import Any
+
+from reconcile.gql_definitions.common import (
+    app_interface_vault_settings,
+    clusters,
+    clusters_minimal,
+    namespaces,
+    saas_files,
+    saas_target_namespaces,
+    saasherder_settings,
+)
+from reconcile.utils import gql
+from reconcile.utils.gql import (
+    INTEGRATIONS_QUERY,
+    RESPONSE_CACHE,
+    GqlApi,
+    GqlResponseCache,
+)
+from reconcile.utils.state import (
+    State,
+    init_state,
+)
+
+QONTRACT_INTEGRATION = "gql-snapshot"
+# bump when the snapshot format changes
+SNAPSHOT_VERSION = 1
+
+# queries and variables exactly as the integrations send them, otherwise
+# the responses are not found in the snapshot
+SNAPSHOT_QUERIES: list[tuple[str, dict[str, Any] | None]] = [
+    (INTEGRATIONS_QUERY, None),
+    (app_interface_vault_settings.DEFINITION, None),
+    (namespaces.DEFINITION, None),
+    (clusters.DEFINITION, {}),
+    (clusters_minimal.DEFINITION, {}),
+    (saas_files.DEFINITION, None),
+    (saas_target_namespaces.DEFINITION, None),
+    (saasherder_settings.DEFINITION, None),
+]
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def snapshot_key(sha: str) -> str:
+    return f"{sha}/v{SNAPSHOT_VERSION}.json.gz"
+
+
+def build_snapshot(
+    gql_api: GqlApi,
+    queries: list[tuple[str, dict[str, Any] | None]] = SNAPSHOT_QUERIES,
+) -> bytes:
+    """Queries gql_api and returns the serialized snapshot of the responses."""
+    if not gql_api.sha:
+        raise SnapshotError("snapshots can only be built for a bundle SHA")
+    responses = {}
+    for query, variables in queries:
+        key = GqlResponseCache.key(gql_api.sha, query, variables)
+        if key is None:
+            raise SnapshotError(f"variables {variables} can not be serialized")
+        responses[key] = gql_api.query_response(query, variables)
+    snapshot = {"version": SNAPSHOT_VERSION, "sha": gql_api.sha, "responses": responses}
+    return gzip.compress(json.dumps(snapshot, separators=(",", ":")).encode())
+
+
+def parse_snapshot(data: bytes, sha: str) -> dict[str, dict[str, Any]]:
+    """Returns the responses of a serialized snapshot by response cache key."""
+    snapshot = json.loads(gzip.decompress(data))
+    if snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("sha") != sha:
+        raise SnapshotError(
+            f"expected a version {SNAPSHOT_VERSION} snapshot of {sha}, "
+            f"got version {snapshot.get('version')} of {snapshot.get('sha')}"
+        )
+    return snapshot["responses"]
+
+
+def store_snapshot(state: State, gql_api: GqlApi) -> bool:
+    """Stores the snapshot of the bundle gql_api queries if there is none yet.
+    Returns whether a snapshot was stored."""
+    if not gql_api.sha:
+        raise SnapshotError("snapshots can only be built for a bundle SHA")
+    key = snapshot_key(gql_api.sha)
+    if state.exists(key):
+        return False
+    state.set_bytes(key, build_snapshot(gql_api))
+    return True
+
+
+def load_snapshot(state: State, sha: str) -> dict[str, dict[str, Any]] | None:
+    try:
+        return parse_snapshot(state.get_bytes(snapshot_key(sha)), sha)
+    except KeyError:
+        return None
+
+
+def init_snapshot() -> None:
+    """
+    Serves the snapshotted queries of the bundle the gql connection points
+    to from the snapshot, if GQL_SNAPSHOT_ENABLED is set and a snapshot of
+    the bundle exists. Needs an initialized gql connection to find the state
+    settings.
+    """
+    if os.environ.get("GQL_SNAPSHOT_ENABLED", "false").lower() != "true":
+        return
+    sha = gql.get_api().sha
+    if not sha:
+        return
+    if any(key.startswith(f"{sha}/") for key in RESPONSE_CACHE.snapshot):
+        return
+    try:
+        with init_state(integration=QONTRACT_INTEGRATION) as state:
+            responses = load_snapshot(state, sha)
+    except Exception as e:
+        logging.warning(f"unable to load the gql snapshot of {sha}: {e}")
+        return
+    if responses is None:
+        logging.debug(f"no gql snapshot of {sha}")
+        return
+    RESPONSE_CACHE.snapshot = responses
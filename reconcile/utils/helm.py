@@ -1,7 +1,13 @@
+import hashlib
 import json
 import os
+import shutil
 import tempfile
+import time
 from collections.abc import Iterable, Mapping
+from contextlib import suppress
+from functools import cache
+from pathlib import Path
 from subprocess import (
     CalledProcessError,
     run,
@@ -11,7 +17,12 @@ from typing import Any
 import yaml
 
 from reconcile.utils import git
+from reconcile.utils.disk_cache import cache_dir
 from reconcile.utils.runtime.sharding import ShardSpec
+from reconcile.utils.single_flight import SingleFlight
+
+# checkouts used this recently are never evicted, they may be rendering
+CHECKOUT_EVICTION_GRACE = 600
 
 
 class HelmTemplateError(Exception):
@@ -25,10 +36,69 @@ class JSONEncoder(json.JSONEncoder):
         return super().default(o)
 
 
+def _error(e: CalledProcessError) -> HelmTemplateError:
+    msg = f'Error running helm template [{" ".join(e.cmd)}]'
+    if e.stdout:
+        msg += f" {e.stdout.decode()}"
+    if e.stderr:
+        msg += f" {e.stderr.decode()}"
+    return HelmTemplateError(msg)
+
+
+def _build_dependencies(
+    path: str, repository_config: str, repository_cache: str
+) -> None:
+    with open(os.path.join(path, "Chart.yaml"), encoding="locale") as chart_file:
+        chart = yaml.safe_load(chart_file)
+    dependencies = chart.get("dependencies")
+    if not dependencies:
+        return
+    for dep in dependencies:
+        if repo := dep.get("repository"):
+            cmd = [
+                "helm",
+                "repo",
+                "add",
+                dep["name"],
+                repo,
+                "--repository-config",
+                repository_config,
+                "--repository-cache",
+                repository_cache,
+            ]
+            run(cmd, capture_output=True, check=True)
+    cmd = [
+        "helm",
+        "dependency",
+        "build",
+        path,
+        "--repository-config",
+        repository_config,
+        "--repository-cache",
+        repository_cache,
+    ]
+    run(cmd, capture_output=True, check=True)
+
+
+def dependency_build(path: str) -> None:
+    """Downloads the dependencies of the chart at path into its charts directory."""
+    try:
+        with (
+            tempfile.NamedTemporaryFile(
+                mode="w+", encoding="locale"
+            ) as repository_config_file,
+            tempfile.TemporaryDirectory() as repository_cache_dir,
+        ):
+            _build_dependencies(path, repository_config_file.name, repository_cache_dir)
+    except CalledProcessError as e:
+        raise _error(e) from None
+
+
 def do_template(
     values: Mapping[str, Any],
     path: str,
     name: str,
+    build_dependencies: bool = True,
 ) -> str:
     try:
         with (
@@ -37,36 +107,10 @@ def do_template(
             ) as repository_config_file,
             tempfile.TemporaryDirectory() as repository_cache_dir,
         ):
-            with open(
-                os.path.join(path, "Chart.yaml"), encoding="locale"
-            ) as chart_file:
-                chart = yaml.safe_load(chart_file)
-                if dependencies := chart.get("dependencies"):
-                    for dep in dependencies:
-                        if repo := dep.get("repository"):
-                            cmd = [
-                                "helm",
-                                "repo",
-                                "add",
-                                dep["name"],
-                                repo,
-                                "--repository-config",
-                                repository_config_file.name,
-                                "--repository-cache",
-                                repository_cache_dir,
-                            ]
-                            run(cmd, capture_output=True, check=True)
-                    cmd = [
-                        "helm",
-                        "dependency",
-                        "build",
-                        path,
-                        "--repository-config",
-                        repository_config_file.name,
-                        "--repository-cache",
-                        repository_cache_dir,
-                    ]
-                    run(cmd, capture_output=True, check=True)
+            if build_dependencies:
+                _build_dependencies(
+                    path, repository_config_file.name, repository_cache_dir
+                )
             with tempfile.NamedTemporaryFile(
                 mode="w+", encoding="locale"
             ) as values_file:
@@ -87,12 +131,7 @@ def do_template(
                 ]
                 result = run(cmd, capture_output=True, check=True)
     except CalledProcessError as e:
-        msg = f'Error running helm template [{" ".join(cmd)}]'
-        if e.stdout:
-            msg += f" {e.stdout.decode()}"
-        if e.stderr:
-            msg += f" {e.stderr.decode()}"
-        raise HelmTemplateError(msg) from None
+        raise _error(e) from None
 
     return result.stdout.decode()
 
@@ -117,3 +156,139 @@ def template_all(
         return yaml.safe_load_all(
             do_template(values=values, path=f"{wd}{path}", name=name)
         )
+
+
+class ChartPool:
+    """
+    Keeps charts checked out on local disk by (url, path, commit sha), with
+    their dependencies built, so rendering a chart again, e.g. with the
+    values of another target, needs neither git nor the chart repositories.
+
+    Checkouts are shared between the threads and processes of a host.
+    Threads asking for a chart that is being checked out wait for that
+    checkout. Least recently used checkouts are removed beyond
+    max_checkouts.
+    """
+
+    def __init__(self, directory: str, max_checkouts: int):
+        self.directory = Path(directory)
+        self.max_checkouts = max_checkouts
+        self._pending: SingleFlight[Path, Path] = SingleFlight(memoize=lambda _: False)
+
+    def _path(self, url: str, path: str, commit_sha: str) -> Path:
+        location = f"{url.rstrip('/')}\0{path.strip('/')}"
+        digest = hashlib.sha256(location.encode()).hexdigest()
+        return self.directory / digest / commit_sha
+
+    def checkout(
+        self, url: str, path: str, commit_sha: str, ssl_verify: bool = True
+    ) -> str:
+        """Returns the local directory of the chart at path of url at commit_sha."""
+        wd = self._path(url, path, commit_sha)
+
+        def checkout() -> Path:
+            if wd.is_dir():
+                # the mtime is the LRU timestamp
+                os.utime(wd)
+            else:
+                self._checkout(url, path, commit_sha, wd, ssl_verify)
+                self.evict()
+            return wd
+
+        return str(self._pending.get(wd, checkout) / path.strip("/"))
+
+    @staticmethod
+    def _checkout(
+        url: str, path: str, commit_sha: str, wd: Path, ssl_verify: bool
+    ) -> None:
+        wd.parent.mkdir(parents=True, exist_ok=True)
+        # check out next to wd and rename, partial checkouts are never used
+        tmp = Path(tempfile.mkdtemp(dir=wd.parent, prefix="."))
+        try:
+            try:
+                git.fetch_commit(url, commit_sha, tmp, verify=ssl_verify)
+            except git.GitError:
+                # not every server serves single commits, clone everything
+                shutil.rmtree(tmp)
+                tmp.mkdir()
+                git.clone(url, tmp, verify=ssl_verify)
+                git.checkout(commit_sha, tmp)
+            dependency_build(str(tmp / path.strip("/")))
+            try:
+                tmp.rename(wd)
+            except OSError:
+                # another process checked it out first
+                if not wd.is_dir():
+                    raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def evict(self) -> None:
+        """Removes least recently used checkouts beyond max_checkouts."""
+        checkouts = []
+        for wd in self.directory.glob("*/*"):
+            if wd.name.startswith("."):
+                continue
+            with suppress(OSError):
+                checkouts.append((wd.stat().st_mtime, wd))
+        checkouts.sort()
+        in_use = time.time() - CHECKOUT_EVICTION_GRACE
+        for mtime, wd in checkouts[: max(len(checkouts) - self.max_checkouts, 0)]:
+            if mtime < in_use:
+                shutil.rmtree(wd, ignore_errors=True)
+
+
+CHART_POOL = ChartPool(
+    cache_dir("helm-charts"),
+    max_checkouts=int(os.environ.get("HELM_CHART_POOL_MAX_CHECKOUTS", 100)),
+)
+
+
+# renderings hold the values of their targets, secret parameters included,
+# so they are only ever kept in process memory
+RENDERINGS: SingleFlight[tuple[str, str, str, str], str] = SingleFlight(
+    max_size=int(os.environ.get("HELM_RENDERINGS_MAX_ENTRIES", 256)),
+)
+
+
+@cache
+def helm_version() -> str:
+    result = run(["helm", "version", "--short"], capture_output=True, check=True)
+    return result.stdout.decode().strip()
+
+
+def values_digest(name: str, values: Mapping[str, Any]) -> str:
+    """
+    Digest of everything besides the chart a rendering depends on: the
+    release name, the values in canonical form and the helm version.
+    """
+    canonical = json.dumps(
+        {"helm": helm_version(), "name": name, "values": values},
+        cls=JSONEncoder,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def render(
+    url: str,
+    path: str,
+    commit_sha: str,
+    name: str,
+    values: Mapping[str, Any],
+    ssl_verify: bool = True,
+) -> str:
+    """
+    Renders the chart at path of url at commit_sha, reusing the checkout of
+    the chart from CHART_POOL. Renderings are memoized in RENDERINGS.
+    """
+
+    def template() -> str:
+        chart = CHART_POOL.checkout(url, path, commit_sha, ssl_verify=ssl_verify)
+        return do_template(
+            values=values, path=chart, name=name, build_dependencies=False
+        )
+
+    key = (url, path, commit_sha, values_digest(name, values))
+    return RENDERINGS.get(key, template)
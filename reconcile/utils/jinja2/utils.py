@@ -1,5 +1,8 @@
+import copy
 import datetime
-from functools import cache
+import threading
+from collections.abc import Callable
+from functools import cache, wraps
 from typing import Any, Self
 
 import jinja2
@@ -35,6 +38,37 @@ class Jinja2TemplateError(Exception):
         super().__init__("error processing jinja2 template: " + str(msg))
 
 
+class _ImpureCalls(threading.local):
+    """
+    Thread-local count of calls to template functions reading data which is
+    not part of the template inputs (vault, github, query, s3, ...).
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.count = 0
+
+
+_IMPURE_CALLS = _ImpureCalls()
+
+
+def impure_calls() -> int:
+    """
+    Number of impure template function calls made by the current thread so
+    far. A rendering is pure if the number did not change while rendering.
+    """
+    return _IMPURE_CALLS.count
+
+
+def _impure(func: Callable[..., Any]) -> Callable[..., Any]:
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        _IMPURE_CALLS.count += 1
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
 class TemplateRenderOptions(BaseModel):
     trim_blocks: bool
     lstrip_blocks: bool
@@ -120,12 +154,29 @@ def lookup_github_file_content(
     return c.decode("utf-8")
 
 
-def lookup_graphql_query_results(query: str, **kwargs: dict[str, Any]) -> list[Any]:
+@cache
+def compile_query_template(body: str) -> jinja2.Template:
+    return jinja2.Template(body)
+
+
+def lookup_graphql_query_results(query: str, **kwargs: Any) -> list[Any]:
+    """
+    Runs the query stored in the resource file at path `query`, rendered with
+    kwargs. Templates often call this in loops, so the query resource and the
+    results of each rendered query are fetched once per GqlApi, i.e. per
+    bundle, and shared between threads. Every call gets its own copy of the
+    results, templates may modify them.
+    """
     gqlapi = gql.get_api()
-    resource = gqlapi.get_resource(query)["content"]
-    rendered_resource = jinja2.Template(resource).render(**kwargs)
-    results = next(iter(gqlapi.query(rendered_resource).values()))
-    return results
+    resource = gqlapi.lookups.get(
+        ("resource", query), lambda: gqlapi.get_resource(query)["content"]
+    )
+    rendered_resource = compile_query_template(resource).render(**kwargs)
+    results = gqlapi.lookups.get(
+        ("results", query, rendered_resource),
+        lambda: next(iter(gqlapi.query(rendered_resource).values())),
+    )
+    return copy.deepcopy(results)
 
 
 def lookup_s3_object(
@@ -213,33 +264,39 @@ def process_jinja2_template(
     if vars is None:
         vars = {}
     vars.update({
-        "vault": lambda p, k, v=None, allow_not_found=False: lookup_secret(
-            path=p,
-            key=k,
-            version=v,
-            tvars=vars,
-            allow_not_found=allow_not_found,
-            settings=settings,
-            secret_reader=secret_reader,
+        "vault": _impure(
+            lambda p, k, v=None, allow_not_found=False: lookup_secret(
+                path=p,
+                key=k,
+                version=v,
+                tvars=vars,
+                allow_not_found=allow_not_found,
+                settings=settings,
+                secret_reader=secret_reader,
+            )
         ),
-        "github": lambda u, p, r, v=None: lookup_github_file_content(
-            repo=u,
-            path=p,
-            ref=r,
-            tvars=vars,
-            settings=settings,
-            secret_reader=secret_reader,
+        "github": _impure(
+            lambda u, p, r, v=None: lookup_github_file_content(
+                repo=u,
+                path=p,
+                ref=r,
+                tvars=vars,
+                settings=settings,
+                secret_reader=secret_reader,
+            )
         ),
         "urlescape": lambda u, s="/", e=None: urlescape(string=u, safe=s, encoding=e),
         "urlunescape": lambda u, e=None: urlunescape(string=u, encoding=e),
         "hash_list": hash_list,
-        "query": lookup_graphql_query_results,
-        "url": url_makes_sense,
-        "s3": lookup_s3_object,
-        "s3_ls": list_s3_objects,
+        "query": _impure(lookup_graphql_query_results),
+        "url": _impure(url_makes_sense),
+        "s3": _impure(lookup_s3_object),
+        "s3_ls": _impure(list_s3_objects),
         "flatten_dict": flatten,
-        "yesterday": lambda: (datetime.datetime.now() - datetime.timedelta(1)).strftime(
-            "%Y-%m-%d"
+        "yesterday": _impure(
+            lambda: (datetime.datetime.now() - datetime.timedelta(1)).strftime(
+                "%Y-%m-%d"
+            )
         ),
     })
     if "_template_mocks" in vars:
@@ -0,0 +1,126 @@
+import codecs
+import json
+import re
+from collections.abc import (
+    Iterable,
+    Iterator,
+)
+from typing import Any
+
+WHITESPACE = re.compile(r"\s*")
+NUMBER_CHARS = frozenset("0123456789.eE+-")
+# compact the buffer once this many characters have been consumed
+COMPACT_THRESHOLD = 1024 * 1024
+
+
+class JSONStream:
+    """
+    Reads a JSON document from an iterable of byte chunks, keeping only the
+    value being decoded and the unread rest of the current chunk in memory.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Reads the next chunk, returns False at the end of the input."""
+        if self._eof:
+            return False
+        if self._pos > COMPACT_THRESHOLD or self._pos > len(self._buffer) // 2:
+            self._buffer = self._buffer[self._pos :]
+            self._pos = 0
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._eof = True
+            self._buffer += self._decoder.decode(b"", final=True)
+            return False
+        self._buffer += self._decoder.decode(chunk)
+        return True
+
+    def peek(self) -> str:
+        """Skips whitespace and returns the next character, "" at the end."""
+        while True:
+            self._pos = WHITESPACE.match(self._buffer, self._pos).end()  # type: ignore[union-attr]
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        """Consumes the next character, which must be one of chars."""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(
+                f"Expecting one of {chars!r} at {self._pos}, got {char or 'EOF'!r}"
+            )
+        self._pos += 1
+        return char
+
+    def decode(self) -> Any:
+        """Decodes the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._read_more():
+                    raise
+                continue
+            # a number at the end of the buffer may continue in the next chunk
+            if (
+                end < len(self._buffer) and self._buffer[end] not in NUMBER_CHARS
+            ) or not self._read_more():
+                self._pos = end
+                return value
+
+    def _read_more(self) -> bool:
+        """Reads until the unread part of the buffer doubled, so a value
+        spanning many chunks isn't decoded over and over again."""
+        target = 2 * (len(self._buffer) - self._pos)
+        read = False
+        while self._fill():
+            read = True
+            if len(self._buffer) - self._pos >= target:
+                break
+        return read
+
+
+def iter_list_items(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """
+    Incrementally parses a JSON object with an "items" array, e.g. the
+    output of `oc get -o json`, and yields each item as soon as it has been
+    read. All other keys are skipped. Raises ValueError if the input is not
+    such an object.
+    """
+    stream = JSONStream(chunks)
+    stream.expect("{")
+    found_items = False
+    if stream.peek() == "}":
+        stream.expect("}")
+    else:
+        while True:
+            key = stream.decode()
+            stream.expect(":")
+            if key == "items":
+                found_items = True
+                stream.expect("[")
+                if stream.peek() == "]":
+                    stream.expect("]")
+                else:
+                    while True:
+                        yield stream.decode()
+                        if stream.expect(",]") == "]":
+                            break
+            else:
+                stream.decode()
+            if stream.expect(",}") == "}":
+                break
+    if stream.peek():
+        raise ValueError("Extra data after the JSON object")
+    if not found_items:
+        raise ValueError("Expecting items")
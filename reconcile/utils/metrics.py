@@ -119,6 +119,50 @@ slack_request = Counter(
     labelnames=["resource", "verb"],
 )
 
+gql_request_time = Histogram(
+    name="qontract_reconcile_gql_request_seconds",
+    documentation="Latency of GraphQL requests, including decoding the response",
+    labelnames=["query"],
+)
+
+gql_response_bytes = Counter(
+    name="qontract_reconcile_gql_response_bytes",
+    documentation="Bytes of GraphQL responses received",
+    labelnames=["query"],
+)
+
+gql_response_parse_time = Histogram(
+    name="qontract_reconcile_gql_response_parse_seconds",
+    documentation="Time spent decoding GraphQL responses",
+    labelnames=["query"],
+)
+
+gql_query_parse_time = Histogram(
+    name="qontract_reconcile_gql_query_parse_seconds",
+    documentation="Time spent parsing GraphQL queries, each query is parsed once",
+    labelnames=["operation"],
+)
+
+gql_memo_lookups = Counter(
+    name="qontract_reconcile_gql_memo_lookups_total",
+    documentation="Lookups of memoized GraphQL results by result (hit, shared, miss)",
+    labelnames=["memo", "result"],
+)
+
+saas_source_cache_lookups = Counter(
+    name="qontract_reconcile_saas_source_cache_lookups_total",
+    documentation="Lookups of saas template sources by where they were found "
+    "(memory, disk, shared or miss)",
+    labelnames=["source"],
+)
+
+saas_image_cache_lookups = Counter(
+    name="qontract_reconcile_saas_image_cache_lookups_total",
+    documentation="Lookups of saas image digests by where they were found "
+    "(memory, disk, shared or miss)",
+    labelnames=["source"],
+)
+
 
 #
 # Class based metrics
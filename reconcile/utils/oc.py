@@ -1,20 +1,31 @@
 import copy
+import hashlib
+import itertools
 import json
 import logging
 import os
 import pathlib
 import re
 import subprocess
+import tempfile
 import threading
 import time
 from collections.abc import (
+    Callable,
     Iterable,
+    Iterator,
     Mapping,
 )
 from contextlib import suppress
-from dataclasses import dataclass
+from dataclasses import (
+    asdict,
+    dataclass,
+)
 from datetime import datetime
-from functools import wraps
+from functools import (
+    partial,
+    wraps,
+)
 from subprocess import Popen
 from threading import Lock
 from typing import Any
@@ -24,12 +35,14 @@ from kubernetes.client import (  # type: ignore[attr-defined]
     ApiClient,
     Configuration,
 )
+from kubernetes.client.exceptions import ApiException
 from kubernetes.dynamic.client import DynamicClient
 from kubernetes.dynamic.discovery import (
     LazyDiscoverer,
     ResourceGroup,
 )
 from kubernetes.dynamic.exceptions import (
+    DynamicApiError,
     ForbiddenError,
     InternalServerError,
     NotFoundError,
@@ -38,13 +51,21 @@ from kubernetes.dynamic.exceptions import (
     ServerTimeoutError,
 )
 from kubernetes.dynamic.resource import ResourceList
-from prometheus_client import Counter
+from prometheus_client import (
+    Counter,
+    Histogram,
+)
 from sretoolbox.utils import (
     retry,
     threaded,
 )
 
 from reconcile.status import RunningState
+from reconcile.utils.disk_cache import (
+    DiskCache,
+    cache_dir,
+)
+from reconcile.utils.json_stream import iter_list_items
 from reconcile.utils.jump_host import (
     JumphostParameters,
     JumpHostSSH,
@@ -52,6 +73,7 @@ from reconcile.utils.jump_host import (
 from reconcile.utils.metrics import reconcile_time
 from reconcile.utils.oc_connection_parameters import OCConnectionParameters
 from reconcile.utils.openshift_resource import OpenshiftResource as OR
+from reconcile.utils.openshift_template import process_template
 from reconcile.utils.secret_reader import (
     SecretNotFound,
     SecretReader,
@@ -61,6 +83,16 @@ from reconcile.utils.unleash import get_feature_toggle_state
 urllib3.disable_warnings()
 
 GET_REPLICASET_MAX_ATTEMPTS = 20
+FIELD_MANAGER = "qontract-reconcile"
+
+# api resources per cluster server and version, see OCCli.get_api_resources
+API_RESOURCES_CACHE = DiskCache(
+    cache_dir("api-resources"),
+    ttl=float(os.environ.get("OC_API_RESOURCES_CACHE_TTL", 3600)),
+)
+LIST_CHUNK_SIZE = 500
+JSON_STREAM_READ_SIZE = 64 * 1024
+RUN_MAX_ATTEMPTS = 10
 
 
 oc_run_execution_counter = Counter(
@@ -69,6 +101,18 @@ oc_run_execution_counter = Counter(
     labelnames=["integration"],
 )
 
+server_side_apply_time = Histogram(
+    name="qontract_reconcile_oc_server_side_apply_seconds",
+    documentation="Duration of server-side apply requests per resource",
+    labelnames=["cluster", "kind", "dry_run"],
+)
+
+oc_watch_cache_counter = Counter(
+    name="qontract_reconcile_oc_watch_cache_total",
+    documentation="Counts watch cache hits, misses and relists per cluster and kind",
+    labelnames=["cluster", "kind", "event"],
+)
+
 
 class StatusCodeError(Exception):
     pass
@@ -230,8 +274,12 @@ class OCProcessReconcileTimeDecoratorMsg:
 
 
 def oc_process(template, parameters=None):
-    oc = OCLocal(cluster_name="cluster", server=None, token=None, local=True)
-    return oc.process(template, parameters)
+    """Processes an OpenShift Template with `oc process --local`. Set
+    OC_PROCESS_USE_BINARY to false to process it in process instead."""
+    if os.environ.get("OC_PROCESS_USE_BINARY", "true").lower() == "true":
+        oc = OCLocal(cluster_name="cluster", server=None, token=None, local=True)
+        return oc.process(template, parameters)
+    return process_template(template, parameters)
 
 
 def equal_spec_template(t1: dict, t2: dict) -> bool:
@@ -364,12 +412,16 @@ class OCCli:  # pylint: disable=too-many-public-methods
         self.oc_base_cmd = oc_base_cmd
 
         # calling get_version to check if cluster is reachable
+        self.server_version = None
         if not local:
-            self.get_version()
+            self.server_version = self.get_version()
 
         self.api_resources_lock = threading.RLock()
         self.init_api_resources = init_api_resources
         self.api_resources = {}
+        self.api_resources_from_cache = False
+        # kinds known not to exist on the cluster
+        self.api_resources_missing: frozenset[str] = frozenset()
         if self.init_api_resources:
             self.api_resources = self.get_api_resources()
 
@@ -436,12 +488,16 @@ class OCCli:  # pylint: disable=too-many-public-methods
         self.oc_base_cmd = oc_base_cmd
 
         # calling get_version to check if cluster is reachable
+        self.server_version = None
         if not local:
-            self.get_version()
+            self.server_version = self.get_version()
 
         self.api_resources_lock = threading.RLock()
         self.init_api_resources = init_api_resources
         self.api_resources = {}
+        self.api_resources_from_cache = False
+        # kinds known not to exist on the cluster
+        self.api_resources_missing = frozenset()
         if self.init_api_resources:
             self.api_resources = self.get_api_resources()
 
@@ -469,6 +525,11 @@ class OCCli:  # pylint: disable=too-many-public-methods
             self.jump_host.cleanup()
 
     def get_items(self, kind, **kwargs):
+        return list(self.iter_items(kind, **kwargs))
+
+    def iter_items(self, kind, **kwargs) -> Iterator[dict[str, Any]]:
+        """Like get_items, but yields the items while they are being read
+        instead of holding the whole list in memory."""
         cmd = ["get", kind, "-o", "json"]
 
         if "namespace" in kwargs:
@@ -477,32 +538,42 @@ class OCCli:  # pylint: disable=too-many-public-methods
             # currently only openshift-clusterrolebindings
             if namespace != "cluster":
                 if not self.project_exists(namespace):
-                    return []
+                    return
                 cmd.extend(["-n", namespace])
 
         if "labels" in kwargs:
-            labels_list = [f"{k}={v}" for k, v in kwargs.get("labels").items()]
+            labels_list = [f"{k}={v}" for k, v in kwargs["labels"].items()]
 
             cmd.append("-l")
             cmd.append(",".join(labels_list))
 
         resource_names = kwargs.get("resource_names")
         if resource_names:
-            items = []
             for resource_name in resource_names:
                 resource_cmd = cmd + [resource_name]
                 item = self._run_json(resource_cmd, allow_not_found=True)
                 if item:
-                    items.append(item)
-            items_list = {"items": items}
-        else:
-            items_list = self._run_json(cmd)
-
-        items = items_list.get("items")
-        if items is None:
-            raise Exception("Expecting items")
+                    yield item
+            return
 
-        return items
+        cmd.append(f"--chunk-size={LIST_CHUNK_SIZE}")
+        yield from self._run_json_items(cmd)
+
+    def get_cluster_items(self, kind, labels=None, chunk_size=LIST_CHUNK_SIZE):
+        """Lists all objects of a kind across all namespaces, in pages of
+        chunk_size objects."""
+        return list(self.iter_cluster_items(kind, labels, chunk_size))
+
+    def iter_cluster_items(
+        self, kind, labels=None, chunk_size=LIST_CHUNK_SIZE
+    ) -> Iterator[dict[str, Any]]:
+        """Like get_cluster_items, but yields the items while they are being
+        read instead of holding the whole list in memory."""
+        cmd = ["get", kind, "-o", "json", "--all-namespaces"]
+        cmd.append(f"--chunk-size={chunk_size}")
+        if labels:
+            cmd.extend(["-l", ",".join(f"{k}={v}" for k, v in labels.items())])
+        yield from self._run_json_items(cmd)
 
     def get(self, namespace, kind, name=None, allow_not_found=False):
         cmd = ["get", "-o", "json", kind]
@@ -558,6 +629,31 @@ class OCCli:  # pylint: disable=too-many-public-methods
         self._run(cmd, stdin=resource.toJSON(), apply=True)
         return self._msg_to_process_reconcile_time(namespace, resource)
 
+    @OCDecorators.process_reconcile_time
+    def server_side_apply(self, namespace, resource, dry_run=False):
+        """Applies the resource server-side, owned by the qontract-reconcile
+        field manager. With dry_run the request is validated and admitted by
+        the API server but not persisted."""
+        cmd = [
+            "apply",
+            "--server-side",
+            f"--field-manager={FIELD_MANAGER}",
+            "--force-conflicts",
+            "-n",
+            namespace,
+            "-f",
+            "-",
+        ]
+        if dry_run:
+            cmd.append("--dry-run=server")
+        with server_side_apply_time.labels(
+            cluster=self.cluster_name, kind=resource.kind, dry_run=dry_run
+        ).time():
+            self._run(cmd, stdin=resource.toJSON(), apply=True)
+        if dry_run:
+            return None
+        return self._msg_to_process_reconcile_time(namespace, resource)
+
     @OCDecorators.process_reconcile_time
     def create(self, namespace, resource):
         cmd = ["create", "-n", namespace, "-f", "-"]
@@ -688,9 +784,58 @@ class OCCli:  # pylint: disable=too-many-public-methods
         cmd = ["sa", "-n", namespace, "get-token", name]
         return self._run(cmd)
 
-    def get_api_resources(self):
+    def _api_resources_cache_key(self) -> str | None:
+        if not self.server or not self.server_version:
+            return None
+        return f"{self.server}:{self.server_version.decode('utf-8')}"
+
+    def _read_api_resources_cache(self) -> bool:
+        key = self._api_resources_cache_key()
+        cached = API_RESOURCES_CACHE.get(key) if key else None
+        if not cached:
+            return False
+        self.api_resources = {
+            kind: [OCCliApiResource(**r) for r in resources]
+            for kind, resources in cached["resources"].items()
+        }
+        self.api_resources_from_cache = True
+        return True
+
+    def _write_api_resources_cache(self) -> None:
+        key = self._api_resources_cache_key()
+        if key:
+            API_RESOURCES_CACHE.set(
+                key,
+                {
+                    "resources": {
+                        kind: [asdict(r) for r in resources]
+                        for kind, resources in self.api_resources.items()
+                    },
+                },
+            )
+
+    def _rediscover_api_resources(self, kind: str) -> None:
+        """Refreshes cached api resources that don't know about kind yet, e.g.
+        because the CRD was installed after the cache entry was written. Kinds
+        still missing afterwards are remembered by this client only, other
+        clients refresh again as the CRD may have been installed meanwhile."""
+        if kind in self.api_resources or kind in self.api_resources_missing:
+            return
+        with self.api_resources_lock:
+            if kind in self.api_resources or kind in self.api_resources_missing:
+                return
+            if self.api_resources_from_cache:
+                self.get_api_resources(use_cache=False)
+            if kind not in self.api_resources:
+                self.api_resources_missing |= {kind}
+
+    def get_api_resources(self, use_cache=True):
         with self.api_resources_lock:
-            if not self.api_resources:
+            if not self.api_resources and use_cache:
+                self._read_api_resources_cache()
+            if not self.api_resources or not use_cache:
+                # readers don't take the lock, they must never see a partial dict
+                api_resources = {}
                 cmd = ["api-resources", "--no-headers"]
                 results = self._run(cmd).decode("utf-8").split("\n")
                 for line in results:
@@ -704,8 +849,12 @@ class OCCli:  # pylint: disable=too-many-public-methods
                     group = "" if len(group_version) == 1 else group_version[0]
                     api_version = group_version[-1]
                     obj = OCCliApiResource(kind, group, api_version, namespaced)
-                    d = self.api_resources.setdefault(kind, [])
+                    d = api_resources.setdefault(kind, [])
                     d.append(obj)
+                self.api_resources = api_resources
+                self.api_resources_missing = frozenset()
+                self.api_resources_from_cache = False
+                self._write_api_resources_cache()
 
         return self.api_resources
 
@@ -1085,7 +1234,7 @@ class OCCli:  # pylint: disable=too-many-public-methods
 
         return resources
 
-    @retry(exceptions=(StatusCodeError, NoOutputError), max_attempts=10)
+    @retry(exceptions=(StatusCodeError, NoOutputError), max_attempts=RUN_MAX_ATTEMPTS)
     def _run(self, cmd, **kwargs) -> bytes:
         oc_run_execution_counter.labels(integration=RunningState().integration).inc()
         stdin = kwargs.get("stdin")
@@ -1099,34 +1248,7 @@ class OCCli:  # pylint: disable=too-many-public-methods
             if "Unable to connect to the server" in err:
                 raise StatusCodeError(f"[{self.server}]: {err}")
             if kwargs.get("apply"):
-                if "Invalid value: 0x0" in err:
-                    raise InvalidValueApplyError(f"[{self.server}]: {err}")
-                if "Invalid value: " in err:
-                    if ": field is immutable" in err:
-                        if "The Deployment" in err:
-                            raise DeploymentFieldIsImmutableError(
-                                f"[{self.server}]: {err}"
-                            )
-                        raise FieldIsImmutableError(f"[{self.server}]: {err}")
-                    if ": may not change once set" in err:
-                        raise MayNotChangeOnceSetError(f"[{self.server}]: {err}")
-                    if ": primary clusterIP can not be unset" in err:
-                        raise PrimaryClusterIPCanNotBeUnsetError(
-                            f"[{self.server}]: {err}"
-                        )
-                    raise StatusCodeError(f"[{self.server}]: {err}")
-                if "metadata.annotations: Too long" in err:
-                    raise MetaDataAnnotationsTooLongApplyError(
-                        f"[{self.server}]: {err}"
-                    )
-                if "UnsupportedMediaType" in err:
-                    raise UnsupportedMediaTypeError(f"[{self.server}]: {err}")
-                if "updates to statefulset spec for fields other than" in err:
-                    raise StatefulSetUpdateForbidden(f"[{self.server}]: {err}")
-                if "the object has been modified" in err:
-                    raise ObjectHasBeenModifiedError(f"[{self.server}]: {err}")
-                if "Request entity too large" in err:
-                    raise RequestEntityTooLargeError(f"[{self.server}]: {err}")
+                self._raise_for_apply_error(err)
             if not (allow_not_found and "NotFound" in err):
                 raise StatusCodeError(f"[{self.server}]: {err}")
 
@@ -1137,6 +1259,32 @@ class OCCli:  # pylint: disable=too-many-public-methods
 
         return result.stdout.strip()
 
+    def _raise_for_apply_error(self, err: str) -> None:
+        """Raises a specific exception for known apply errors, so callers
+        can recover from them."""
+        if "Invalid value: 0x0" in err:
+            raise InvalidValueApplyError(f"[{self.server}]: {err}")
+        if "Invalid value: " in err:
+            if ": field is immutable" in err:
+                if "The Deployment" in err:
+                    raise DeploymentFieldIsImmutableError(f"[{self.server}]: {err}")
+                raise FieldIsImmutableError(f"[{self.server}]: {err}")
+            if ": may not change once set" in err:
+                raise MayNotChangeOnceSetError(f"[{self.server}]: {err}")
+            if ": primary clusterIP can not be unset" in err:
+                raise PrimaryClusterIPCanNotBeUnsetError(f"[{self.server}]: {err}")
+            raise StatusCodeError(f"[{self.server}]: {err}")
+        if "metadata.annotations: Too long" in err:
+            raise MetaDataAnnotationsTooLongApplyError(f"[{self.server}]: {err}")
+        if "UnsupportedMediaType" in err:
+            raise UnsupportedMediaTypeError(f"[{self.server}]: {err}")
+        if "updates to statefulset spec for fields other than" in err:
+            raise StatefulSetUpdateForbidden(f"[{self.server}]: {err}")
+        if "the object has been modified" in err:
+            raise ObjectHasBeenModifiedError(f"[{self.server}]: {err}")
+        if "Request entity too large" in err:
+            raise RequestEntityTooLargeError(f"[{self.server}]: {err}")
+
     def _run_json(self, cmd, allow_not_found=False):
         out = self._run(cmd, allow_not_found=allow_not_found)
 
@@ -1147,6 +1295,53 @@ class OCCli:  # pylint: disable=too-many-public-methods
 
         return out_json
 
+    def _run_json_items(self, cmd: list[str]) -> Iterator[dict[str, Any]]:
+        """
+        Runs an oc command listing objects as JSON and yields the objects
+        while stdout is still being read. Only the object being parsed is
+        kept in memory, so memory doesn't grow with the number of objects.
+        Like _run, errors are retried, as long as no object was yielded yet.
+        """
+        for attempt in itertools.count(1):
+            started = False
+            try:
+                for item in self._stream_json_items(cmd):
+                    started = True
+                    yield item
+                return
+            except (StatusCodeError, NoOutputError):
+                if started or attempt >= RUN_MAX_ATTEMPTS:
+                    raise
+                time.sleep(attempt)
+
+    def _stream_json_items(self, cmd: list[str]) -> Iterator[dict[str, Any]]:
+        oc_run_execution_counter.labels(integration=RunningState().integration).inc()
+        parsing_error = None
+        # stderr goes to a file, a full stderr pipe would block oc
+        with (
+            tempfile.TemporaryFile() as stderr,
+            Popen(
+                self.oc_base_cmd + cmd, stdout=subprocess.PIPE, stderr=stderr
+            ) as process,
+        ):
+            assert process.stdout is not None
+            read = partial(process.stdout.read, JSON_STREAM_READ_SIZE)
+            first_chunk = read()
+            chunks = itertools.chain([first_chunk], iter(read, b""))
+            try:
+                yield from iter_list_items(chunks)
+            except ValueError as e:
+                parsing_error = e
+            returncode = process.wait()
+            stderr.seek(0)
+            err = stderr.read().decode("utf-8")
+        if returncode != 0:
+            raise StatusCodeError(f"[{self.server}]: {err}")
+        if not first_chunk.strip():
+            raise NoOutputError(err)
+        if parsing_error:
+            raise JSONParsingError(str(parsing_error)) from parsing_error
+
     def _parse_kind(self, kind_name):
         # This is a provisional solution while we work in redefining
         # the api resources initialization.
@@ -1155,6 +1350,7 @@ class OCCli:  # pylint: disable=too-many-public-methods
 
         kind_group = kind_name.split(".", 1)
         kind = kind_group[0]
+        self._rediscover_api_resources(kind)
         if kind in self.api_resources:
             group_version = self.api_resources[kind][0].group_version
         else:
@@ -1194,6 +1390,7 @@ class OCCli:  # pylint: disable=too-many-public-methods
             except StatusCodeError:
                 return False
         else:
+            self._rediscover_api_resources(kind)
             return kind in self.api_resources
 
     def is_kind_namespaced(self, kind: str) -> bool:
@@ -1204,6 +1401,7 @@ class OCCli:  # pylint: disable=too-many-public-methods
 
         kg = kind.split(".", 1)
         kind = kg[0]
+        self._rediscover_api_resources(kind)
 
         # Same Kinds might exist in different api groups
         kind_resources = self.api_resources.get(kind)
@@ -1220,6 +1418,226 @@ class OCCli:  # pylint: disable=too-many-public-methods
 
 
 REQUEST_TIMEOUT = 60
+WATCH_TIMEOUT = 300
+WATCH_RETRY_INTERVAL = 10
+HTTP_STATUS_GONE = 410
+# oc commands that don't modify cluster state. Any other command issued by an
+# OCNative client makes it bypass the watch cache from then on.
+READ_ONLY_OC_COMMANDS = {"get", "version", "api-resources", "whoami", "logs"}
+
+
+# kinds that could not be listed are not watched for this many seconds
+WATCH_KIND_RETRY_INTERVAL = 300
+
+
+def watch_cache_enabled() -> bool:
+    return os.environ.get("USE_OC_WATCH_CACHE", "").lower() in {"true", "yes"}
+
+
+class WatchedKind:
+    """
+    Informer-style store of all objects of a kind in a cluster.
+
+    The store is populated by a single cluster-wide LIST and kept up to date
+    by a background watch that resumes from the last seen resourceVersion.
+    If the resourceVersion expired (410 Gone) the store is relisted.
+    """
+
+    def __init__(
+        self,
+        cluster_name: str,
+        kind: str,
+        dynamic_client: DynamicClient,
+        obj_client: Any,
+    ):
+        self.cluster_name = cluster_name
+        self.kind = kind
+        self._dynamic_client = dynamic_client
+        self._obj_client = obj_client
+        self._lock = Lock()
+        self._items: dict[tuple[str, str], dict[str, Any]] = {}
+        self._resource_version: str | None = None
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def synced(self) -> bool:
+        return self._resource_version is not None
+
+    def start(self) -> None:
+        self.relist()
+        self._thread = threading.Thread(
+            target=self._watch_loop,
+            name=f"watch-{self.cluster_name}-{self.kind}",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def relist(self) -> None:
+        oc_watch_cache_counter.labels(
+            cluster=self.cluster_name, kind=self.kind, event="relist"
+        ).inc()
+        result = self._obj_client.get(_request_timeout=REQUEST_TIMEOUT).to_dict()
+        items = {self._key(item): item for item in result.get("items") or []}
+        with self._lock:
+            self._items = items
+            self._resource_version = result["metadata"]["resourceVersion"]
+
+    @staticmethod
+    def _key(item: Mapping[str, Any]) -> tuple[str, str]:
+        metadata = item["metadata"]
+        return metadata.get("namespace", ""), metadata["name"]
+
+    def _watch_loop(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                if not self.synced:
+                    self.relist()
+                for event in self._dynamic_client.watch(
+                    self._obj_client,
+                    resource_version=self._resource_version,
+                    timeout=WATCH_TIMEOUT,
+                ):
+                    self._handle_event(event["type"], event["raw_object"])
+                    if self._stopped.is_set():
+                        return
+            except ApiException as e:
+                # the store misses the events since the watch broke, readers
+                # fall back to live calls until it is relisted
+                with self._lock:
+                    self._resource_version = None
+                if e.status == HTTP_STATUS_GONE:
+                    # resourceVersion is too old, relist on next iteration
+                    continue
+                logging.debug(f"[{self.cluster_name}] watch {self.kind} failed: {e}")
+                self._stopped.wait(WATCH_RETRY_INTERVAL)
+            except Exception as e:
+                with self._lock:
+                    self._resource_version = None
+                logging.debug(f"[{self.cluster_name}] watch {self.kind} failed: {e}")
+                self._stopped.wait(WATCH_RETRY_INTERVAL)
+
+    def _handle_event(self, event_type: str, obj: dict[str, Any]) -> None:
+        key = self._key(obj)
+        with self._lock:
+            if event_type in {"ADDED", "MODIFIED"}:
+                self._items[key] = obj
+            elif event_type == "DELETED":
+                self._items.pop(key, None)
+            self._resource_version = obj["metadata"]["resourceVersion"]
+
+    def get_item(self, namespace: str | None, name: str) -> dict[str, Any] | None:
+        with self._lock:
+            item = self._items.get((namespace or "", name))
+        return copy.deepcopy(item) if item else None
+
+    def list_items(
+        self,
+        namespace: str | None = None,
+        labels: Mapping[str, Any] | None = None,
+        resource_names: Iterable[str] | None = None,
+    ) -> list[dict[str, Any]]:
+        names = set(resource_names) if resource_names else None
+        with self._lock:
+            items = list(self._items.items())
+        result = []
+        for (item_namespace, item_name), item in items:
+            if namespace and namespace != item_namespace:
+                continue
+            if names is not None and item_name not in names:
+                continue
+            if labels:
+                item_labels = item["metadata"].get("labels") or {}
+                if any(item_labels.get(k) != str(v) for k, v in labels.items()):
+                    continue
+            result.append(copy.deepcopy(item))
+        return result
+
+
+class ClusterStateCache:
+    """
+    Process wide registry of WatchedKind stores, keyed by cluster server,
+    credentials and kind. It outlives OC clients, so integrations that run
+    in a loop (run-integration.py) are served from memory across iterations.
+    Clients with different tokens never share a store, the objects a token
+    can list depend on its permissions.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._key_locks: dict[tuple[str, str, str], Lock] = {}
+        self._stores: dict[tuple[str, str, str], WatchedKind] = {}
+        # key -> monotonic time after which a failed kind is tried again
+        self._retry_at: dict[tuple[str, str, str], float] = {}
+
+    def _cached(self, key: tuple[str, str, str]) -> tuple[bool, WatchedKind | None]:
+        if key in self._stores:
+            return True, self._stores[key]
+        if self._retry_at.get(key, 0) > time.monotonic():
+            return True, None
+        return False, None
+
+    def get_store(
+        self,
+        server: str,
+        identity: str,
+        cluster_name: str,
+        kind: str,
+        group_version: str,
+        client_factory: Callable[[], DynamicClient],
+    ) -> WatchedKind | None:
+        """
+        Returns the store for the kind, creating (and listing) it on first use.
+        identity tells apart the credentials of the client, e.g. a token
+        digest. Returns None if the kind can't be listed cluster-wide, e.g.
+        because of missing permissions; such kinds are retried after
+        WATCH_KIND_RETRY_INTERVAL seconds.
+        """
+        key = (server, identity, f"{kind}.{group_version}")
+        with self._lock:
+            cached, store = self._cached(key)
+            if cached:
+                return store
+            key_lock = self._key_locks.setdefault(key, Lock())
+
+        with key_lock:
+            with self._lock:
+                cached, store = self._cached(key)
+            if cached:
+                return store
+            oc_watch_cache_counter.labels(
+                cluster=cluster_name, kind=kind, event="miss"
+            ).inc()
+            try:
+                dynamic_client = client_factory()
+                obj_client = dynamic_client.resources.get(
+                    api_version=group_version, kind=kind
+                )
+                store = WatchedKind(cluster_name, kind, dynamic_client, obj_client)
+                store.start()
+            except Exception as e:
+                logging.warning(f"[{cluster_name}] unable to watch {kind}: {e}")
+                with self._lock:
+                    self._retry_at[key] = time.monotonic() + WATCH_KIND_RETRY_INTERVAL
+                return None
+            with self._lock:
+                self._stores[key] = store
+                self._retry_at.pop(key, None)
+            return store
+
+    def clear(self) -> None:
+        with self._lock:
+            for store in self._stores.values():
+                store.stop()
+            self._stores = {}
+            self._key_locks = {}
+            self._retry_at = {}
+
+
+CLUSTER_STATE_CACHE = ClusterStateCache()
 
 
 class OCNative(OCCli):
@@ -1234,6 +1652,7 @@ class OCNative(OCCli):
         local: bool = False,
         insecure_skip_tls_verify: bool = False,
         connection_parameters: OCConnectionParameters | None = None,
+        connection_pool_maxsize: int | None = None,
     ):
         super().__init__(
             cluster_name,
@@ -1247,6 +1666,7 @@ class OCNative(OCCli):
             insecure_skip_tls_verify=insecure_skip_tls_verify,
             connection_parameters=connection_parameters,
         )
+        self.connection_pool_maxsize = connection_pool_maxsize
 
         if connection_parameters:
             token = connection_parameters.automation_token
@@ -1264,6 +1684,14 @@ class OCNative(OCCli):
 
         self.object_clients: dict[Any, Any] = {}
 
+        # jump host tunnels are torn down with the client,
+        # so watches can't outlive it
+        self.state_cache: ClusterStateCache | None = None
+        if watch_cache_enabled() and not self.jump_host:
+            self.state_cache = CLUSTER_STATE_CACHE
+        self._token = token
+        self._token_identity = hashlib.sha256((token or "").encode()).hexdigest()
+
         self.init_projects = init_projects
         if self.init_projects:
             if self.is_kind_supported("Project"):
@@ -1307,6 +1735,13 @@ class OCNative(OCCli):
         # in the configuration object with setattr.
         for k, v in opts.items():
             setattr(configuration, k, v)
+        # the client is shared by all threads working on this cluster.
+        # the default pool (cpu count * 5 connections) discards and re-opens
+        # connections as soon as more threads than that run requests.
+        if self.connection_pool_maxsize:
+            configuration.connection_pool_maxsize = max(
+                configuration.connection_pool_maxsize, self.connection_pool_maxsize
+            )
 
         k8s_client = ApiClient(configuration)
         try:
@@ -1322,9 +1757,42 @@ class OCNative(OCCli):
             )
         return self.object_clients[key]
 
+    def _run(self, cmd, **kwargs) -> bytes:
+        if cmd and cmd[0] not in READ_ONLY_OC_COMMANDS:
+            # don't serve our own writes stale from the watch cache
+            self.state_cache = None
+        return super()._run(cmd, **kwargs)
+
+    def _get_watched_kind(self, kind: str, group_version: str) -> WatchedKind | None:
+        if not self.state_cache or not self.server:
+            return None
+        store = self.state_cache.get_store(
+            server=self.server,
+            identity=self._token_identity,
+            cluster_name=self.cluster_name,
+            kind=kind,
+            group_version=group_version,
+            client_factory=lambda: self._get_client(self.server, self._token),
+        )
+        if not store or not store.synced:
+            return None
+        oc_watch_cache_counter.labels(
+            cluster=self.cluster_name, kind=kind, event="hit"
+        ).inc()
+        return store
+
     @retry(max_attempts=5, exceptions=(ServerTimeoutError))
     def get_items(self, kind, **kwargs):
         k, group_version = self._parse_kind(kind)
+        store = self._get_watched_kind(k, group_version)
+        if store:
+            namespace = kwargs.get("namespace")
+            return store.list_items(
+                namespace=None if namespace == "cluster" else namespace,
+                labels=kwargs.get("labels"),
+                resource_names=kwargs.get("resource_names"),
+            )
+
         obj_client = self._get_obj_client(group_version=group_version, kind=k)
 
         namespace = ""
@@ -1371,9 +1839,109 @@ class OCNative(OCCli):
 
         return items
 
+    @OCDecorators.process_reconcile_time
+    def server_side_apply(self, namespace, resource, dry_run=False):
+        self.state_cache = None
+        obj_client = self._get_obj_client(
+            kind=resource.kind, group_version=resource.body["apiVersion"]
+        )
+        try:
+            with server_side_apply_time.labels(
+                cluster=self.cluster_name, kind=resource.kind, dry_run=dry_run
+            ).time():
+                obj_client.server_side_apply(
+                    body=resource.body,
+                    namespace=namespace,
+                    field_manager=FIELD_MANAGER,
+                    force_conflicts=True,
+                    dry_run="All" if dry_run else None,
+                    _request_timeout=REQUEST_TIMEOUT,
+                )
+        except DynamicApiError as e:
+            err = e.summary()
+            self._raise_for_apply_error(err)
+            raise StatusCodeError(f"[{self.server}]: {err}") from None
+        if dry_run:
+            return None
+        return self._msg_to_process_reconcile_time(namespace, resource)
+
+    def iter_items(self, kind, **kwargs) -> Iterator[dict[str, Any]]:
+        """Like get_items, but lists in pages of LIST_CHUNK_SIZE objects and
+        yields the items page by page instead of holding the whole list in
+        memory."""
+        k, group_version = self._parse_kind(kind)
+        if kwargs.get("resource_names") or self._get_watched_kind(k, group_version):
+            yield from self.get_items(kind, **kwargs)
+            return
+
+        namespace = kwargs.get("namespace", "")
+        # for cluster scoped integrations
+        # currently only openshift-clusterrolebindings
+        if namespace and namespace != "cluster" and not self.project_exists(namespace):
+            return
+
+        obj_client = self._get_obj_client(group_version=group_version, kind=k)
+        yield from self._iter_pages(
+            obj_client,
+            LIST_CHUNK_SIZE,
+            namespace=namespace,
+            label_selector=",".join(
+                f"{key}={value}" for key, value in (kwargs.get("labels") or {}).items()
+            ),
+        )
+
+    def get_cluster_items(self, kind, labels=None, chunk_size=LIST_CHUNK_SIZE):
+        return list(self.iter_cluster_items(kind, labels, chunk_size))
+
+    def iter_cluster_items(
+        self, kind, labels=None, chunk_size=LIST_CHUNK_SIZE
+    ) -> Iterator[dict[str, Any]]:
+        k, group_version = self._parse_kind(kind)
+        store = self._get_watched_kind(k, group_version)
+        if store:
+            yield from store.list_items(labels=labels)
+            return
+
+        obj_client = self._get_obj_client(group_version=group_version, kind=k)
+        label_selector = ",".join(
+            f"{key}={value}" for key, value in (labels or {}).items()
+        )
+        try:
+            yield from self._iter_pages(
+                obj_client, chunk_size, label_selector=label_selector
+            )
+        except ForbiddenError as e:
+            raise StatusCodeError(f"[{self.server}]: {e}") from None
+
+    def _iter_pages(
+        self, obj_client, chunk_size: int, **kwargs: Any
+    ) -> Iterator[dict[str, Any]]:
+        continue_token = None
+        while True:
+            result = self._get_page(
+                obj_client, limit=chunk_size, _continue=continue_token, **kwargs
+            )
+            yield from result.get("items") or []
+            continue_token = result["metadata"].get("continue")
+            if not continue_token:
+                return
+
+    @retry(max_attempts=5, exceptions=(ServerTimeoutError))
+    def _get_page(self, obj_client, **kwargs: Any) -> dict[str, Any]:
+        return obj_client.get(**kwargs, _request_timeout=REQUEST_TIMEOUT).to_dict()
+
     @retry(max_attempts=5, exceptions=(ServerTimeoutError, ForbiddenError))
     def get(self, namespace, kind, name=None, allow_not_found=False):
         k, group_version = self._parse_kind(kind)
+        store = self._get_watched_kind(k, group_version)
+        if store:
+            if name is None:
+                return {"items": store.list_items(namespace=namespace)}
+            item = store.get_item(namespace, name)
+            # an object missing from the cache is looked up live
+            if item:
+                return item
+
         obj_client = self._get_obj_client(group_version=group_version, kind=k)
         try:
             obj = obj_client.get(
@@ -1389,6 +1957,10 @@ class OCNative(OCCli):
 
     def get_all(self, kind, all_namespaces=False):
         k, group_version = self._parse_kind(kind)
+        store = self._get_watched_kind(k, group_version)
+        if store:
+            return {"items": store.list_items()}
+
         obj_client = self._get_obj_client(group_version=group_version, kind=k)
         try:
             return obj_client.get(_request_timeout=REQUEST_TIMEOUT).to_dict()
@@ -1434,6 +2006,7 @@ class OC:
         local: bool = False,
         insecure_skip_tls_verify: bool = False,
         connection_parameters: OCConnectionParameters | None = None,
+        connection_pool_maxsize: int | None = None,
     ):
         use_native_env = os.environ.get("USE_NATIVE_CLIENT", "")
         use_native = True
@@ -1460,6 +2033,7 @@ class OC:
                 local=local,
                 insecure_skip_tls_verify=insecure_skip_tls_verify,
                 connection_parameters=connection_parameters,
+                connection_pool_maxsize=connection_pool_maxsize,
             )
 
         OC.client_status.labels(cluster_name=cluster_name, native_client=False).inc()
@@ -1658,6 +2232,7 @@ class OC_Map:
                     init_projects=self.init_projects,
                     init_api_resources=self.init_api_resources,
                     insecure_skip_tls_verify=insecure_skip_tls_verify,
+                    connection_pool_maxsize=self.thread_pool_size,
                 )
                 self.set_oc(cluster, oc_client, privileged)
             except StatusCodeError as e:
@@ -126,6 +126,7 @@ class OCMap:
                     connection_parameters=connection_parameters,
                     init_projects=self._init_projects,
                     init_api_resources=self._init_api_resources,
+                    connection_pool_maxsize=self._thread_pool_size,
                 )
                 self._set_oc(cluster, oc_client, privileged)
             except StatusCodeError as e:
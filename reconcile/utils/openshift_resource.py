@@ -3,11 +3,13 @@ import base64
 import contextlib
 import copy
 import datetime
+import functools
 import hashlib
 import json
 import re
-from collections.abc import Mapping
+from collections.abc import Callable, Mapping
 from threading import Lock
+from typing import Any
 
 import semver
 from pydantic import BaseModel
@@ -43,6 +45,16 @@ DNS_NAMES_URL = (
 )
 
 IGNORABLE_DATA_FIELDS = ["service-ca.crt"]
+# fields that are set by the cluster and never compared
+IGNORABLE_FIELDS = frozenset({
+    "kubectl.kubernetes.io/last-applied-configuration",
+    "creationTimestamp",
+    "resourceVersion",
+    "generation",
+    "selfLink",
+    "uid",
+    "fieldRef",
+})
 # these labels existance and/or value is determined by a controller running
 # on the cluster. we need to ignore their existance in the current state,
 # otherwise we will deal with constant reconciliation
@@ -89,98 +101,35 @@ class OpenshiftResource:
         if validate_k8s_object:
             self.verify_valid_k8s_object()
 
-    def __eq__(self, other):
-        return self.obj_intersect_equal(self.body, other.body)
+    @property
+    def body(self):
+        return self._body
 
-    def obj_intersect_equal(self, obj1, obj2, depth=0):
-        # obj1 == d_item
-        # obj2 == c_item
-        if obj1.__class__ != obj2.__class__:
-            return False
+    @body.setter
+    def body(self, body):
+        self._body = body
+        # the canonical digest is computed on first use, replacing the body
+        # invalidates it. in-place changes to the body after the digest has
+        # been computed must be followed by an assignment to body
+        self._sha256sum = None
 
-        if isinstance(obj1, dict):
-            for obj1_k, obj1_v in obj1.items():
-                obj2_v = obj2.get(obj1_k, None)
-                if obj2_v is None:
-                    if obj1_v:
-                        return False
-                if self.ignorable_field(obj1_k):
-                    pass
-                elif self.ignorable_key_value_pair(obj1_k, obj1_v):
-                    pass
-                elif depth == 0 and obj1_k == "status":
-                    pass
-                elif obj1_k == "labels":
-                    diff = [
-                        k
-                        for k in obj2_v
-                        if k not in obj1_v
-                        and not OpenshiftResource.is_controller_managed_label(
-                            self.kind, k
-                        )
-                    ]
-                    if diff or not self.obj_intersect_equal(obj1_v, obj2_v, depth + 1):
-                        return False
-                elif obj1_k in {"data", "matchLabels"}:
-                    diff = [
-                        k
-                        for k in obj2_v
-                        if k not in obj1_v and k not in IGNORABLE_DATA_FIELDS
-                    ]
-                    if diff or not self.obj_intersect_equal(obj1_v, obj2_v, depth + 1):
-                        return False
-                elif obj1_k == "env":
-                    for v in obj2_v or []:
-                        if "name" in v and len(v) == 1:
-                            v["value"] = ""
-                    if not self.obj_intersect_equal(obj1_v, obj2_v, depth + 1):
-                        return False
-                elif obj1_k == "cpu":
-                    equal = self.cpu_equal(obj1_v, obj2_v)
-                    if not equal:
-                        return False
-                elif obj1_k == "apiVersion":
-                    valid = self.api_version_mutation(obj1_v, obj2_v)
-                    if not valid:
-                        return False
-                elif obj1_k == "imagePullSecrets":
-                    # remove default pull secrets added by k8s
-                    obj2_v_clean = [s for s in obj2_v if "-dockercfg-" not in s["name"]]
-                    if not self.obj_intersect_equal(obj1_v, obj2_v_clean, depth + 1):
-                        return False
-                elif not self.obj_intersect_equal(obj1_v, obj2_v, depth + 1):
-                    return False
-
-        elif isinstance(obj1, list):
-            if len(obj1) != len(obj2):
-                return False
-            for index, item in enumerate(obj1):
-                if not self.obj_intersect_equal(item, obj2[index], depth + 1):
-                    return False
+    def __eq__(self, other):
+        if self._digest_equal(other):
+            return True
+        return comparator_for_kind(self.body.get("kind")).equal(self.body, other.body)
 
-        elif obj1 != obj2:
+    def _digest_equal(self, other):
+        try:
+            digest = self.body["metadata"]["annotations"][QONTRACT_ANNOTATION_SHA256SUM]
+            other_digest = other.body["metadata"]["annotations"][
+                QONTRACT_ANNOTATION_SHA256SUM
+            ]
+        except (KeyError, TypeError):
             return False
-
-        return True
-
-    @staticmethod
-    def ignorable_field(val):
-        ignorable_fields = [
-            "kubectl.kubernetes.io/last-applied-configuration",
-            "creationTimestamp",
-            "resourceVersion",
-            "generation",
-            "selfLink",
-            "uid",
-            "fieldRef",
-        ]
-        return val in ignorable_fields
-
-    @staticmethod
-    def ignorable_key_value_pair(key, val):
-        ignorable_key_value_pair = {"annotations": None, "divisor": "0"}
-        return bool(
-            key in ignorable_key_value_pair and ignorable_key_value_pair[key] == val
+        return (
+            digest == other_digest
+            and self.has_valid_sha256sum()
+            and other.has_valid_sha256sum()
         )
 
     @staticmethod
@@ -344,9 +293,10 @@ class OpenshiftResource:
             openshift_resource: new OpenshiftResource object with
                 annotations.
         """
-        body = self.canonicalize(self.body) if canonicalize else self.body
-
-        sha256sum = self.calculate_sha256sum(self.serialize(body))
+        if canonicalize:
+            sha256sum = self.sha256sum()
+        else:
+            sha256sum = self.calculate_sha256sum(self.serialize(self.body))
 
         # create new body object
         body = copy.deepcopy(self.body)
@@ -367,65 +317,76 @@ class OpenshiftResource:
         if self.caller_name:
             annotations[QONTRACT_ANNOTATION_CALLER_NAME] = self.caller_name
 
-        return OpenshiftResource(body, self.integration, self.integration_version)
+        annotated = OpenshiftResource(body, self.integration, self.integration_version)
+        if canonicalize:
+            # the qontract annotations are not part of the canonical body
+            annotated._sha256sum = sha256sum
+        return annotated
 
     def sha256sum(self):
-        body = self.annotate().body
-
-        annotations = body["metadata"]["annotations"]
-        return annotations["qontract.sha256sum"]
+        if self._sha256sum is None:
+            self._sha256sum = self.calculate_sha256sum(
+                self.serialize(self.canonicalize(self.body))
+            )
+        return self._sha256sum
 
     def toJSON(self):
         return self.serialize(self.body)
 
     @staticmethod
     def canonicalize(body):
-        body = copy.deepcopy(body)
-
+        """
+        Returns the body without the fields that are set by the cluster or by
+        qontract-reconcile. The given body is never mutated: only the
+        containers on the path to a changed field are copied, untouched
+        subtrees are shared with the given body.
+        """
+        kind = body["kind"]
+        body = dict(body)
+        metadata = body["metadata"] = dict(body["metadata"])
         # create annotations if not present
-        body["metadata"].setdefault("annotations", {})
-        if body["metadata"]["annotations"] is None:
-            body["metadata"]["annotations"] = {}
-        annotations = body["metadata"]["annotations"]
+        annotations = metadata["annotations"] = dict(metadata.get("annotations") or {})
 
         # remove openshift specific params
-        body["metadata"].pop("creationTimestamp", None)
-        body["metadata"].pop("resourceVersion", None)
-        body["metadata"].pop("generation", None)
-        body["metadata"].pop("selfLink", None)
-        body["metadata"].pop("uid", None)
-        body["metadata"].pop("namespace", None)
-        body["metadata"].pop("managedFields", None)
+        metadata.pop("creationTimestamp", None)
+        metadata.pop("resourceVersion", None)
+        metadata.pop("generation", None)
+        metadata.pop("selfLink", None)
+        metadata.pop("uid", None)
+        metadata.pop("namespace", None)
+        metadata.pop("managedFields", None)
         annotations.pop("kubectl.kubernetes.io/last-applied-configuration", None)
 
         # remove status
         body.pop("status", None)
 
         # remove controller managed labels
-        labels = body["metadata"].get("labels", {})
-        for label in set(labels.keys()):
-            if OpenshiftResource.is_controller_managed_label(body["kind"], label):
-                labels.pop(label)
+        if kind in CONTROLLER_MANAGED_LABELS and "labels" in metadata:
+            metadata["labels"] = {
+                k: v
+                for k, v in metadata["labels"].items()
+                if not OpenshiftResource.is_controller_managed_label(kind, k)
+            }
 
         # Default fields for specific resource types
         # ConfigMaps and Secrets are by default Opaque
-        if body["kind"] in {"ConfigMap", "Secret"} and body.get("type") == "Opaque":
+        if kind in {"ConfigMap", "Secret"} and body.get("type") == "Opaque":
             body.pop("type")
 
-        if body["kind"] == "Secret":
+        if kind == "Secret":
             string_data = body.pop("stringData", None)
             if string_data:
-                body.setdefault("data", {})
+                data = body["data"] = dict(body.get("data", {}))
                 for k, v in string_data.items():
-                    v = base64_encode_secret_field_value(str(v))
-                    body["data"][k] = v
+                    data[k] = base64_encode_secret_field_value(str(v))
 
-        if body["kind"] == "Deployment":
+        if kind == "Deployment":
             annotations.pop("deployment.kubernetes.io/revision", None)
 
-        if body["kind"] == "Route":
-            if body["spec"].get("wildcardPolicy") == "None":
-                body["spec"].pop("wildcardPolicy")
+        if kind == "Route":
+            spec = body["spec"] = dict(body["spec"])
+            if spec.get("wildcardPolicy") == "None":
+                spec.pop("wildcardPolicy")
             # remove tls-acme specific params from Route
             if "kubernetes.io/tls-acme" in annotations:
                 annotations.pop(
@@ -434,15 +395,15 @@ class OpenshiftResource:
                 annotations.pop(
                     "kubernetes.io/tls-acme-awaiting-authorization-at-url", None
                 )
-                if "tls" in body["spec"]:
-                    tls = body["spec"]["tls"]
+                if "tls" in spec:
+                    tls = spec["tls"] = dict(spec["tls"])
                     tls.pop("key", None)
                     tls.pop("certificate", None)
-            subdomain = body["spec"].get("subdomain", None)
+            subdomain = spec.get("subdomain")
             if not subdomain:
-                body["spec"].pop("subdomain", None)
+                spec.pop("subdomain", None)
 
-        if body["kind"] == "ServiceAccount":
+        if kind == "ServiceAccount":
             if "imagePullSecrets" in body:
                 # remove default pull secrets added by k8s
                 imagePullSecrets = [
@@ -455,57 +416,65 @@ class OpenshiftResource:
             if "secrets" in body:
                 body.pop("secrets")
 
-        if body["kind"] == "Role":
+        if kind == "Role":
+            rules = []
             for rule in body["rules"]:
+                rule = dict(rule)
                 if "resources" in rule:
-                    rule["resources"].sort()
+                    rule["resources"] = sorted(rule["resources"])
 
                 if "verbs" in rule:
-                    rule["verbs"].sort()
+                    rule["verbs"] = sorted(rule["verbs"])
 
                 if (
                     "attributeRestrictions" in rule
                     and not rule["attributeRestrictions"]
                 ):
                     rule.pop("attributeRestrictions")
+                rules.append(rule)
+            body["rules"] = rules
 
-        if body["kind"] == "OperatorGroup":
+        if kind == "OperatorGroup":
             annotations.pop("olm.providedAPIs", None)
 
-        if body["kind"] == "RoleBinding":
+        if kind == "RoleBinding":
             if "groupNames" in body:
                 body.pop("groupNames")
             if "userNames" in body:
                 body.pop("userNames")
             if "roleRef" in body:
-                roleRef = body["roleRef"]
+                roleRef = body["roleRef"] = dict(body["roleRef"])
                 if "namespace" in roleRef:
                     roleRef.pop("namespace")
                 if "apiGroup" in roleRef and roleRef["apiGroup"] in body["apiVersion"]:
                     roleRef.pop("apiGroup")
                 if "kind" in roleRef:
                     roleRef.pop("kind")
+            subjects = []
             for subject in body["subjects"]:
+                subject = dict(subject)
                 if "namespace" in subject:
                     subject.pop("namespace")
                 if "apiGroup" in subject and (
                     not subject["apiGroup"] or subject["apiGroup"] in body["apiVersion"]
                 ):
                     subject.pop("apiGroup")
+                subjects.append(subject)
+            body["subjects"] = subjects
 
-        if body["kind"] == "ClusterRoleBinding":
+        if kind == "ClusterRoleBinding":
             if "userNames" in body:
                 body.pop("userNames")
             if "roleRef" in body:
-                roleRef = body["roleRef"]
+                roleRef = body["roleRef"] = dict(body["roleRef"])
                 if "apiGroup" in roleRef and roleRef["apiGroup"] in body["apiVersion"]:
                     roleRef.pop("apiGroup")
                 if "kind" in roleRef:
                     roleRef.pop("kind")
             if "groupNames" in body:
                 body.pop("groupNames")
-        if body["kind"] == "Service":
-            spec = body["spec"]
+        if kind == "Service":
+            spec = body["spec"] = dict(body["spec"])
             if spec.get("sessionAffinity") == "None":
                 spec.pop("sessionAffinity")
             if spec.get("type") == "ClusterIP":
@@ -530,6 +499,115 @@ class OpenshiftResource:
         return m.hexdigest()
 
 
+class IntersectComparator:
+    """
+    Compares a desired body with a current body: every field of the desired
+    body has to be equal in the current body, additional fields of the
+    current body are ignored. Fields that are mutated by the cluster are
+    handled by rules, looked up by field name in a table built once per kind.
+    The compared bodies are never mutated.
+    """
+
+    def __init__(self, kind: str | None):
+        self.kind = kind
+        self.rules: dict[str, Callable[[Any, Any, int], bool]] = dict.fromkeys(
+            IGNORABLE_FIELDS, self._ignore
+        )
+        self.rules.update({
+            "annotations": self._annotations,
+            "divisor": self._divisor,
+            "status": self._status,
+            "labels": self._labels,
+            "data": self._data,
+            "matchLabels": self._data,
+            "env": self._env,
+            "cpu": self._cpu,
+            "apiVersion": self._api_version,
+            "imagePullSecrets": self._image_pull_secrets,
+        })
+
+    def equal(self, obj1: Any, obj2: Any, depth: int = 0) -> bool:
+        if obj1.__class__ != obj2.__class__:
+            return False
+
+        if isinstance(obj1, dict):
+            rules = self.rules
+            for key, obj1_v in obj1.items():
+                obj2_v = obj2.get(key, None)
+                if obj2_v is None and obj1_v:
+                    return False
+                rule = rules.get(key)
+                if rule is None:
+                    if not self.equal(obj1_v, obj2_v, depth + 1):
+                        return False
+                elif not rule(obj1_v, obj2_v, depth):
+                    return False
+            return True
+
+        if isinstance(obj1, list):
+            return len(obj1) == len(obj2) and all(
+                self.equal(item1, item2, depth + 1)
+                for item1, item2 in zip(obj1, obj2, strict=True)
+            )
+
+        return obj1 == obj2
+
+    # rules are called with the depth of the dict containing the field
+
+    @staticmethod
+    def _ignore(obj1_v: Any, obj2_v: Any, depth: int) -> bool:
+        return True
+
+    def _annotations(self, obj1_v: Any, obj2_v: Any, depth: int) -> bool:
+        return obj1_v is None or self.equal(obj1_v, obj2_v, depth + 1)
+
+    def _divisor(self, obj1_v: Any, obj2_v: Any, depth: int) -> bool:
+        return obj1_v == "0" or self.equal(obj1_v, obj2_v, depth + 1)
+
+    def _status(self, obj1_v: Any, obj2_v: Any, depth: int) -> bool:
+        return depth == 0 or self.equal(obj1_v, obj2_v, depth + 1)
+
+    def _labels(self, obj1_v: Any, obj2_v: Any, depth: int) -> bool:
+        if any(
+            k not in obj1_v
+            and not OpenshiftResource.is_controller_managed_label(self.kind, k)
+            for k in obj2_v
+        ):
+            return False
+        return self.equal(obj1_v, obj2_v, depth + 1)
+
+    def _data(self, obj1_v: Any, obj2_v: Any, depth: int) -> bool:
+        if any(k not in obj1_v and k not in IGNORABLE_DATA_FIELDS for k in obj2_v):
+            return False
+        return self.equal(obj1_v, obj2_v, depth + 1)
+
+    def _env(self, obj1_v: Any, obj2_v: Any, depth: int) -> bool:
+        # the cluster drops empty values of env variables
+        if isinstance(obj2_v, list):
+            obj2_v = [
+                v | {"value": ""} if "name" in v and len(v) == 1 else v for v in obj2_v
+            ]
+        return self.equal(obj1_v, obj2_v, depth + 1)
+
+    @staticmethod
+    def _cpu(obj1_v: Any, obj2_v: Any, depth: int) -> bool:
+        return OpenshiftResource.cpu_equal(obj1_v, obj2_v)
+
+    @staticmethod
+    def _api_version(obj1_v: Any, obj2_v: Any, depth: int) -> bool:
+        return OpenshiftResource.api_version_mutation(obj1_v, obj2_v)
+
+    def _image_pull_secrets(self, obj1_v: Any, obj2_v: Any, depth: int) -> bool:
+        # remove default pull secrets added by k8s
+        obj2_v_clean = [s for s in obj2_v if "-dockercfg-" not in s["name"]]
+        return self.equal(obj1_v, obj2_v_clean, depth + 1)
+
+
+@functools.cache
+def comparator_for_kind(kind: str | None) -> IntersectComparator:
+    return IntersectComparator(kind)
+
+
 def fully_qualified_kind(kind: str, api_version: str) -> str:
     if "/" in api_version:
         group = api_version.split("/")[0]
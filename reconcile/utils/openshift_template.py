@@ -0,0 +1,215 @@
+"""
+Processes OpenShift Templates in process, like
+`oc process --local --ignore-unknown-parameters` does, without forking an
+oc binary per template.
+
+The rules follow the template processor of openshift/library-go:
+
+- parameter values passed in replace the template values and disable
+  their generators. Unknown parameters are ignored.
+- parameters without a value are generated from their `from` expression
+  if they have `generate: expression`. Required parameters that still
+  have no value are an error.
+- hardcoded namespaces are stripped from objects. Namespaces referencing
+  a parameter are kept and substituted.
+- `${NAME}` is substituted anywhere in strings and map keys. A string
+  that is exactly `${{NAME}}` is replaced by the JSON value of the
+  parameter, e.g. a number or a boolean.
+- the template `labels` are added to the labels of every object.
+"""
+
+import copy
+import json
+import re
+import secrets
+from collections.abc import (
+    Callable,
+    Mapping,
+)
+from typing import Any
+
+STRING_PARAMETER_RE = re.compile(r"\$\{([a-zA-Z0-9\_]+?)\}")
+NON_STRING_PARAMETER_RE = re.compile(r"^\$\{\{([a-zA-Z0-9\_]+)\}\}$")
+
+# the expression generator of `generate: expression` parameters
+GENERATOR_RE = re.compile(r"\[([a-zA-Z0-9\-\\]+)\](\{(\w+)\})")
+RANGE_RE = re.compile(r"([\\]?[a-zA-Z0-9]\-?[a-zA-Z0-9]?)")
+ALPHABET = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+NUMERALS = "0123456789"
+SYMBOLS = "~!@#$%^&*()-_+={}[]\\|<,>.?/\"';:`"
+CHARACTER_CLASSES = {
+    r"\w": ALPHABET + NUMERALS + "_",
+    r"\d": NUMERALS,
+    r"\a": ALPHABET + NUMERALS,
+    r"\A": SYMBOLS,
+}
+MAX_GENERATED_LENGTH = 255
+
+
+class TemplateProcessingError(Exception):
+    pass
+
+
+def _alphabet(ranges: str) -> str:
+    alphabet = ""
+    for r in RANGE_RE.findall(ranges):
+        if r in CHARACTER_CLASSES:
+            alphabet += CHARACTER_CLASSES[r]
+            continue
+        first, last = r[0], r[-1]
+        if first > last:
+            raise TemplateProcessingError(f"invalid range specified: {first}-{last}")
+        alphabet += "".join(chr(c) for c in range(ord(first), ord(last) + 1))
+    # keep the first occurrence of each character
+    return "".join(dict.fromkeys(alphabet))
+
+
+def generate_value(expression: str) -> str:
+    """
+    Generates a value from an expression like `[a-zA-Z0-9]{16}` or
+    `admin[\\d]{4}`. Each `[ranges]{length}` is replaced by length random
+    characters of the ranges.
+    """
+    value = expression
+    for match in GENERATOR_RE.finditer(expression):
+        try:
+            length = int(match.group(3))
+        except ValueError:
+            raise TemplateProcessingError(
+                f"malformed length in expression {expression}"
+            ) from None
+        if not 0 < length <= MAX_GENERATED_LENGTH:
+            raise TemplateProcessingError(
+                f"range must be within [1-{MAX_GENERATED_LENGTH}] characters "
+                f"({length})"
+            )
+        alphabet = _alphabet(match.group(1))
+        generated = "".join(secrets.choice(alphabet) for _ in range(length))
+        value = value.replace(match.group(0), generated, 1)
+    return value
+
+
+def _parameter_values(
+    template: Mapping[str, Any], parameters: Mapping[str, Any]
+) -> dict[str, str]:
+    template_parameters = [dict(p) for p in template.get("parameters") or []]
+    for passed_name, value in parameters.items():
+        for parameter in template_parameters:
+            if parameter.get("name") == passed_name:
+                # passed the same way as `oc process NAME=value`
+                parameter["value"] = str(value)
+                parameter["generate"] = ""
+                break
+
+    values = {}
+    for i, parameter in enumerate(template_parameters):
+        name = parameter.get("name")
+        if not name:
+            raise TemplateProcessingError(f"template.parameters[{i}]: name is required")
+        value = parameter.get("value") or ""
+        if not isinstance(value, str):
+            raise TemplateProcessingError(
+                f"template.parameters[{i}]: value of {name} must be a string"
+            )
+        generate = parameter.get("generate")
+        if not value and generate:
+            if generate != "expression":
+                raise TemplateProcessingError(
+                    f"template.parameters[{i}]: Invalid '{generate}' generator"
+                )
+            if not parameter.get("from"):
+                raise TemplateProcessingError(
+                    f"template.parameters[{i}]: Invalid From value "
+                    f'(generator "{generate}" requires a from value)'
+                )
+            value = generate_value(parameter["from"])
+        if not value and parameter.get("required"):
+            raise TemplateProcessingError(
+                f"template.parameters[{i}]: parameter {name} "
+                "is required and must be specified"
+            )
+        values[name] = value
+    return values
+
+
+def substitute(values: Mapping[str, str], s: str) -> tuple[str, bool]:
+    """
+    Substitutes parameter references in s. Returns the result and whether it
+    is a string, or the JSON text of a `${{NAME}}` non-string value.
+    """
+    if "$" not in s:
+        return s, True
+    if (match := NON_STRING_PARAMETER_RE.match(s)) and match.group(1) in values:
+        return values[match.group(1)], False
+    out = STRING_PARAMETER_RE.sub(lambda m: values.get(m.group(1), m.group(0)), s)
+    return out, True
+
+
+def _normalize_number(value: Any) -> Any:
+    # unstructured objects decode integral numbers as integers
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _visit(obj: Any, visit_string: Callable[[str], tuple[str, bool]]) -> Any:
+    if isinstance(obj, str):
+        s, is_string = visit_string(obj)
+        if is_string:
+            return s
+        try:
+            return _visit(json.loads(s), lambda s: (s, True))
+        except ValueError:
+            raise TemplateProcessingError(
+                f"unable to use {s!r} as a non-string value"
+            ) from None
+    if isinstance(obj, dict):
+        return {visit_string(k)[0]: _visit(v, visit_string) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_visit(v, visit_string) for v in obj]
+    return _normalize_number(obj)
+
+
+def _strip_namespace(obj: dict[str, Any]) -> None:
+    metadata = obj.get("metadata")
+    if not isinstance(metadata, dict) or "namespace" not in metadata:
+        return
+    namespace = metadata["namespace"]
+    if isinstance(namespace, str) and STRING_PARAMETER_RE.search(namespace):
+        return
+    if isinstance(namespace, str) and namespace:
+        del metadata["namespace"]
+    else:
+        metadata["namespace"] = ""
+
+
+def process_template(
+    template: Mapping[str, Any], parameters: Mapping[str, Any] | None = None
+) -> list[dict[str, Any]]:
+    """
+    Returns the objects of an OpenShift Template with the parameters
+    applied, the items `oc process --local --ignore-unknown-parameters`
+    would return. The template is not modified.
+    """
+    values = _parameter_values(template, parameters or {})
+
+    def visit_string(s: str) -> tuple[str, bool]:
+        return substitute(values, s)
+
+    labels = {
+        visit_string(k)[0]: visit_string(v)[0] if isinstance(v, str) else v
+        for k, v in (template.get("labels") or {}).items()
+    }
+    items = []
+    for obj in template.get("objects") or []:
+        if isinstance(obj, dict):
+            obj = copy.copy(obj)
+            if isinstance(obj.get("metadata"), dict):
+                obj["metadata"] = dict(obj["metadata"])
+            _strip_namespace(obj)
+        item = _visit(obj, visit_string)
+        if labels and isinstance(item, dict):
+            metadata = item.setdefault("metadata", {})
+            metadata["labels"] = {**(metadata.get("labels") or {}), **labels}
+        items.append(item)
+    return items
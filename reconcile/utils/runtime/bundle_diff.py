@@ -0,0 +1,84 @@
+"""
+Decides from the qontract-server /diff of two bundles whether a change can
+affect the desired state of an integration at all, without querying the
+desired state of the comparison bundle.
+
+Every GraphQL response lists the schemas of the datafiles it was resolved
+from. If none of the changed datafiles has a schema the integration queried
+for its desired state in the current bundle, the desired state is the same
+in both bundles. Deleted datafiles and changed resourcefiles can't be ruled
+out this way.
+"""
+
+import logging
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from reconcile.change_owners.bundle import QontractServerDiff
+from reconcile.utils import gql
+from reconcile.utils.disk_cache import (
+    DiskCache,
+    cache_dir,
+)
+
+# one small entry per PR check, shared by all integrations of the job
+BUNDLE_DIFF_CACHE = DiskCache(cache_dir("bundle-diffs"), max_bytes=64 * 1024**2)
+
+
+@dataclass(frozen=True)
+class BundleDiff:
+    changed_schemas: frozenset[str]
+    """
+    The schemas of the changed datafiles, before and after the change.
+    """
+    attributable: bool
+    """
+    Whether all changes can be attributed to the schemas in `changed_schemas`.
+    """
+
+    def may_affect(self, queried_schemas: Iterable[str]) -> bool:
+        queried = set(queried_schemas)
+        # nothing can be ruled out if the server didn't report schemas
+        return (
+            not self.attributable or not queried or bool(self.changed_schemas & queried)
+        )
+
+    @classmethod
+    def from_qontract_server_diff(cls, diff: QontractServerDiff) -> "BundleDiff":
+        changed_schemas = set()
+        attributable = not diff.resources
+        for datafile in diff.datafiles.values():
+            if datafile.new is None:
+                attributable = False
+            changed_schemas.add(datafile.datafileschema)
+            for content in (datafile.old, datafile.new):
+                if content and content.get("$schema"):
+                    changed_schemas.add(content["$schema"])
+        return cls(
+            changed_schemas=frozenset(changed_schemas), attributable=attributable
+        )
+
+
+def get_bundle_diff(old_sha: str, new_sha: str) -> BundleDiff:
+    """Returns the BundleDiff of two bundles, computed once per PR check job."""
+    key = f"{old_sha}/{new_sha}"
+    if cached := BUNDLE_DIFF_CACHE.get(key):
+        return BundleDiff(
+            changed_schemas=frozenset(cached["changed_schemas"]),
+            attributable=cached["attributable"],
+        )
+    bundle_diff = BundleDiff.from_qontract_server_diff(
+        QontractServerDiff(**gql.get_diff(old_sha, new_sha=new_sha))
+    )
+    logging.debug(
+        f"bundle diff {old_sha}..{new_sha}: schemas {sorted(bundle_diff.changed_schemas)}, "
+        f"attributable {bundle_diff.attributable}"
+    )
+    BUNDLE_DIFF_CACHE.set(
+        key,
+        {
+            "changed_schemas": sorted(bundle_diff.changed_schemas),
+            "attributable": bundle_diff.attributable,
+        },
+    )
+    return bundle_diff
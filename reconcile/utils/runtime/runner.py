@@ -1,7 +1,11 @@
 import logging
 import sys
-from dataclasses import dataclass
+from dataclasses import (
+    dataclass,
+    field,
+)
 from typing import (
+    TYPE_CHECKING,
     Any,
     TypeVar,
 )
@@ -10,15 +14,16 @@ from sretoolbox.utils import threaded as sretoolbox_threaded
 
 from reconcile.status import ExitCodes
 from reconcile.utils import gql
-from reconcile.utils.runtime.desired_state_diff import (
-    DesiredStateDiff,
-    build_desired_state_diff,
-)
+from reconcile.utils.disk_cache import init_shared_tier
+from reconcile.utils.runtime.bundle_diff import get_bundle_diff
 from reconcile.utils.runtime.integration import (
     QontractReconcileIntegration,
     RunParams,
 )
 
+if TYPE_CHECKING:
+    from reconcile.utils.runtime.desired_state_diff import DesiredStateDiff
+
 RunParamsTypeVar = TypeVar("RunParamsTypeVar", bound=RunParams)
 
 
@@ -65,6 +70,13 @@ class IntegrationRunConfiguration:
     A debug flag to control whether the URL of the GraphQL endpoint in use is printed.
     """
 
+    use_bundle_diff: bool = field(default=False, kw_only=True)
+    """
+    Whether to skip the desired state of the comparison bundle if the
+    qontract-server diff of the bundles shows that no datafile the
+    integration queried changed.
+    """
+
     def main_bundle_desired_state(self) -> dict[str, Any] | None:
         self.switch_to_main_bundle()
         return self.integration.get_early_exit_desired_state()
@@ -87,6 +99,11 @@ class IntegrationRunConfiguration:
             validate_schemas=final_validate_schemas,
             print_url=self.print_url,
         )
+        init_shared_tier(gql.RESPONSE_CACHE, "gql-response-cache")
+        # pulls in the state and AWS clients, keep them out of CLI startup
+        from reconcile.utils.gql_snapshot import init_snapshot  # noqa: PLC0415
+
+        init_snapshot()
 
     def switch_to_comparison_bundle(self, validate_schemas: bool | None = None) -> None:
         final_validate_schemas = (
@@ -102,7 +119,7 @@ class IntegrationRunConfiguration:
 
 def get_desired_state_diff(
     run_cfg: IntegrationRunConfiguration,
-) -> DesiredStateDiff | None:
+) -> "DesiredStateDiff | None":
     """
     Calculates the desired state diff between the current bundle and the
     comparison bundle for an integration. If the integration does not support
@@ -114,6 +131,32 @@ def get_desired_state_diff(
     if not run_cfg.early_exit_compare_sha:
         return None
 
+    from reconcile.utils.runtime.desired_state_diff import (  # noqa: PLC0415
+        build_desired_state_diff,
+    )
+
+    # get desired state from current bundle
+    try:
+        current_desired_state = run_cfg.main_bundle_desired_state()
+        if current_desired_state is None:
+            return None
+    except Exception:
+        logging.exception("Failed to fetch desired state for current bundle")
+        return None
+
+    shard_config = (
+        run_cfg.integration.get_desired_state_shard_config()
+        if run_cfg.check_only_affected_shards
+        else None
+    )
+    if run_cfg.use_bundle_diff and not bundle_diff_may_affect_desired_state(
+        run_cfg.early_exit_compare_sha
+    ):
+        logging.debug("No queried datafile changed. Skip the comparison bundle.")
+        return build_desired_state_diff(
+            shard_config, current_desired_state, current_desired_state
+        )
+
     # get desired state from comparison bundle
     try:
         previous_desired_state = run_cfg.comparison_bundle_desired_state()
@@ -126,24 +169,29 @@ def get_desired_state_diff(
         )
         return None
 
-    # get desired state from current bundle
-    try:
-        current_desired_state = run_cfg.main_bundle_desired_state()
-        if current_desired_state is None:
-            return None
-    except Exception:
-        logging.exception("Failed to fetch desired state for current bundle")
-        return None
-
     return build_desired_state_diff(
-        run_cfg.integration.get_desired_state_shard_config()
-        if run_cfg.check_only_affected_shards
-        else None,
+        shard_config,
         previous_desired_state,
         current_desired_state,
     )
 
 
+def bundle_diff_may_affect_desired_state(compare_sha: str) -> bool:
+    """
+    Whether the changes between the comparison bundle and the current bundle
+    may affect the desired state just queried from the current bundle.
+    """
+    gql_api = gql.get_api()
+    if not gql_api.sha:
+        return True
+    try:
+        bundle_diff = get_bundle_diff(compare_sha, gql_api.sha)
+    except Exception:
+        logging.exception("Failed to fetch the bundle diff")
+        return True
+    return bundle_diff.may_affect(gql_api.get_queried_schemas())
+
+
 def run_integration_cfg(run_cfg: IntegrationRunConfiguration) -> None:
     """
     Runs an integration with the given configuration, making sure to run it
@@ -169,7 +217,7 @@ def _integration_wet_run(
 
 def _integration_dry_run(
     integration: QontractReconcileIntegration[RunParamsTypeVar],
-    desired_state_diff: DesiredStateDiff | None,
+    desired_state_diff: "DesiredStateDiff | None",
 ) -> None:
     """
     Runs an integration in dry-run mode, i.e. not actually making any changes
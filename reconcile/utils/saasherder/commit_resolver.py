@@ -0,0 +1,138 @@
+"""
+Resolves the refs of saas targets to commit shas once per run. All phases
+of a SaasHerder run share the results, and a repository with many targets
+on different branches has its branches listed in one go instead of
+resolving every branch on its own.
+"""
+
+import logging
+import math
+import re
+from collections import defaultdict
+from collections.abc import (
+    Callable,
+    Iterable,
+)
+
+from github import Github
+
+from reconcile.utils.gitlab_api import GitLabApi
+from reconcile.utils.single_flight import SingleFlight
+
+# consider listing the branches of a repository once it has this many
+# distinct refs, counting its branches and tags takes requests too
+BULK_REF_THRESHOLD = 10
+COMMIT_SHA_RE = re.compile(r"^[0-9a-f]{40}$")
+
+
+class CommitResolver:
+    """
+    Memoizes ref to commit sha resolution by (url, ref). Threads asking for
+    a ref that is being resolved wait for that resolution. Failed
+    resolutions are not memoized.
+
+    Full commit shas resolve to themselves. Other refs are resolved with
+    one API call each, unless prefetch found them among the branches of
+    their repository. Names that are both a branch and a tag are left to
+    the API, which knows how to disambiguate them.
+    """
+
+    def __init__(self, gitlab: GitLabApi | None = None) -> None:
+        self.gitlab = gitlab
+        self._commit_shas: SingleFlight[tuple[str, str], str] = SingleFlight()
+
+    def resolve(self, url: str, ref: str, github: Github) -> str:
+        if COMMIT_SHA_RE.match(ref):
+            return ref
+        return self._commit_shas.get(
+            (url, ref), lambda: self._resolve(url, ref, github)
+        )
+
+    def _resolve(self, url: str, ref: str, github: Github) -> str:
+        commit_sha = ""
+        if "github" in url:
+            repo_name = url.rstrip("/").replace("https://github.com/", "")
+            repo = github.get_repo(repo_name)
+            commit = repo.get_commit(sha=ref)
+            commit_sha = commit.sha
+        elif "gitlab" in url:
+            if not self.gitlab:
+                raise Exception("gitlab is not initialized")
+            project = self.gitlab.get_project(url)
+            commits = project.commits.list(ref_name=ref, per_page=1, page=1)
+            commit_sha = commits[0].id
+
+        return commit_sha
+
+    def prefetch(
+        self, refs: Iterable[tuple[str, str]], github: Callable[[str], Github]
+    ) -> None:
+        """
+        Resolves the branches among refs, given as (url, ref), for every
+        repository with at least BULK_REF_THRESHOLD distinct refs by listing
+        the branches and tags of the repository, unless listing them takes
+        as many requests as resolving the refs one by one. github returns
+        the client for a GitHub url.
+        """
+        refs_by_url: dict[str, set[str]] = defaultdict(set)
+        for url, ref in refs:
+            if COMMIT_SHA_RE.match(ref) or (url, ref) in self._commit_shas:
+                continue
+            refs_by_url[url].add(ref)
+
+        for url, url_refs in refs_by_url.items():
+            if len(url_refs) < BULK_REF_THRESHOLD:
+                continue
+            try:
+                listed = self._list_refs(url, github, max_requests=len(url_refs))
+            except Exception as e:
+                logging.debug(f"unable to list the refs of {url}: {e}")
+                continue
+            if listed is None:
+                continue
+            branches, tags = listed
+            for ref in url_refs:
+                if ref in branches and ref not in tags:
+                    self._commit_shas.put((url, ref), branches[ref])
+
+    def _list_refs(
+        self, url: str, github: Callable[[str], Github], max_requests: int
+    ) -> tuple[dict[str, str], set[str]] | None:
+        """
+        Returns the head commit sha of each branch, and the tag names, or
+        None if listing them takes max_requests requests or more.
+        """
+        if "github" in url:
+            repo_name = url.rstrip("/").replace("https://github.com/", "")
+            client = github(url)
+            repo = client.get_repo(repo_name)
+            heads = repo.get_git_matching_refs("heads/")
+            tag_refs = repo.get_git_matching_refs("tags/")
+            pages = sum(
+                math.ceil(refs.totalCount / client.per_page)
+                for refs in (heads, tag_refs)
+            )
+            if pages >= max_requests:
+                return None
+            branches = {r.ref.removeprefix("refs/heads/"): r.object.sha for r in heads}
+            tags = {r.ref.removeprefix("refs/tags/") for r in tag_refs}
+            return branches, tags
+        if "gitlab" in url:
+            if not self.gitlab:
+                raise Exception("gitlab is not initialized")
+            project = self.gitlab.get_project(url)
+            # same page size as GitLabApi.get_items, a missing total is a
+            # listing too large to be counted
+            pages = sum(
+                listing(iterator=True, per_page=100).total_pages or max_requests
+                for listing in (project.branches.list, project.tags.list)
+            )
+            if pages >= max_requests:
+                return None
+            branches = {
+                b.name: b.commit["id"]
+                for b in self.gitlab.get_items(project.branches.list)
+            }
+            tags = {t.name for t in self.gitlab.get_items(project.tags.list)}
+            return branches, tags
+        raise Exception(f"Only GitHub and GitLab are supported: {url}")
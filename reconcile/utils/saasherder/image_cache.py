@@ -0,0 +1,133 @@
+"""
+Caches the digests of the container images saas targets deploy. A tag that
+looks like a commit sha is not expected to move, so its digest is kept for
+days and can be shared between integration pods. Other tags, e.g. `latest`,
+are only kept for minutes. Missing images are never cached, they are
+usually about to be built.
+"""
+
+import hashlib
+import os
+import re
+import time
+from http import HTTPStatus
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+
+from requests.exceptions import HTTPError
+from sretoolbox.container import Image
+
+from reconcile.utils import metrics
+from reconcile.utils.disk_cache import (
+    DiskCache,
+    cache_dir,
+    get_tiered,
+    set_tiered,
+)
+from reconcile.utils.single_flight import SingleFlight
+
+if TYPE_CHECKING:
+    from reconcile.utils.state import State
+
+# a commit sha, optionally prefixed by a promotion channel. All-digit tags
+# are dates or build numbers, a sha of 7 characters or more holds a letter
+IMMUTABLE_TAG_RE = re.compile(r"(^|-)(?=[0-9]*[a-f])[0-9a-f]{7,40}$")
+IMMUTABLE_TAG_TTL = int(os.environ.get("SAAS_IMAGE_CACHE_IMMUTABLE_TTL", 86400 * 7))
+MUTABLE_TAG_TTL = int(os.environ.get("SAAS_IMAGE_CACHE_MUTABLE_TTL", 300))
+
+
+def is_immutable(image: Image) -> bool:
+    """By-digest images and commit sha tags always point to the same image."""
+    return image.tag is None or bool(IMMUTABLE_TAG_RE.search(image.tag))
+
+
+def registry_digest(image: Image) -> str | None:
+    """
+    Asks the registry for the digest of image, None if it does not exist.
+    The manifest request tells both existence and digest, a missing image
+    has no manifest and so no digest.
+    """
+    try:
+        return image.digest
+    except HTTPError as e:
+        if e.response is None or e.response.status_code == HTTPStatus.NOT_FOUND:
+            return None
+        raise
+
+
+def url_digest(image: Image, digest: str) -> str:
+    """Same as Image.url_digest, without asking the registry for the digest."""
+    url = image.registry
+    if image.repository is not None:
+        url += f"/{image.repository}"
+    return f"{url}/{image.image}@{digest}"
+
+
+class ImageCache:
+    """
+    Tiers are looked up in order: process memory, local disk and optionally
+    a State shared between integration pods, which only holds immutable
+    tags. Threads asking for an image that is being looked up wait for that
+    lookup instead of repeating it. Failed lookups are not cached.
+
+    Entries are keyed by image reference and registry user, an image one
+    pull secret can read may not be readable with another.
+    """
+
+    def __init__(
+        self,
+        disk: DiskCache | None,
+        shared: "State | None" = None,
+        memory_entries: int = 4096,
+    ):
+        self.disk = disk
+        self.shared = shared
+        self._memory: SingleFlight[str, dict[str, Any] | None] = SingleFlight(
+            memoize=lambda entry: entry is not None,
+            stale=lambda entry: entry is None or entry["expire_at"] < time.time(),
+            max_size=memory_entries,
+        )
+
+    @staticmethod
+    def key(image: Image) -> str:
+        user = image.username if image.auth else ""
+        digest = hashlib.sha256(f"{image}\0{user}".encode()).hexdigest()
+        return f"{image.registry}/{digest}"
+
+    def digest(self, image: Image) -> str | None:
+        """Returns the digest of image, or None if it does not exist."""
+        key = self.key(image)
+        future, owner = self._memory.claim(key)
+        if not owner:
+            metrics.saas_image_cache_lookups.labels(source="memory").inc()
+            entry = future.result()
+        else:
+            entry = self._memory.run(key, future, lambda: self._lookup(key, image))
+        return entry["digest"] if entry else None
+
+    def _lookup(self, key: str, image: Image) -> dict[str, Any] | None:
+        entry, source = get_tiered(
+            self, key, "image cache", ttl=lambda e: e["expire_at"] - time.time()
+        )
+        if entry is None:
+            digest = registry_digest(image)
+            if digest is not None:
+                immutable = is_immutable(image)
+                ttl = IMMUTABLE_TAG_TTL if immutable else MUTABLE_TAG_TTL
+                entry = {"digest": digest, "expire_at": time.time() + ttl}
+                # only immutable tags are shared between pods
+                set_tiered(self, key, entry, "image cache", ttl=ttl, share=immutable)
+        metrics.saas_image_cache_lookups.labels(source=source).inc()
+        return entry
+
+
+IMAGE_CACHE = ImageCache(
+    DiskCache(
+        cache_dir("saas-images"),
+        max_bytes=int(os.environ.get("SAAS_IMAGE_CACHE_MAX_BYTES", 64 * 1024**2)),
+    )
+    if os.environ.get("SAAS_IMAGE_CACHE_ENABLED", "true").lower() == "true"
+    else None
+)
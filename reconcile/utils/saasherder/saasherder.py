@@ -40,12 +40,13 @@ from sretoolbox.utils import (
 from reconcile.github_org import get_default_config
 from reconcile.status import RunningState
 from reconcile.utils import helm
+from reconcile.utils.disk_cache import init_shared_tier
 from reconcile.utils.gitlab_api import GitLabApi
 from reconcile.utils.jenkins_api import JenkinsApi
 from reconcile.utils.jjb_client import JJB
 from reconcile.utils.oc import (
-    OCLocal,
     StatusCodeError,
+    oc_process,
 )
 from reconcile.utils.openshift_resource import OpenshiftResource as OR
 from reconcile.utils.openshift_resource import (
@@ -54,10 +55,16 @@ from reconcile.utils.openshift_resource import (
     ResourceNotManagedError,
     fully_qualified_kind,
 )
+from reconcile.utils.openshift_template import TemplateProcessingError
 from reconcile.utils.promotion_state import (
     PromotionData,
     PromotionState,
 )
+from reconcile.utils.saasherder.commit_resolver import CommitResolver
+from reconcile.utils.saasherder.image_cache import (
+    IMAGE_CACHE,
+    url_digest,
+)
 from reconcile.utils.saasherder.interfaces import (
     SaasFile,
     SaasParentSaasPromotion,
@@ -81,6 +88,10 @@ from reconcile.utils.saasherder.models import (
     TriggerTypes,
     UpstreamJob,
 )
+from reconcile.utils.saasherder.source_cache import (
+    SOURCE_CACHE,
+    SourceCache,
+)
 from reconcile.utils.secret_reader import SecretReaderBase
 from reconcile.utils.state import State
 
@@ -123,6 +134,7 @@ class SaasHerder:  # pylint: disable=too-many-public-methods
     ):
         self.error_registered = False
         self.saas_files = saas_files
+        self._commit_resolver = CommitResolver(gitlab)
         self.repo_urls = self._collect_repo_urls()
         self.image_patterns = self._collect_image_patterns()
         self.resolve_templated_parameters(self.saas_files)
@@ -141,6 +153,8 @@ class SaasHerder:  # pylint: disable=too-many-public-methods
         self.jenkins_map = jenkins_map
         self.include_trigger_trace = include_trigger_trace
         self.state = state
+        init_shared_tier(SOURCE_CACHE, "saas-source-cache")
+        init_shared_tier(IMAGE_CACHE, "saas-image-cache")
         self._promotion_state = PromotionState(state=state) if state else None
         self._channel_map = self._assemble_channels(saas_files=all_saas_files)
         self.images: set[str] = set()
@@ -755,74 +769,94 @@ class SaasHerder:  # pylint: disable=too-many-public-methods
         self, url: str, path: str, ref: str, github: Github
     ) -> tuple[Any, str]:
         commit_sha = self._get_commit_sha(url, ref, github)
+        content = SOURCE_CACHE.get(
+            SourceCache.key("file", url, path, commit_sha),
+            lambda: self._fetch_file_contents(url, path, commit_sha, github),
+        )
+        return yaml.safe_load(content), commit_sha
 
+    def _fetch_file_contents(
+        self, url: str, path: str, commit_sha: str, github: Github
+    ) -> str:
         if "github" in url:
             repo_name = url.rstrip("/").replace("https://github.com/", "")
             repo = github.get_repo(repo_name)
-            content = self._get_file_contents_github(repo, path, commit_sha)
-        elif "gitlab" in url:
+            return self._get_file_contents_github(repo, path, commit_sha)
+        if "gitlab" in url:
             if not self.gitlab:
                 raise Exception("gitlab is not initialized")
             project = self.gitlab.get_project(url)
             f = project.files.get(file_path=path.lstrip("/"), ref=commit_sha)
-            content = f.decode()
-        else:
-            raise Exception(f"Only GitHub and GitLab are supported: {url}")
-
-        return yaml.safe_load(content), commit_sha
+            return f.decode().decode("utf8")
+        raise Exception(f"Only GitHub and GitLab are supported: {url}")
 
     @retry()
     def _get_directory_contents(
         self, url: str, path: str, ref: str, github: Github
     ) -> tuple[list[Any], str]:
         commit_sha = self._get_commit_sha(url, ref, github)
+        contents = SOURCE_CACHE.get(
+            SourceCache.key("directory", url, path, commit_sha),
+            lambda: self._fetch_directory_contents(url, path, commit_sha, github),
+        )
         resources: list[Any] = []
+        for content in contents:
+            # files on GitHub may hold many documents, on GitLab only one
+            if "github" in url:
+                resources.extend(yaml.safe_load_all(content))
+            else:
+                resources.append(yaml.safe_load(content))
+        return resources, commit_sha
+
+    def _fetch_directory_contents(
+        self, url: str, path: str, commit_sha: str, github: Github
+    ) -> list[str]:
         if "github" in url:
             repo_name = url.rstrip("/").replace("https://github.com/", "")
             repo = github.get_repo(repo_name)
             directory = repo.get_contents(path, commit_sha)
             if isinstance(directory, ContentFile):
                 raise Exception(f"Path {path} and sha {commit_sha} is a file!")
-            for f in directory:
-                file_path = os.path.join(path, f.name)
-                file_contents_decoded = self._get_file_contents_github(
-                    repo, file_path, commit_sha
+            return [
+                self._get_file_contents_github(
+                    repo, os.path.join(path, f.name), commit_sha
                 )
-                result_resources = yaml.safe_load_all(file_contents_decoded)
-                resources.extend(result_resources)
-        elif "gitlab" in url:
+                for f in directory
+            ]
+        if "gitlab" in url:
             if not self.gitlab:
                 raise Exception("gitlab is not initialized")
             project = self.gitlab.get_project(url)
-            for item in self.gitlab.get_items(
-                project.repository_tree, path=path.lstrip("/"), ref=commit_sha
-            ):
-                file_contents = project.files.get(
-                    file_path=item["path"], ref=commit_sha
+            return [
+                project.files.get(file_path=item["path"], ref=commit_sha)
+                .decode()
+                .decode("utf8")
+                for item in self.gitlab.get_items(
+                    project.repository_tree, path=path.lstrip("/"), ref=commit_sha
                 )
-                resource = yaml.safe_load(file_contents.decode())
-                resources.append(resource)
-        else:
-            raise Exception(f"Only GitHub and GitLab are supported: {url}")
-
-        return resources, commit_sha
+            ]
+        raise Exception(f"Only GitHub and GitLab are supported: {url}")
 
     @retry()
     def _get_commit_sha(self, url: str, ref: str, github: Github) -> str:
-        commit_sha = ""
-        if "github" in url:
-            repo_name = url.rstrip("/").replace("https://github.com/", "")
-            repo = github.get_repo(repo_name)
-            commit = repo.get_commit(sha=ref)
-            commit_sha = commit.sha
-        elif "gitlab" in url:
-            if not self.gitlab:
-                raise Exception("gitlab is not initialized")
-            project = self.gitlab.get_project(url)
-            commits = project.commits.list(ref_name=ref, per_page=1, page=1)
-            commit_sha = commits[0].id
+        return self._commit_resolver.resolve(url, ref, github)
 
-        return commit_sha
+    def _prefetch_commit_shas(self) -> None:
+        """Resolves the refs of all targets in bulk where it saves requests."""
+        saas_files_by_url = {
+            rt.url: saas_file
+            for saas_file in self.saas_files
+            for rt in saas_file.resource_templates
+        }
+        self._commit_resolver.prefetch(
+            (
+                (rt.url, target.ref)
+                for saas_file in self.saas_files
+                for rt in saas_file.resource_templates
+                for target in rt.targets
+            ),
+            github=lambda url: self._initiate_github(saas_files_by_url[url]),
+        )
 
     @staticmethod
     def _additional_resource_process(resources: Resources, html_url: str) -> None:
@@ -941,20 +975,20 @@ class SaasHerder:  # pylint: disable=too-many-public-methods
                     image_auth=spec.image_auth,
                     error_prefix=error_prefix,
                 )
-                if not img:
+                digest = IMAGE_CACHE.digest(img) if img is not None else None
+                if img is None or not digest:
                     msg = f"{error_prefix} error get image for {image_uri}"
                     logging.error(msg)
                     raise Exception(msg)
 
                 if need_repo_digest:
-                    consolidated_parameters["REPO_DIGEST"] = img.url_digest
+                    consolidated_parameters["REPO_DIGEST"] = url_digest(img, digest)
                 if need_image_digest:
-                    consolidated_parameters["IMAGE_DIGEST"] = img.digest
+                    consolidated_parameters["IMAGE_DIGEST"] = digest
 
-            oc = OCLocal("cluster", None, None, local=True)
             try:
-                resources = oc.process(template, consolidated_parameters)
-            except StatusCodeError as e:
+                resources = oc_process(template, consolidated_parameters)
+            except (StatusCodeError, TemplateProcessingError) as e:
                 logging.error(f"{error_prefix} error processing template: {e!s}")
 
         elif provider == "directory":
@@ -986,13 +1020,16 @@ class SaasHerder:  # pylint: disable=too-many-public-methods
                 image = global_parameters.setdefault("image", {})
                 if isinstance(image, dict):
                     image.setdefault("tag", image_tag)
-            resources = helm.template_all(
+            # the chart at the commit the image tag is derived from
+            rendered = helm.render(
                 url=url,
                 path=path,
+                commit_sha=commit_sha,
                 name=resource_template_name,
                 values=consolidated_parameters,
                 ssl_verify=ssl_verify,
             )
+            resources = yaml.safe_load_all(rendered)
 
         else:
             logging.error(f"{error_prefix} unknown provider: {provider}")
@@ -1220,6 +1257,7 @@ class SaasHerder:  # pylint: disable=too-many-public-methods
         )
 
     def populate_desired_state(self, ri: ResourceInventory) -> None:
+        self._prefetch_commit_shas()
         results = threaded.run(
             self._init_populate_desired_state_specs,
             self.saas_files,
@@ -1405,6 +1443,7 @@ class SaasHerder:  # pylint: disable=too-many-public-methods
         )
 
     def get_moving_commits_diff(self, dry_run: bool) -> list[TriggerSpecMovingCommit]:
+        self._prefetch_commit_shas()
         results = threaded.run(
             self.get_moving_commits_diff_saas_file,
             self.saas_files,
@@ -1582,6 +1621,7 @@ class SaasHerder:  # pylint: disable=too-many-public-methods
     def get_container_images_diff(
         self, dry_run: bool
     ) -> list[TriggerSpecContainerImage]:
+        self._prefetch_commit_shas()
         results = threaded.run(
             self.get_container_images_diff_saas_file,
             self.saas_files,
@@ -1618,7 +1658,7 @@ class SaasHerder:  # pylint: disable=too-many-public-methods
                     image = self._get_image(
                         image_uri, saas_file.image_patterns, image_auth, error_prefix
                     )
-                    if not image:
+                    if image is None or not IMAGE_CACHE.digest(image):
                         continue
 
                     trigger_spec = TriggerSpecContainerImage(
@@ -0,0 +1,80 @@
+"""
+Caches the contents of saas resource template sources. The content of a
+path in a repository at a commit never changes, so it is cached by
+(url, path, commit sha) for as long as it stays in the cache. Only the
+resolution of refs to commits has to go to GitHub or GitLab every run.
+"""
+
+import hashlib
+import os
+from collections.abc import Callable
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+
+from reconcile.utils import metrics
+from reconcile.utils.disk_cache import (
+    DiskCache,
+    cache_dir,
+    get_tiered,
+    set_tiered,
+)
+from reconcile.utils.single_flight import SingleFlight
+
+if TYPE_CHECKING:
+    from reconcile.utils.state import State
+
+
+class SourceCache:
+    """
+    Tiers are looked up in order: process memory, holding at most
+    memory_entries sources, local disk, bounded in size with least recently
+    used entries evicted first, and optionally a State shared between
+    integration pods. Threads asking for a source that is being fetched
+    wait for that fetch instead of repeating it. Failed fetches are not
+    cached.
+    """
+
+    def __init__(
+        self,
+        disk: DiskCache | None,
+        shared: "State | None" = None,
+        memory_entries: int = 256,
+    ):
+        self.disk = disk
+        self.shared = shared
+        self._memory: SingleFlight[str, Any] = SingleFlight(max_size=memory_entries)
+
+    @staticmethod
+    def key(source: str, url: str, path: str, commit_sha: str) -> str:
+        location = f"{url.rstrip('/')}\0{path.lstrip('/')}"
+        digest = hashlib.sha256(location.encode()).hexdigest()
+        return f"{source}/{commit_sha}/{digest}"
+
+    def get(self, key: str, fetch: Callable[[], Any]) -> Any:
+        """Returns the cached value of key, fetching it on a miss."""
+        future, owner = self._memory.claim(key)
+        if not owner:
+            metrics.saas_source_cache_lookups.labels(source="memory").inc()
+            return future.result()
+        return self._memory.run(key, future, lambda: self._lookup(key, fetch))
+
+    def _lookup(self, key: str, fetch: Callable[[], Any]) -> Any:
+        value, source = get_tiered(self, key, "source cache")
+        if value is None:
+            value = fetch()
+            set_tiered(self, key, value, "source cache")
+        metrics.saas_source_cache_lookups.labels(source=source).inc()
+        return value
+
+
+SOURCE_CACHE = SourceCache(
+    DiskCache(
+        cache_dir("saas-sources"),
+        max_bytes=int(os.environ.get("SAAS_SOURCE_CACHE_MAX_BYTES", 1024**3)),
+    )
+    if os.environ.get("SAAS_SOURCE_CACHE_ENABLED", "true").lower() == "true"
+    else None,
+    memory_entries=int(os.environ.get("SAAS_SOURCE_CACHE_MEMORY_ENTRIES", 256)),
+)
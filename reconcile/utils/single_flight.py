@@ -0,0 +1,118 @@
+"""
+Coalesces concurrent computations of the same key. The first thread asking
+for a key computes its value, threads asking for it while it is being
+computed wait for that computation instead of repeating it.
+"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import (
+    Callable,
+    Hashable,
+)
+from concurrent.futures import Future
+from typing import (
+    Generic,
+    TypeVar,
+)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class SingleFlight(Generic[K, V]):
+    """
+    Results are memoized if memoize returns True for them, at most max_size
+    of them with the least recently used ones dropped first. A memoized
+    result is computed again once stale returns True for it. Failures are
+    never memoized, the next thread asking for the key computes it again.
+    """
+
+    def __init__(
+        self,
+        memoize: Callable[[V], bool] = lambda _: True,
+        stale: Callable[[V], bool] = lambda _: False,
+        max_size: int | None = None,
+    ) -> None:
+        self.memoize = memoize
+        self.stale = stale
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._futures: OrderedDict[K, Future[V]] = OrderedDict()
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._futures
+
+    def __len__(self) -> int:
+        return len(self._futures)
+
+    def claim(self, key: K) -> tuple[Future[V], bool]:
+        """
+        Returns the future of key and whether the caller owns it. The owner
+        must settle it with run, resolve or fail.
+        """
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None and future.done() and self.stale(future.result()):
+                future = None
+            if future is None:
+                future = self._futures[key] = Future()
+                return future, True
+            self._futures.move_to_end(key)
+            return future, False
+
+    def resolve(self, key: K, future: Future[V], value: V) -> None:
+        with self._lock:
+            if not self.memoize(value):
+                self._forget(key, future)
+            elif self.max_size is not None:
+                for old_key, old_future in list(self._futures.items()):
+                    if len(self._futures) <= self.max_size:
+                        break
+                    if old_future.done():
+                        del self._futures[old_key]
+        future.set_result(value)
+
+    def fail(self, key: K, future: Future[V], error: BaseException) -> None:
+        with self._lock:
+            self._forget(key, future)
+        future.set_exception(error)
+
+    def _forget(self, key: K, future: Future[V]) -> None:
+        if self._futures.get(key) is future:
+            del self._futures[key]
+
+    def run(self, key: K, future: Future[V], compute: Callable[[], V]) -> V:
+        """Computes the value of a claimed key and settles its future."""
+        try:
+            value = compute()
+        # waiting threads must never be left hanging
+        except Exception as e:
+            self.fail(key, future, e)
+            raise
+        self.resolve(key, future, value)
+        return value
+
+    def get(self, key: K, compute: Callable[[], V]) -> V:
+        """Returns the value of key, computing it unless it is memoized or
+        being computed by another thread."""
+        future, owner = self.claim(key)
+        if not owner:
+            return future.result()
+        return self.run(key, future, compute)
+
+    def put(self, key: K, value: V) -> None:
+        """Memoizes value, unless key is memoized or being computed."""
+        with self._lock:
+            if key in self._futures:
+                return
+            future: Future[V] = Future()
+            future.set_result(value)
+            self._futures[key] = future
+
+    def clear(self) -> None:
+        """Forgets all memoized results, computations in flight are kept."""
+        with self._lock:
+            for key, future in list(self._futures.items()):
+                if future.done():
+                    del self._futures[key]
@@ -415,6 +415,36 @@ class State:
     def __setitem__(self, key: str, value: Any) -> None:
         self._set(key, value)
 
+    def set_bytes(
+        self, key: str, data: bytes, metadata: Mapping[str, str] | None = None
+    ) -> None:
+        """
+        Stores raw bytes under a key, overriding an existing value.
+        Use get_bytes to read them, they are not JSON.
+        """
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=f"{self.state_path}/{key}",
+            Body=data,
+            Metadata=metadata or {},
+        )
+
+    def get_bytes(self, key: str) -> bytes:
+        """
+        Gets the raw bytes stored under a key.
+
+        :raises KeyError: if the key does not exist
+        """
+        try:
+            response = self.client.get_object(
+                Bucket=self.bucket, Key=f"{self.state_path}/{key}"
+            )
+        except ClientError as details:
+            if details.response["Error"]["Code"] == "NoSuchKey":
+                raise KeyError(key) from None
+            raise
+        return response["Body"].read()
+
     @contextlib.contextmanager
     def transaction(
         self, key: str, value: Any = None
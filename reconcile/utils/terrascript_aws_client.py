@@ -1529,6 +1529,7 @@ class TerrascriptClient:  # pylint: disable=too-many-public-methods
         Populates the terraform configuration from resource specs.
         :param ocm_map:
         """
+        self.prefetch_defaults()
         for specs in self.account_resource_specs.values():
             for spec in specs:
                 self.populate_tf_resources(spec, ocm_map=ocm_map)
@@ -4293,6 +4294,19 @@ class TerrascriptClient:  # pylint: disable=too-many-public-methods
         gqlapi = gql.get_api()
         return {r["path"]: r for r in gqlapi.get_resources_by_schema(schema)}
 
+    def prefetch_defaults(self) -> None:
+        """Fetches the defaults files of all resource specs in batches,
+        instead of one query per resource spec."""
+        paths = {
+            spec.resource["defaults"]
+            for specs in self.account_resource_specs.values()
+            for spec in specs
+            if spec.resource.get("defaults")
+        }
+        paths.difference_update(self._resource_cache)
+        if paths:
+            self._resource_cache.update(gql.get_api().get_resources(sorted(paths)))
+
     def get_raw_values(self, path) -> dict[str, str]:
         if path in self._resource_cache:
             return self._resource_cache[path]
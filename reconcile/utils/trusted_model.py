@@ -0,0 +1,197 @@
+"""
+Builds the generated gql_definitions models from trusted GraphQL responses
+without validating them again.
+
+The responses of a SHA pinned bundle were validated against the schema when
+the bundle was built, and qenerate generates the models from the same
+schema. Validating multi-megabyte responses with smart_union again on every
+run is pure CPU cost, so for those responses the models are built like
+`construct()` does, recursively. The few conversions a validation would do,
+e.g. datetimes, enums and JSON scalars, are still applied.
+
+Whenever the data doesn't fit a model structurally (unknown or missing
+keys), or a union can't be resolved to a single member, that object is
+validated the regular way. Errors are therefore reported like before.
+"""
+
+import functools
+import json
+import os
+import sys
+import types
+import typing
+from collections.abc import Callable
+from datetime import datetime
+from enum import Enum
+from typing import (
+    Any,
+    TypeVar,
+    Union,
+)
+
+from pydantic import BaseModel
+from pydantic.datetime_parse import parse_datetime
+from pydantic.fields import ModelField
+from pydantic.main import object_setattr
+
+from reconcile.utils.gql import GqlApi
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+Converter = Callable[[Any], Any]
+
+
+class AmbiguousUnionError(Exception):
+    pass
+
+
+def trusted_responses_enabled() -> bool:
+    return os.environ.get("GQL_TRUSTED_RESPONSES", "false").lower() == "true"
+
+
+def _is_model(tp: Any) -> bool:
+    return isinstance(tp, type) and issubclass(tp, BaseModel)
+
+
+def _list_converter(item: Converter) -> Converter:
+    return lambda value: [None if v is None else item(v) for v in value]
+
+
+def _dict_converter(item: Converter) -> Converter:
+    return lambda value: {k: None if v is None else item(v) for k, v in value.items()}
+
+
+def _union_converter(members: tuple[Any, ...]) -> Converter | None:
+    models = [m for m in members if _is_model(m)]
+    if not models:
+        # scalar unions are passed through, the data is trusted
+        return None
+    builders = [model_builder(m) for m in models]
+
+    def convert(value: Any) -> Any:
+        if not isinstance(value, dict):
+            return value
+        candidates = [b for b in builders if b.fits(value)]
+        if len(candidates) != 1:
+            # let smart_union of the parent model decide
+            raise AmbiguousUnionError()
+        return candidates[0].build(value)
+
+    return convert
+
+
+def _converter(tp: Any) -> Converter | None:
+    """Returns a function converting a non-None value of type tp like
+    validation would, or None if the value can be used as is."""
+    origin = typing.get_origin(tp)
+    if origin in {Union, types.UnionType}:
+        members = tuple(a for a in typing.get_args(tp) if a is not type(None))
+        if len(members) == 1:
+            return _converter(members[0])
+        return _union_converter(members)
+    if origin is list:
+        (item_type,) = typing.get_args(tp) or (Any,)
+        item = _converter(item_type)
+        return _list_converter(item) if item else None
+    if origin is dict:
+        _, value_type = typing.get_args(tp) or (Any, Any)
+        item = _converter(value_type)
+        return _dict_converter(item) if item else None
+    if _is_model(tp):
+        return model_builder(tp).build
+    if tp is datetime:
+        return parse_datetime
+    if isinstance(tp, type) and issubclass(tp, Enum):
+        return tp
+    if tp is float:
+        return float
+    return None
+
+
+def _json_converter(convert: Converter | None) -> Converter:
+    def parse(value: Any) -> Any:
+        if isinstance(value, str | bytes):
+            value = json.loads(value)
+        return convert(value) if convert and value is not None else value
+
+    return parse
+
+
+class ModelBuilder:
+    """Builds instances of a model class from trusted data."""
+
+    def __init__(self, cls: type[BaseModel]):
+        self.cls = cls
+        self.fields: list[tuple[str, str, ModelField]] = [
+            (field.alias, name, field) for name, field in cls.__fields__.items()
+        ]
+        self.aliases = frozenset(alias for alias, _, _ in self.fields)
+        self.required = frozenset(
+            alias for alias, _, field in self.fields if field.required
+        )
+        self.forbid_extra = cls.__config__.extra == "forbid"
+        self.converters: list[tuple[str, str, Converter | None]] | None = None
+
+    def _compile(self) -> list[tuple[str, str, Converter | None]]:
+        # compiled lazily, models may reference each other
+        if self.converters is None:
+            converters = []
+            for alias, name, field in self.fields:
+                convert = _converter(field.outer_type_)
+                if field.parse_json:
+                    convert = _json_converter(convert)
+                converters.append((alias, name, convert))
+            self.converters = converters
+        return self.converters
+
+    def fits(self, data: dict[str, Any]) -> bool:
+        keys = data.keys()
+        return self.required <= keys and (not self.forbid_extra or keys <= self.aliases)
+
+    def build(self, data: Any) -> BaseModel:
+        if not isinstance(data, dict) or not self.fits(data):
+            return self.cls.parse_obj(data)
+        values = {}
+        fields_set = set()
+        try:
+            for alias, name, convert in self._compile():
+                if alias in data:
+                    value = data[alias]
+                    values[name] = (
+                        convert(value) if convert and value is not None else value
+                    )
+                    fields_set.add(name)
+                else:
+                    values[name] = self.cls.__fields__[name].get_default()
+        except AmbiguousUnionError:
+            return self.cls.parse_obj(data)
+        model = self.cls.__new__(self.cls)
+        # like BaseModel.construct
+        object_setattr(model, "__dict__", values)
+        object_setattr(model, "__fields_set__", fields_set)
+        model._init_private_attributes()
+        return model
+
+
+@functools.cache
+def model_builder(cls: type[BaseModel]) -> ModelBuilder:
+    return ModelBuilder(cls)
+
+
+def build_trusted(cls: type[ModelT], data: Any) -> ModelT:
+    """Builds cls from trusted data, see the module docstring."""
+    return model_builder(cls).build(data)  # type: ignore[return-value]
+
+
+def query_trusted(
+    query: Callable[..., ModelT], gql_api: GqlApi, **kwargs: Any
+) -> ModelT:
+    """
+    Runs a generated gql_definitions query() function with gql_api.query.
+    If GQL_TRUSTED_RESPONSES is enabled and gql_api queries a SHA pinned
+    bundle, the response is built into models without validating it again.
+    """
+    if not (trusted_responses_enabled() and gql_api.sha):
+        return query(gql_api.query, **kwargs)
+    definition = sys.modules[query.__module__].DEFINITION
+    cls = typing.get_type_hints(query)["return"]
+    return build_trusted(cls, gql_api.query(definition, **kwargs))
@@ -1510,11 +1510,11 @@ def jenkins_job_vault_secrets(ctx, instance_name: str, job_name: str) -> None:
 @click.argument("name", default="")
 @click.pass_context
 def namespaces(ctx, name):
-    namespaces = queries.get_namespaces()
+    columns = ["name", "cluster.name", "app.name"]
+    namespaces = queries.get_namespaces(fields=columns)
     if name:
         namespaces = [ns for ns in namespaces if ns["name"] == name]
 
-    columns = ["name", "cluster.name", "app.name"]
     # TODO(mafriedm): fix this
     # do not sort
     ctx.obj["options"]["sort"] = False